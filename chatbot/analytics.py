@@ -0,0 +1,181 @@
+"""
+Mood statistics for the dashboard.
+
+The statistics are read from MoodDailyRollup, one row per user and day with
+the count of each mood and the sum of their 1-5 values. The MoodEntry
+signals (see ``chatbot/signals.py``) recompute the day of every saved or
+deleted entry, and ``manage.py rebuild_mood_rollups`` rebuilds the table in
+bulk. Most common and average mood sum the user's rollups in one query, and
+the chart is built from the daily rollups by ``dashboard/mood_chart.py``,
+so a page costs O(days recorded) rather than O(entries ever recorded) and
+the chart payload has a fixed size.
+
+The weekday/hour heatmap over the whole history is read from
+MoodHourlyRollup (at most 168 rows per user), which the signals adjust by
+one entry at a time. A heatmap over the last `days` days is grouped from
+that window's entries instead.
+"""
+from datetime import date, timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, Count, F, IntegerField, Max, Min, Q, Sum, Value, When
+from django.db.models.functions import ExtractHour, ExtractIsoWeekDay, TruncDate
+from django.utils import timezone
+
+from dashboard import mood_chart
+
+from .models import MoodDailyRollup, MoodEntry, MoodHourlyRollup
+
+MOOD_VALUES = {
+    'very_sad': 1,
+    'sad': 2,
+    'neutral': 3,
+    'happy': 4,
+    'very_happy': 5
+}
+
+
+def mood_value():
+    """SQL expression for an entry's mood on the 1-5 scale"""
+    return Case(
+        *[When(mood=mood, then=Value(value)) for mood, value in MOOD_VALUES.items()],
+        output_field=IntegerField()
+    )
+
+
+def mood_for_value(value):
+    """The mood whose 1-5 value `value` rounds to"""
+    rounded = min(max(round(value), 1), 5)
+    return next(mood for mood, mood_value in MOOD_VALUES.items() if mood_value == rounded)
+
+
+def daily_rollups(entries):
+    """MoodDailyRollup field values per (user, day) of the MoodEntry queryset"""
+    return (
+        entries.order_by()
+        .annotate(day=TruncDate('created_at'))
+        .values('user_id', 'day')
+        .annotate(
+            count=Count('id'),
+            value_sum=Sum(mood_value()),
+            first_at=Min('created_at'),
+            last_at=Max('created_at'),
+            **{f'{mood}_count': Count('id', filter=Q(mood=mood)) for mood in MOOD_VALUES}
+        )
+    )
+
+
+def refresh_rollup(user_id, day):
+    """Recompute the user's rollup for `day` from that day's entries"""
+    rows = list(daily_rollups(MoodEntry.objects.filter(user_id=user_id, created_at__date=day)))
+    if rows:
+        MoodDailyRollup.objects.update_or_create(user_id=user_id, day=day, defaults=rows[0])
+    else:
+        MoodDailyRollup.objects.filter(user_id=user_id, day=day).delete()
+
+
+def hourly_rollups(entries):
+    """(user_id, weekday, hour, count, value sum) per heatmap cell of the MoodEntry queryset; weekday 1 is Monday"""
+    return (
+        entries.order_by()
+        .annotate(weekday=ExtractIsoWeekDay('created_at'), hour=ExtractHour('created_at'))
+        .values('user_id', 'weekday', 'hour')
+        .annotate(count=Count('id'), value_sum=Sum(mood_value()))
+        .values_list('user_id', 'weekday', 'hour', 'count', 'value_sum')
+    )
+
+
+def adjust_hourly_rollup(user_id, created_at, mood, sign):
+    """Add (sign=1) or remove (sign=-1) one entry in its heatmap cell"""
+    local = timezone.localtime(created_at)
+    key = {'user_id': user_id, 'weekday': local.weekday(), 'hour': local.hour}
+    if sign > 0:
+        MoodHourlyRollup.objects.get_or_create(**key)
+    # Removing never creates a cell: during a user delete it would point at
+    # the user being deleted
+    MoodHourlyRollup.objects.filter(**key).update(
+        count=F('count') + sign,
+        value_sum=F('value_sum') + sign * MOOD_VALUES.get(mood, 0)
+    )
+
+
+def rebuild_rollups(user_ids):
+    """Replace the daily and hourly rollups of the given users; returns the number of daily rows written"""
+    entries = MoodEntry.objects.filter(user_id__in=user_ids)
+    with transaction.atomic():
+        MoodDailyRollup.objects.filter(user_id__in=user_ids).delete()
+        rollups = MoodDailyRollup.objects.bulk_create(
+            MoodDailyRollup(**row) for row in daily_rollups(entries)
+        )
+        MoodHourlyRollup.objects.filter(user_id__in=user_ids).delete()
+        MoodHourlyRollup.objects.bulk_create(
+            MoodHourlyRollup(user_id=user_id, weekday=weekday - 1, hour=hour, count=count, value_sum=value_sum)
+            for user_id, weekday, hour, count, value_sum in hourly_rollups(entries)
+        )
+    return len(rollups)
+
+
+def mood_counts(user):
+    """{mood: number of entries} for the user, without moods never recorded"""
+    totals = MoodDailyRollup.objects.filter(user=user).aggregate(
+        **{mood: Sum(f'{mood}_count') for mood in MOOD_VALUES}
+    )
+    return {mood: count for mood, count in totals.items() if count}
+
+
+def chart_data(user, days=None, max_points=None, window=None):
+    """
+    Mood chart payload for the user (see dashboard/mood_chart.py), over the
+    last `days` days or the whole history. The series is read from the
+    daily rollups, and so is the weekday/hour heatmap of the whole history.
+    """
+    if max_points is None:
+        max_points = settings.MOOD_CHART_POINTS
+    if window is None:
+        window = settings.MOOD_CHART_WINDOW
+
+    rollups = MoodDailyRollup.objects.filter(user=user).order_by('day')
+    if days:
+        start = timezone.localdate() - timedelta(days=days - 1)
+        rollups = rollups.filter(day__gte=start)
+        # Bounded by the window (the (user, created_at) index)
+        heat_cells = [
+            (weekday - 1, hour, count, value_sum) for _, weekday, hour, count, value_sum
+            in hourly_rollups(MoodEntry.objects.filter(user=user, created_at__date__gte=start))
+        ]
+    else:
+        heat_cells = list(MoodHourlyRollup.objects.filter(user=user, count__gt=0).values_list(
+            'weekday', 'hour', 'count', 'value_sum'
+        ))
+
+    rows = list(rollups.values_list('day', 'count', 'value_sum'))
+
+    chart = mood_chart.build_chart(
+        [day.toordinal() for day, _, _ in rows],
+        [count for _, count, _ in rows],
+        [value_sum for _, _, value_sum in rows],
+        heat_cells,
+        max_points=max_points,
+        window=window
+    )
+    if chart['first_day'] is not None:
+        chart['first_day'] = date.fromordinal(chart['first_day']).isoformat()
+    return chart
+
+
+def mood_summary(user):
+    """
+    Dashboard mood statistics: most_common_mood and average_mood (both None
+    without entries).
+    """
+    counts = mood_counts(user)
+    if not counts:
+        return {'most_common_mood': None, 'average_mood': None}
+
+    total = sum(counts.values())
+    average = sum(MOOD_VALUES[mood] * count for mood, count in counts.items()) / total
+    return {
+        'most_common_mood': max(counts.items(), key=lambda item: item[1])[0],
+        'average_mood': mood_for_value(average),
+    }
@@ -1,7 +1,16 @@
 from django.apps import AppConfig
+from django.conf import settings
 
 
 class ChatbotConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'chatbot'
-    verbose_name = 'Mental Wellness Chatbot' 
\ No newline at end of file
+    verbose_name = 'Mental Wellness Chatbot'
+
+    def ready(self):
+        from . import checks, signals  # noqa: F401
+
+        # Only set by gunicorn.conf.py, so management commands never load the model
+        if settings.INFERENCE_PRELOAD:
+            from . import inference
+            inference.preload_model(settings.CHATBOT_MODEL_PATH)
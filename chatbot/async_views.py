@@ -0,0 +1,189 @@
+"""
+Async variants of the views that wait on the model.
+
+These are wired in place of their sync counterparts when ASYNC_VIEWS is on
+(the default under mental_wellness/asgi.py). While a reply is generated they
+await the inference backend on the event loop instead of holding a worker
+thread, so one ASGI worker can keep many chat requests waiting at once.
+
+Django 4.2's login_required, require_http_methods and csrf_exempt only wrap
+sync views, so the equivalent checks are done here by hand.
+"""
+from functools import wraps
+import json
+import logging
+import time
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user
+from django.contrib.auth.views import redirect_to_login
+from django.http import HttpResponseNotAllowed, JsonResponse, StreamingHttpResponse
+
+from .models import ChatMessage, WellnessGoal
+from .utils import build_chat_history, agenerate_chat_response, astream_chat_response
+from .views import _sse, generate_goal_check_in
+
+logger = logging.getLogger(__name__)
+
+
+def async_login_required(view_func):
+    """login_required for async views"""
+    @wraps(view_func)
+    async def wrapper(request, *args, **kwargs):
+        # Resolving the session user touches the database
+        user = await sync_to_async(get_user)(request)
+        if not user.is_authenticated:
+            return redirect_to_login(request.get_full_path())
+        request.user = user
+        return await view_func(request, *args, **kwargs)
+    return wrapper
+
+
+@async_login_required
+async def chat(request):
+    if request.method != 'POST':
+        return HttpResponseNotAllowed(['POST'])
+
+    start_time = time.time()
+    try:
+        data = json.loads(request.body)
+        user_message = data.get('message', '').strip()
+
+        if not user_message:
+            return JsonResponse({
+                'error': 'Message cannot be empty',
+                'status': 'error'
+            }, status=400)
+
+        # Get recent chat history
+        recent_messages = await ChatMessage.aget_recent_chat_history(request.user)
+        chat_history = build_chat_history(recent_messages)
+
+        # Save user message
+        await ChatMessage.objects.acreate(
+            user=request.user,
+            message=user_message,
+            is_user=True
+        )
+
+        if data.get('stream'):
+            # Send tokens as Server-Sent Events while the reply is generated
+            response = StreamingHttpResponse(
+                _astream_chat(request.user, user_message, chat_history, start_time),
+                content_type='text/event-stream'
+            )
+            response['Cache-Control'] = 'no-cache'
+            response['X-Accel-Buffering'] = 'no'
+            return response
+
+        try:
+            # Generate AI response with chat history
+            ai_response = await agenerate_chat_response(user_message, chat_history, request.user.id)
+
+            # Calculate response time
+            response_time = time.time() - start_time
+
+            # Save AI response
+            await ChatMessage.objects.acreate(
+                user=request.user,
+                message=ai_response,
+                is_user=False,
+                response_time=response_time
+            )
+
+            return JsonResponse({
+                'response': ai_response,
+                'status': 'success',
+                'response_time': round(response_time, 2)
+            })
+
+        except Exception as e:
+            logger.error(f"Error generating chat response: {str(e)}")
+            # Save error message
+            await ChatMessage.objects.acreate(
+                user=request.user,
+                message="I apologize, but I'm having trouble responding right now.",
+                is_user=False,
+                is_error=True,
+                error_message=str(e),
+                response_time=time.time() - start_time
+            )
+
+            return JsonResponse({
+                'error': 'An error occurred while generating the response',
+                'status': 'error'
+            }, status=500)
+
+    except json.JSONDecodeError:
+        logger.error("Invalid JSON in chat request")
+        return JsonResponse({
+            'error': 'Invalid JSON',
+            'status': 'error'
+        }, status=400)
+    except Exception as e:
+        logger.error(f"Unexpected error in chat: {str(e)}")
+        return JsonResponse({
+            'error': 'An unexpected error occurred',
+            'status': 'error'
+        }, status=500)
+
+
+async def _astream_chat(user, user_message, chat_history, start_time):
+    """Yield the AI reply as Server-Sent Events and save it once complete"""
+    chunks = []
+    first_token_time = None
+    try:
+        async for chunk in astream_chat_response(user_message, chat_history, user.id):
+            if first_token_time is None:
+                first_token_time = time.time() - start_time
+            chunks.append(chunk)
+            yield _sse('token', {'text': chunk})
+
+        # Save AI response once the stream is complete
+        response_time = time.time() - start_time
+        await ChatMessage.objects.acreate(
+            user=user,
+            message=''.join(chunks).strip(),
+            is_user=False,
+            response_time=response_time,
+            first_token_time=first_token_time
+        )
+
+        yield _sse('done', {
+            'status': 'success',
+            'response_time': round(response_time, 2),
+            'first_token_time': round(first_token_time, 2) if first_token_time is not None else None
+        })
+
+    except Exception as e:
+        logger.error(f"Error streaming chat response: {str(e)}")
+        await ChatMessage.objects.acreate(
+            user=user,
+            message="I apologize, but I'm having trouble responding right now.",
+            is_user=False,
+            is_error=True,
+            error_message=str(e),
+            response_time=time.time() - start_time,
+            first_token_time=first_token_time
+        )
+        yield _sse('error', {
+            'error': 'An error occurred while generating the response',
+            'status': 'error'
+        })
+
+
+@async_login_required
+async def get_goal_check_ins(request):
+    """Get AI check-ins for all active goals"""
+    check_ins = []
+
+    async for goal in WellnessGoal.objects.filter(user=request.user, is_active=True).select_related('user'):
+        check_in = generate_goal_check_in(goal)
+        if check_in:
+            check_ins.append({
+                'goal_id': goal.id,
+                'goal': str(goal),
+                'message': check_in
+            })
+
+    return JsonResponse({'check_ins': check_ins})
@@ -0,0 +1,43 @@
+"""System checks for deploy settings that would otherwise fail silently."""
+import os
+
+from django.conf import settings
+from django.core.checks import Error, Warning, register
+
+
+def response_cache_errors(workers):
+    """
+    A per-process reply cache under several web workers means each worker
+    computes and keeps its own copy of every reply.
+    """
+    backend = settings.CACHES['responses']['BACKEND']
+    if backend.endswith('LocMemCache') and workers > 1:
+        return [Error(
+            f'The "responses" cache is per-process ({backend}) but {workers} web workers are configured',
+            hint='Set RESPONSE_CACHE_BACKEND to a shared backend, e.g. '
+                 'django.core.cache.backends.db.DatabaseCache (after `manage.py createcachetable`) '
+                 'or django.core.cache.backends.redis.RedisCache.',
+            id='chatbot.E001',
+        )]
+    return []
+
+
+@register()
+def check_response_cache(app_configs, **kwargs):
+    return response_cache_errors(int(os.getenv('WEB_CONCURRENCY', '1')))
+
+
+def sentiment_model_warnings():
+    """Without the model, texts the lexicon isn't sure about are never scored."""
+    if not os.path.exists(os.path.join(settings.SENTIMENT_MODEL_PATH, 'config.json')):
+        return [Warning(
+            f'No sentiment model in {settings.SENTIMENT_MODEL_PATH}, so transformer sentiment scoring is disabled',
+            hint='Run `manage.py download_sentiment_model` in the build step.',
+            id='chatbot.W001',
+        )]
+    return []
+
+
+@register()
+def check_sentiment_model(app_configs, **kwargs):
+    return sentiment_model_warnings()
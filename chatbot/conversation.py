@@ -0,0 +1,178 @@
+"""
+Per-conversation KV-cache reuse for DialoGPT chat turns.
+
+After each turn an inference worker keeps the conversation's token ids and
+``past_key_values`` in a ConversationCache keyed by user. When the next
+message for that user arrives and the chat history still ends with the turn
+the cache holds, only the new tokens are run through the model; otherwise
+the recent history window is re-encoded from scratch.
+
+``model.generate`` in transformers 4.35 doesn't hand back the key/value cache,
+so chat turns are decoded with the small sampling loop in ``generate_turn``,
+using the same sampling parameters as the batched path.
+"""
+import collections
+import time
+
+
+class Session:
+    """Token ids of a conversation so far and their key/value cache."""
+
+    __slots__ = ('ids', 'past', 'turns', 'nbytes', 'last_used')
+
+    def __init__(self, ids, past, turns):
+        self.ids = ids
+        self.past = past
+        # The last user message and reply, to check the cache is still in
+        # sync with the chat history stored in the database
+        self.turns = turns
+        self.nbytes = sum(t.element_size() * t.nelement() for layer in past for t in layer)
+        self.last_used = time.monotonic()
+
+    def continues(self, history):
+        """True if `history` (oldest first) ends with this session's last turn."""
+        return len(history) >= len(self.turns) and tuple(history[-len(self.turns):]) == self.turns
+
+
+class ConversationCache:
+    """LRU of Sessions bounded by total tensor memory and idle time."""
+
+    def __init__(self, max_bytes, idle_timeout):
+        self.max_bytes = max_bytes
+        self.idle_timeout = idle_timeout
+        self._sessions = collections.OrderedDict()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def pop(self, key):
+        """Remove and return the session for `key` (None if absent)."""
+        self.expire()
+        session = self._sessions.pop(key, None)
+        if session is not None:
+            self.bytes -= session.nbytes
+        return session
+
+    def put(self, key, session):
+        self.pop(key)
+        if session.nbytes > self.max_bytes:
+            return
+        self._sessions[key] = session
+        self.bytes += session.nbytes
+        while self.bytes > self.max_bytes:
+            _, evicted = self._sessions.popitem(last=False)
+            self.bytes -= evicted.nbytes
+            self.evictions += 1
+
+    def expire(self):
+        """Drop sessions idle for longer than the timeout."""
+        cutoff = time.monotonic() - self.idle_timeout
+        while self._sessions:
+            key, session = next(iter(self._sessions.items()))
+            if session.last_used > cutoff:
+                break
+            del self._sessions[key]
+            self.bytes -= session.nbytes
+            self.evictions += 1
+
+    def stats(self):
+        return {
+            'entries': len(self._sessions),
+            'bytes': self.bytes,
+            'max_bytes': self.max_bytes,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+        }
+
+
+def _logits_processors(sampling):
+    from transformers import (
+        LogitsProcessorList, NoRepeatNGramLogitsProcessor, TemperatureLogitsWarper,
+        TopKLogitsWarper, TopPLogitsWarper,
+    )
+
+    # Same order as model.generate: processors first, then warpers
+    return LogitsProcessorList([
+        NoRepeatNGramLogitsProcessor(sampling['no_repeat_ngram_size']),
+        TemperatureLogitsWarper(sampling['temperature']),
+        TopKLogitsWarper(sampling['top_k']),
+        TopPLogitsWarper(sampling['top_p']),
+    ])
+
+
+def _sample(model, ids, past, eos_token_id, sampling, max_new_tokens, deadline, streamer):
+    """
+    Sample a reply after `ids`, feeding the model only the tokens not yet
+    covered by `past`. Returns (reply token ids, all ids, past).
+    """
+    import torch
+
+    processors = _logits_processors(sampling)
+    past_length = past[0][0].shape[2] if past is not None else 0
+    feed = ids[:, past_length:]
+    reply = []
+
+    with torch.no_grad():
+        while len(reply) < max_new_tokens:
+            output = model(input_ids=feed, past_key_values=past, use_cache=True)
+            past = output.past_key_values
+            scores = processors(ids, output.logits[:, -1, :])
+            token = torch.multinomial(torch.softmax(scores, dim=-1), num_samples=1)
+            ids = torch.cat([ids, token], dim=-1)
+            if token.item() == eos_token_id:
+                break
+            reply.append(token.item())
+            if streamer is not None:
+                streamer.put(token)
+            feed = token
+            if deadline is not None and time.time() >= deadline:
+                break
+
+    if streamer is not None:
+        streamer.end()
+    return reply, ids, past
+
+
+def generate_turn(model, tokenizer, cache, key, history, message, sampling,
+                  max_new_tokens, deadline, max_context, streamer=None):
+    """
+    Generate the reply to `message` in the conversation `key`, whose recent
+    history (oldest first, not including `message`) is `history`.
+    Returns (reply, cache_hit).
+    """
+    import torch
+
+    eos = tokenizer.eos_token_id
+    max_new_tokens = max_new_tokens or max_context // 4
+    new_ids = tokenizer.encode(message + tokenizer.eos_token, return_tensors='pt')
+
+    session = cache.pop(key) if key is not None else None
+    hit = (
+        session is not None
+        and session.continues(history)
+        and session.ids.shape[-1] + new_ids.shape[-1] + max_new_tokens <= max_context
+    )
+    if hit:
+        cache.hits += 1
+        ids = torch.cat([session.ids, new_ids], dim=-1)
+        past = session.past
+    else:
+        cache.misses += 1
+        # Re-encode the history window, keeping the most recent tokens that fit
+        history_ids = [token for turn in history for token in tokenizer.encode(turn + tokenizer.eos_token)]
+        room = max(max_context - new_ids.shape[-1] - max_new_tokens, 0)
+        history_ids = history_ids[-room:] if room else []
+        ids = torch.cat([torch.tensor([history_ids], dtype=torch.long), new_ids], dim=-1)
+        past = None
+
+    reply_ids, ids, past = _sample(model, ids, past, eos, sampling, max_new_tokens, deadline, streamer)
+    if ids[0, -1].item() != eos:
+        # Close the turn so the next message starts a new one
+        ids = torch.cat([ids, torch.tensor([[eos]], dtype=torch.long)], dim=-1)
+    reply = tokenizer.decode(reply_ids, skip_special_tokens=True).strip()
+
+    if key is not None:
+        cache.put(key, Session(ids, past, (message, reply)))
+    return reply, hit
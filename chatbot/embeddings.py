@@ -0,0 +1,256 @@
+"""
+Semantic similarity between a user's journal entries.
+
+Entries are encoded by a local sentence-embedding model read from
+EMBEDDING_MODEL_PATH (``models/embeddings``, fetched once with
+``manage.py download_embedding_model``), loaded lazily like the sentiment
+model so importing this module doesn't import torch or transformers. The
+unit-length vectors are stored on the rows as float16 bytes, with the model
+version and time they were computed, so only new, edited or re-modelled
+entries are encoded again; the background worker does this after
+``add_journal`` saves an entry (see ``chatbot/tasks.py``), and
+``manage.py embed_journal`` backfills.
+
+Queries run against a per-user VectorIndex kept in memory: a float16 matrix
+searched with NumPy matrix products (cosine similarity is a dot product of
+unit vectors). Above IVF_MIN_VECTORS entries the index also clusters the
+vectors with k-means and only scores the clusters nearest to the query.
+"""
+import collections
+import logging
+import os
+import threading
+
+import numpy as np
+from django.conf import settings
+from django.db.models import Count, F, Max, Q
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_SIZE = 32
+
+# Above this many vectors a user's index is clustered (IVF)
+IVF_MIN_VECTORS = 4096
+# Clusters scored per query
+IVF_PROBES = 8
+# Rows upcast to float32 at a time when scoring
+SCORE_CHUNK = 8192
+# Users whose index is kept in memory
+MAX_CACHED_INDEXES = 64
+
+_model = None
+_model_lock = threading.Lock()
+
+_indexes = collections.OrderedDict()
+_indexes_lock = threading.Lock()
+
+
+class EmbeddingsUnavailable(Exception):
+    """Raised when the local embedding model can't be loaded."""
+
+
+def load_model(model_path):
+    """(tokenizer, model) from a local directory, offline."""
+    if not os.path.exists(os.path.join(model_path, 'config.json')):
+        raise EmbeddingsUnavailable(
+            f"Embedding model files not found at {model_path}; run `manage.py download_embedding_model`"
+        )
+
+    os.environ['TRANSFORMERS_OFFLINE'] = '1'
+    os.environ['HF_DATASETS_OFFLINE'] = '1'
+    from transformers import AutoModel, AutoTokenizer
+
+    tokenizer = AutoTokenizer.from_pretrained(model_path, local_files_only=True)
+    model = AutoModel.from_pretrained(model_path, local_files_only=True)
+    model.eval()
+    logger.info(f"Loaded embedding model from {model_path}")
+    return tokenizer, model
+
+
+def get_model():
+    """Return the process-wide (tokenizer, model), loading it on first use."""
+    global _model
+    if _model is None:
+        with _model_lock:
+            if _model is None:
+                _model = load_model(settings.EMBEDDING_MODEL_PATH)
+    return _model
+
+
+def model_version():
+    return settings.EMBEDDING_MODEL
+
+
+def encode(texts, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Unit-length float32 embeddings (one row per text, in input order).
+    Texts are sorted by length before batching, so each batch is only
+    padded to its own longest text, and truncated to the model's maximum.
+    """
+    tokenizer, model = get_model()
+    import torch
+
+    texts = list(texts)
+    order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+    vectors = [None] * len(texts)
+    with torch.inference_mode():
+        for start in range(0, len(order), batch_size):
+            batch = order[start:start + batch_size]
+            inputs = tokenizer([texts[i] for i in batch], padding=True, truncation=True, return_tensors='pt')
+            hidden = model(**inputs).last_hidden_state
+            # Mean over the real (non-padding) tokens
+            mask = inputs['attention_mask'].unsqueeze(-1).to(hidden.dtype)
+            pooled = (hidden * mask).sum(dim=1) / mask.sum(dim=1).clamp(min=1e-9)
+            pooled = torch.nn.functional.normalize(pooled, dim=-1)
+            for i, vector in zip(batch, pooled.numpy()):
+                vectors[i] = vector
+    return np.stack(vectors).astype(np.float32) if vectors else np.zeros((0, 0), dtype=np.float32)
+
+
+def to_bytes(vector):
+    return np.asarray(vector, dtype=np.float16).tobytes()
+
+
+def from_bytes(data):
+    return np.frombuffer(data, dtype=np.float16)
+
+
+def stale(queryset):
+    """Journal entries without an embedding from the current model, or edited since"""
+    return queryset.filter(
+        Q(embedding_model__isnull=True)
+        | ~Q(embedding_model=model_version())
+        | Q(embedded_at__lt=F('updated_at'))
+    )
+
+
+def embed_instances(entries, batch_size=DEFAULT_BATCH_SIZE):
+    """Encode and save the given JournalEntry objects with one bulk_update; returns how many."""
+    entries = list(entries)
+    if not entries:
+        return 0
+
+    # Taken before encoding, so an edit saved meanwhile still counts as newer
+    now = timezone.now()
+    vectors = encode([entry.content for entry in entries], batch_size)
+    version = model_version()
+    for entry, vector in zip(entries, vectors):
+        entry.embedding = to_bytes(vector)
+        entry.embedding_model = version
+        entry.embedded_at = now
+    type(entries[0]).objects.bulk_update(entries, ['embedding', 'embedding_model', 'embedded_at'], batch_size=500)
+    return len(entries)
+
+
+class VectorIndex:
+    """Top-k cosine search over unit vectors, exact or clustered (IVF)."""
+
+    def __init__(self, ids, vectors, probes=IVF_PROBES, seed=0):
+        self.ids = np.asarray(ids, dtype=np.int64)
+        self.vectors = np.asarray(vectors, dtype=np.float16)
+        self.probes = probes
+        self.centroids = None
+        self.lists = None
+        if len(self.ids) >= IVF_MIN_VECTORS:
+            self._cluster(int(np.sqrt(len(self.ids))), np.random.default_rng(seed))
+
+    def __len__(self):
+        return len(self.ids)
+
+    def _scores(self, rows, query):
+        """Dot products of `query` with the given rows, upcast in chunks"""
+        scores = np.empty(len(rows), dtype=np.float32)
+        for start in range(0, len(rows), SCORE_CHUNK):
+            chunk = rows[start:start + SCORE_CHUNK]
+            scores[start:start + len(chunk)] = self.vectors[chunk].astype(np.float32) @ query
+        return scores
+
+    def _cluster(self, clusters, rng, iterations=10):
+        """Spherical k-means; lists[c] holds the rows nearest centroid c"""
+        sample = rng.choice(len(self.ids), size=min(len(self.ids), clusters * 64), replace=False)
+        data = self.vectors[sample].astype(np.float32)
+        centroids = data[rng.choice(len(data), size=clusters, replace=False)]
+        for _ in range(iterations):
+            assignment = np.argmax(data @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assignment, data)
+            norms = np.linalg.norm(sums, axis=1, keepdims=True)
+            # Keep the old centroid for clusters that lost all their points
+            centroids = np.where(norms > 0, sums / np.maximum(norms, 1e-9), centroids)
+
+        assignment = np.empty(len(self.ids), dtype=np.int64)
+        for start in range(0, len(self.ids), SCORE_CHUNK):
+            chunk = self.vectors[start:start + SCORE_CHUNK].astype(np.float32)
+            assignment[start:start + len(chunk)] = np.argmax(chunk @ centroids.T, axis=1)
+        self.centroids = centroids
+        order = np.argsort(assignment, kind='stable')
+        bounds = np.searchsorted(assignment[order], np.arange(clusters + 1))
+        self.lists = [order[bounds[c]:bounds[c + 1]] for c in range(clusters)]
+
+    def search(self, query, k=5, exclude=()):
+        """(ids, scores) of the k rows most similar to the unit vector `query`"""
+        query = np.asarray(query, dtype=np.float32)
+        if self.centroids is None:
+            rows = np.arange(len(self.ids))
+        else:
+            nearest = np.argsort(self.centroids @ query)[::-1][:self.probes]
+            rows = np.concatenate([self.lists[c] for c in nearest])
+
+        if len(exclude):
+            rows = rows[~np.isin(self.ids[rows], list(exclude))]
+        if not len(rows):
+            return [], []
+        scores = self._scores(rows, query)
+        k = min(k, len(rows))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return self.ids[rows[top]].tolist(), scores[top].tolist()
+
+
+def get_index(user_id):
+    """The user's VectorIndex, rebuilt when their stored embeddings change"""
+    from .models import JournalEntry
+
+    entries = JournalEntry.objects.filter(user_id=user_id, embedding_model=model_version())
+    signature = tuple(entries.aggregate(count=Count('id'), latest=Max('embedded_at')).values())
+    with _indexes_lock:
+        cached = _indexes.get(user_id)
+        if cached and cached[0] == signature:
+            _indexes.move_to_end(user_id)
+            return cached[1]
+
+    ids, vectors = [], []
+    for entry_id, embedding in entries.order_by('id').values_list('id', 'embedding').iterator():
+        ids.append(entry_id)
+        vectors.append(from_bytes(embedding))
+    index = VectorIndex(ids, np.stack(vectors) if vectors else np.zeros((0, 0), dtype=np.float16))
+
+    with _indexes_lock:
+        _indexes[user_id] = (signature, index)
+        _indexes.move_to_end(user_id)
+        while len(_indexes) > MAX_CACHED_INDEXES:
+            _indexes.popitem(last=False)
+    return index
+
+
+def similar_entries(user_id, entry=None, text=None, k=5):
+    """
+    [(JournalEntry, similarity)] of the user's entries most like `entry`
+    (using its stored vector, excluding itself) or like `text`.
+    """
+    from .models import JournalEntry
+
+    if entry is not None:
+        if entry.embedding is None or entry.embedding_model != model_version():
+            return []
+        query, exclude = from_bytes(entry.embedding), [entry.pk]
+    else:
+        query, exclude = encode([text])[0], []
+
+    index = get_index(user_id)
+    if not len(index):
+        return []
+    ids, scores = index.search(query, k, exclude)
+    entries = JournalEntry.objects.in_bulk(ids)
+    return [(entries[entry_id], score) for entry_id, score in zip(ids, scores) if entry_id in entries]
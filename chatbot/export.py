@@ -0,0 +1,221 @@
+"""
+Exports of a user's full history: mood entries, journal entries, chat
+messages, meditation sessions, wellness goals and goal check-ins.
+
+Records are read with ``.values().iterator(chunk_size=...)`` (a server-side
+cursor on PostgreSQL) and written one line at a time, so memory use doesn't
+depend on how much history a user has. Each record is tagged with its
+``type``:
+
+- NDJSON: one JSON object per line.
+- CSV: one header row with the union of every type's columns, blank where a
+  column doesn't apply.
+
+Either can be gzipped on the fly. The ``/export/`` view streams an export to
+the browser (through ``aexport_chunks()`` under ASGI, where Django would
+read a sync iterator into memory before sending it); ``manage.py export_history`` writes one user's to a file, or
+every user's to a directory with a pool of processes.
+"""
+from concurrent.futures import ProcessPoolExecutor
+import csv
+import datetime
+import io
+import logging
+import os
+import zlib
+
+from asgiref.sync import sync_to_async
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connections
+from django.db.models import F
+
+from .models import ChatMessage, GoalProgress, JournalEntry, MeditationSession, MoodEntry, WellnessGoal
+
+logger = logging.getLogger(__name__)
+
+FORMATS = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv',
+}
+
+# Rows fetched from the database at a time
+CHUNK_SIZE = 2000
+
+
+def _goal_progress(user_id):
+    return GoalProgress.objects.filter(goal__user_id=user_id).values(
+        'id', 'goal_id', 'date', 'progress', 'completed', 'notes'
+    )
+
+
+# type: rows of a user, as values() querysets. Embeddings, model versions and
+# other internal bookkeeping are left out.
+SECTIONS = {
+    'mood': lambda user_id: MoodEntry.objects.filter(user_id=user_id).values(
+        'id', 'created_at', 'mood', 'notes'
+    ),
+    'journal': lambda user_id: JournalEntry.objects.filter(user_id=user_id).values(
+        'id', 'created_at', 'updated_at', 'content', 'sentiment_label', 'sentiment_score'
+    ),
+    'chat': lambda user_id: ChatMessage.objects.filter(user_id=user_id).values(
+        'id', 'created_at', 'is_user', 'message', 'is_error', 'response_time', 'sentiment_label', 'sentiment_score'
+    ),
+    'meditation': lambda user_id: MeditationSession.objects.filter(user_id=user_id).values(
+        'id', 'started_at', 'completed_at', 'duration', 'completed', exercise_name=F('exercise__name')
+    ),
+    'goal': lambda user_id: WellnessGoal.objects.filter(user_id=user_id).values(
+        'id', 'goal_type', 'custom_goal', 'target', 'frequency', 'start_date', 'end_date',
+        'is_active', 'streak_count', 'notes'
+    ),
+    'goal_progress': _goal_progress,
+}
+
+
+def columns():
+    """CSV columns: type, then every section's fields in order of first appearance"""
+    names = ['type']
+    for rows in SECTIONS.values():
+        query = rows(0).query
+        for name in [*query.values_select, *query.annotation_select]:
+            if name not in names:
+                names.append(name)
+    return names
+
+
+def iter_records(user_id, chunk_size=CHUNK_SIZE):
+    """(type, row dict) for every record of the user, section by section in id order"""
+    for kind, rows in SECTIONS.items():
+        for row in rows(user_id).order_by('id').iterator(chunk_size=chunk_size):
+            yield kind, row
+
+
+class ExportJSONEncoder(DjangoJSONEncoder):
+    """
+    DjangoJSONEncoder, but datetimes keep their microseconds (it cuts them
+    to milliseconds), so re-importing an export reproduces the same
+    external ids (see chatbot/importer.py).
+    """
+
+    def default(self, o):
+        if isinstance(o, datetime.datetime):
+            return o.isoformat()
+        return super().default(o)
+
+
+def ndjson_lines(records):
+    encoder = ExportJSONEncoder(ensure_ascii=False)
+    for kind, row in records:
+        yield encoder.encode({'type': kind, **row}) + '\n'
+
+
+def csv_lines(records):
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=columns(), restval='')
+    writer.writeheader()
+    for kind, row in records:
+        writer.writerow({'type': kind, **{
+            name: value.isoformat() if hasattr(value, 'isoformat') else value
+            for name, value in row.items()
+        }})
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    yield buffer.getvalue()
+
+
+def gzip_chunks(chunks, level=6):
+    """Gzip a stream of byte strings incrementally"""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def export_chunks(user_id, export_format='ndjson', compress=False, batch_bytes=64 * 1024):
+    """
+    The user's export as byte strings of about `batch_bytes` each (lines
+    are batched so a response or file isn't written a few bytes at a time).
+    """
+    lines = (ndjson_lines if export_format == 'ndjson' else csv_lines)(iter_records(user_id))
+
+    def batches():
+        batch, size = [], 0
+        for line in lines:
+            data = line.encode()
+            batch.append(data)
+            size += len(data)
+            if size >= batch_bytes:
+                yield b''.join(batch)
+                batch, size = [], 0
+        if batch:
+            yield b''.join(batch)
+
+    return gzip_chunks(batches()) if compress else batches()
+
+
+async def aexport_chunks(user_id, export_format='ndjson', compress=False, batch_bytes=64 * 1024):
+    """
+    export_chunks() as an async iterator, for streaming responses under
+    ASGI. Each chunk is read in the sync thread, so the queries share one
+    connection and only one chunk is in memory at a time.
+    """
+    chunks = export_chunks(user_id, export_format, compress, batch_bytes)
+    next_chunk = sync_to_async(next, thread_sensitive=True)
+    try:
+        while True:
+            chunk = await next_chunk(chunks, None)
+            if chunk is None:
+                return
+            yield chunk
+    finally:
+        # Closes the database cursor too if the client went away early
+        await sync_to_async(chunks.close, thread_sensitive=True)()
+
+
+def filename(user_id, export_format='ndjson', compress=False):
+    return f"wellness-history-{user_id}.{export_format}{'.gz' if compress else ''}"
+
+
+def export_to_file(user_id, path, export_format='ndjson', compress=False):
+    """Write the user's export to `path` (via a temporary file); returns bytes written"""
+    written = 0
+    partial = f'{path}.partial'
+    with open(partial, 'wb') as f:
+        for chunk in export_chunks(user_id, export_format, compress):
+            f.write(chunk)
+            written += len(chunk)
+    os.replace(partial, path)
+    return written
+
+
+def _init_worker():
+    import django
+    django.setup()
+
+
+def _export_user(args):
+    user_id, directory, export_format, compress = args
+    path = os.path.join(directory, filename(user_id, export_format, compress))
+    try:
+        return user_id, export_to_file(user_id, path, export_format, compress), None
+    except Exception as e:
+        logger.exception(f"Export of user {user_id} failed")
+        return user_id, 0, str(e)
+
+
+def export_users(user_ids, directory, export_format='ndjson', compress=False, processes=None):
+    """
+    Export each user to their own file in `directory`, `processes` users at
+    a time; yields (user_id, bytes written, error or None) in order.
+    """
+    os.makedirs(directory, exist_ok=True)
+    # Forked workers must not share the parent's database connections
+    connections.close_all()
+    with ProcessPoolExecutor(max_workers=processes, initializer=_init_worker) as pool:
+        yield from pool.map(
+            _export_user,
+            [(user_id, directory, export_format, compress) for user_id in user_ids],
+            chunksize=8
+        )
@@ -0,0 +1,314 @@
+"""
+Bulk import of mood and journal entries from JSON, NDJSON or CSV files
+(optionally gzipped), into one user's history.
+
+Files are read one record at a time (a JSON array is decoded incrementally),
+validated, and written with ``bulk_create`` in chunks, one transaction each,
+so a large file neither sits in memory nor holds a long lock. Accepted
+records:
+
+- ``{"type": "mood", "mood": "happy", "notes": "...", "created_at": "..."}``
+- ``{"type": "journal", "content": "...", "created_at": "..."}``
+
+``type`` may be left out when the file holds one kind (or inferred from
+``mood``/``content``), ``date`` is accepted for ``created_at`` and naive
+times are taken as local time. This covers this app's own NDJSON/CSV
+exports (other record types in them are skipped), the file journal's
+``journal/<n>.ndjson`` segments (see ``chatbot/journaling.py``) and its
+legacy ``journal_entries.json`` array.
+
+Each row stores an ``external_id``: the record's own, or a hash of its
+kind, time and text. Rows whose external id the user already has are
+skipped, so an interrupted or repeated import can simply be run again.
+Entries saved through the app have no external id; those are matched on
+their time and text instead, so importing a user's own export back adds
+nothing either.
+
+bulk_create doesn't send signals, so the work the signals would do is done
+per chunk (search index) or once at the end (mood rollups, cached replies,
+the dashboard task, which also scores and embeds the new journal entries).
+"""
+from collections import namedtuple
+import csv
+import gzip
+import hashlib
+import json
+import logging
+
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from . import analytics, response_cache, search, tasks
+from .models import JournalEntry, MoodEntry
+
+logger = logging.getLogger(__name__)
+
+FORMATS = ('json', 'ndjson', 'csv')
+
+# kind: (model, search index kind or None)
+KINDS = {
+    'mood': (MoodEntry, None),
+    'journal': (JournalEntry, 'journal'),
+}
+
+# kind: the fields hashed into a generated external id, after created_at
+TEXT_FIELDS = {
+    'mood': ('mood', 'notes'),
+    'journal': ('content',),
+}
+
+MOODS = {value for value, _ in MoodEntry.MOOD_CHOICES}
+
+# Invalid records reported back in detail
+MAX_ERRORS = 20
+
+ImportResult = namedtuple('ImportResult', ['created', 'duplicates', 'skipped', 'invalid', 'errors'])
+
+
+class InvalidRecord(ValueError):
+    pass
+
+
+class UnsupportedRecord(InvalidRecord):
+    """A record of a type this importer doesn't load (e.g. chat in an export)"""
+
+
+def detect_format(path):
+    name = path.lower()
+    if name.endswith('.gz'):
+        name = name[:-3]
+    for extension, file_format in (('.ndjson', 'ndjson'), ('.jsonl', 'ndjson'), ('.csv', 'csv'), ('.json', 'json')):
+        if name.endswith(extension):
+            return file_format
+    raise ValueError(f"Can't tell the format of {path}; pass it explicitly")
+
+
+def open_text(path):
+    if path.lower().endswith('.gz'):
+        return gzip.open(path, 'rt', encoding='utf-8', newline='')
+    return open(path, 'r', encoding='utf-8', newline='')
+
+
+def iter_json_array(f, read_size=64 * 1024):
+    """The elements of a top-level JSON array, decoded one at a time"""
+    decoder = json.JSONDecoder()
+    buffer, position, at_end = '', 0, False
+
+    def read_more():
+        nonlocal buffer, position, at_end
+        more = f.read(read_size)
+        at_end = not more
+        # Drop what has been decoded already
+        buffer, position = buffer[position:] + more, 0
+        return more
+
+    def next_char():
+        """The next non-whitespace character ('' at the end of the file)"""
+        nonlocal position
+        while True:
+            while position < len(buffer) and buffer[position].isspace():
+                position += 1
+            if position < len(buffer):
+                return buffer[position]
+            if not read_more():
+                return ''
+
+    if next_char() != '[':
+        raise InvalidRecord('expected a JSON array')
+    position += 1
+    first = True
+    while True:
+        char = next_char()
+        if char == ']':
+            return
+        if not first:
+            if char != ',':
+                raise InvalidRecord(f'expected "," or "]", found {char!r}')
+            position += 1
+            next_char()
+        first = False
+
+        while True:
+            try:
+                value, end = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError as e:
+                if at_end:
+                    raise InvalidRecord(f'invalid JSON: {e}')
+                read_more()
+                continue
+            # A number ending with the buffer may continue in the next read
+            if end == len(buffer) and not at_end:
+                read_more()
+                continue
+            break
+        yield value
+        position = end
+
+
+def read_records(f, file_format):
+    """Records (dicts) from an open text file"""
+    if file_format == 'ndjson':
+        for line in f:
+            if line.strip():
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError as e:
+                    # Reported like any other invalid record
+                    yield InvalidRecord(f'invalid JSON: {e}')
+    elif file_format == 'csv':
+        for row in csv.DictReader(f):
+            # Blank CSV cells mean "not set"
+            yield {name: value for name, value in row.items() if value not in ('', None)}
+    else:
+        yield from iter_json_array(f)
+
+
+def parse_time(value):
+    if not value:
+        raise InvalidRecord('missing created_at')
+    parsed = parse_datetime(str(value))
+    if parsed is None:
+        raise InvalidRecord(f'invalid created_at: {value!r}')
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
+
+
+def record_text(kind, fields):
+    return '\x00'.join(fields[name] for name in TEXT_FIELDS[kind])
+
+
+def external_id(kind, created_at, text):
+    digest = hashlib.sha1(f'{kind}\x00{created_at.isoformat()}\x00{text}'.encode()).hexdigest()
+    return f'{kind}:{digest}'
+
+
+def parse_record(record, default_kind=None):
+    """(kind, model field values) of a record; raises InvalidRecord"""
+    if isinstance(record, InvalidRecord):
+        raise record
+    if not isinstance(record, dict):
+        raise InvalidRecord('not an object')
+    kind = record.get('type') or default_kind or (
+        'journal' if 'content' in record else 'mood' if 'mood' in record else None
+    )
+    if kind is None:
+        raise InvalidRecord('no type, mood or content')
+    if kind not in KINDS:
+        raise UnsupportedRecord(f'unsupported type: {kind!r}')
+    created_at = parse_time(record.get('created_at') or record.get('date'))
+
+    if kind == 'mood':
+        mood = record.get('mood')
+        if mood not in MOODS:
+            raise InvalidRecord(f'invalid mood: {mood!r}')
+        notes = str(record.get('notes') or '')
+        fields = {'mood': mood, 'notes': notes}
+    else:
+        content = record.get('content')
+        if not isinstance(content, str) or not content.strip():
+            raise InvalidRecord('missing content')
+        fields = {'content': content}
+
+    given = record.get('external_id')
+    if given is not None and not 0 < len(str(given)) <= 64:
+        raise InvalidRecord('external_id must be 1-64 characters')
+    fields['created_at'] = created_at
+    fields['external_id'] = str(given) if given is not None else external_id(kind, created_at, record_text(kind, fields))
+    return kind, fields
+
+
+def write_chunk(user, kind, rows):
+    """Create the rows the user doesn't have yet in one transaction; returns how many"""
+    model, search_kind = KINDS[kind]
+    with transaction.atomic():
+        existing = set(model.objects.filter(
+            user=user, external_id__in=[row['external_id'] for row in rows]
+        ).values_list('external_id', flat=True))
+        # Rows saved through the app have no external id: match on time and text
+        saved = {
+            (values['created_at'], record_text(kind, values))
+            for values in model.objects.filter(
+                user=user, external_id__isnull=True,
+                created_at__in=[row['created_at'] for row in rows if row['external_id'] not in existing]
+            ).values('created_at', *TEXT_FIELDS[kind])
+        }
+        new = []
+        for row in rows:
+            if row['external_id'] not in existing and (row['created_at'], record_text(kind, row)) not in saved:
+                existing.add(row['external_id'])
+                new.append(model(user=user, **row))
+        model.objects.bulk_create(new)
+
+        if search_kind and new:
+            if new[0].pk is None:
+                # The backend doesn't return ids from bulk inserts
+                ids = dict(model.objects.filter(
+                    user=user, external_id__in=[obj.external_id for obj in new]
+                ).values_list('external_id', 'id'))
+                for obj in new:
+                    obj.pk = ids[obj.external_id]
+            try:
+                search.index_rows(
+                    [(search_kind, obj.pk, user.id, obj.created_at, obj.content) for obj in new],
+                    replace=False
+                )
+            except search.SearchUnavailable:
+                pass
+    return len(new)
+
+
+def import_records(user, records, default_kind=None, chunk_size=500, dry_run=False, progress=None):
+    """
+    Validate and import records into the user's history, `chunk_size` rows
+    per transaction. progress(records read) is called after each chunk.
+    """
+    created, duplicates, skipped, invalid, errors = 0, 0, 0, 0, []
+    pending = {kind: [] for kind in KINDS}
+    read = 0
+
+    def flush(kind):
+        nonlocal created, duplicates
+        rows = pending[kind]
+        if rows and not dry_run:
+            written = write_chunk(user, kind, rows)
+            created += written
+            duplicates += len(rows) - written
+        pending[kind] = []
+
+    for read, record in enumerate(records, 1):
+        try:
+            kind, fields = parse_record(record, default_kind)
+        except UnsupportedRecord:
+            skipped += 1
+            continue
+        except InvalidRecord as e:
+            invalid += 1
+            if len(errors) < MAX_ERRORS:
+                errors.append(f'record {read}: {e}')
+            continue
+        pending[kind].append(fields)
+        if len(pending[kind]) >= chunk_size:
+            flush(kind)
+            if progress:
+                progress(read)
+    for kind in KINDS:
+        flush(kind)
+    if progress:
+        progress(read)
+
+    if created:
+        analytics.rebuild_rollups([user.id])
+        for kind in KINDS:
+            response_cache.invalidate(user.id, kind)
+        tasks.enqueue(user.id, 'dashboard')
+        logger.info(f"Imported {created} rows for user {user.id}")
+    return ImportResult(created, duplicates, skipped, invalid, errors)
+
+
+def import_file(user, path, file_format=None, **kwargs):
+    """import_records over a file on disk"""
+    file_format = file_format or detect_format(path)
+    with open_text(path) as f:
+        return import_records(user, read_records(f, file_format), **kwargs)
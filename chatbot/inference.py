@@ -0,0 +1,914 @@
+"""
+Out-of-process inference for the local DialoGPT model.
+
+A pool of worker processes each hold a copy of the model and pull generation
+jobs from their own queue. Web threads submit a job and wait on a future with a
+deadline, so generation concurrency is bounded by the pool size instead of by
+the number of gunicorn threads, and slow generations no longer block every
+other page.
+
+Each worker micro-batches: after taking a job off the queue it keeps
+collecting jobs for up to ``INFERENCE_BATCH_WINDOW_MS`` (or until
+``INFERENCE_MAX_BATCH_SIZE`` jobs are waiting), left-pads the prompts and runs
+them through a single ``model.generate`` call.
+
+Every job carries a generation budget (see ``GENERATION_BUDGETS`` in the
+settings): a cap on new tokens and a wall-clock deadline. Generation stops
+cleanly at the deadline and the partial reply is returned, which bounds the
+tail latency of the views that wait on it.
+
+Streaming jobs run on their own (unbatched) and send each decoded piece of
+text back as soon as the model produces it, so the chat view can forward
+tokens to the browser and time-to-first-token stays low.
+
+Chat turns carry a conversation (a key and the recent history) and are
+routed to the same worker every time, which keeps the conversation's
+``past_key_values`` in a memory-bounded LRU (see ``chatbot/conversation.py``)
+so that the next turn only runs the model over the new tokens.
+
+Async views use ``agenerate_text()`` / ``astream_text()``, which await the
+same futures from the event loop instead of parking a thread on them.
+
+Set ``INFERENCE_WORKERS=0`` to generate in the calling thread instead (handy
+for ``runserver`` and debugging).
+
+Under gunicorn (see ``gunicorn.conf.py``) the master process preloads the
+weights once via ``preload_model()`` so that forked web workers, and the
+inference workers they fork in turn, share them copy-on-write. Every worker
+runs a short dummy generation before taking jobs and reports readiness, which
+``/health/`` exposes.
+"""
+import asyncio
+import bisect
+import collections
+import itertools
+import logging
+import multiprocessing
+import os
+import queue
+import threading
+import time
+import zlib
+# The builtin TimeoutError only from Python 3.11
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+
+from django.conf import settings
+
+from . import model_backends
+from .conversation import ConversationCache, generate_turn
+
+logger = logging.getLogger(__name__)
+
+# Sampling parameters shared by every generation path
+GENERATION_KWARGS = {
+    'no_repeat_ngram_size': 3,
+    'do_sample': True,
+    'top_k': 100,
+    'top_p': 0.7,
+    'temperature': 0.8,
+}
+
+# Histogram bucket upper bounds
+LATENCY_BUCKETS_MS = [10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000, 60000]
+BATCH_SIZE_BUCKETS = [1, 2, 4, 8, 16, 32]
+
+# Prompt and length of the dummy generation run while warming up
+WARMUP_PROMPT = "Hello, how are you today?"
+WARMUP_MAX_NEW_TOKENS = 8
+
+# Seconds a caller waits past the job deadline for the (partial) reply to
+# be decoded and sent back
+RESULT_GRACE = 2.0
+
+# `conversation` is None or a (key, history) pair for chat turns
+Job = collections.namedtuple(
+    'Job', ['job_id', 'prompt', 'max_new_tokens', 'deadline', 'enqueued_at', 'stream', 'conversation']
+)
+
+# Weights loaded in the gunicorn master, inherited by forked children
+_preloaded = {}
+
+
+class InferenceError(Exception):
+    """Raised when a generation job cannot be completed."""
+
+
+class InferenceBusy(InferenceError):
+    """Raised when the job queue is full and the request should fall back."""
+
+
+def load_model(model_path, backend=None):
+    """
+    Load the DialoGPT model and tokenizer from a local directory, optimized
+    for `backend` (default: settings.INFERENCE_BACKEND, see model_backends).
+    Returns (model, tokenizer), or (None, None) if the files are missing.
+    """
+    backend = backend or settings.INFERENCE_BACKEND
+    if backend not in model_backends.BACKENDS:
+        raise ValueError(f"Unknown inference backend {backend!r}, expected one of {model_backends.BACKENDS}")
+
+    # Set environment variables for offline mode
+    os.environ['TRANSFORMERS_OFFLINE'] = '1'
+    os.environ['HF_DATASETS_OFFLINE'] = '1'
+
+    if not os.path.exists(os.path.join(model_path, 'config.json')):
+        logger.warning(f"Model files not found at {model_path}. Using fallback responses.")
+        return None, None
+
+    # Imported here so that web processes which only talk to the pool never
+    # pay the torch/transformers import cost.
+    from transformers import AutoModelForCausalLM, AutoTokenizer
+
+    tokenizer = AutoTokenizer.from_pretrained(model_path, local_files_only=True)
+    # Batched prompts are left-padded so that every row ends at the same
+    # position and generation continues right after the real prompt.
+    tokenizer.padding_side = 'left'
+    tokenizer.pad_token = tokenizer.eos_token
+    model = model_backends.load_int8(model_path) if backend == 'int8' else None
+    if model is None:
+        model = AutoModelForCausalLM.from_pretrained(model_path, local_files_only=True)
+        if backend == 'int8':
+            logger.warning(
+                f"No cached int8 model in {model_backends.artifact_dir(model_path, 'int8')}, quantizing at "
+                f"startup; run `manage.py build_inference_model --backend int8` to cache it"
+            )
+            model = model_backends.quantize_int8(model)
+        elif backend == 'compiled':
+            model = model_backends.compile_model(model, model_path)
+    model.eval()
+    logger.info(f"Successfully loaded DialoGPT model from {model_path} ({backend})")
+    return model, tokenizer
+
+
+def preload_model(model_path):
+    """
+    Load the weights once in the current process so that processes forked
+    from it reuse them instead of loading their own copy.
+    """
+    if model_path not in _preloaded:
+        try:
+            _preloaded[model_path] = load_model(model_path)
+        except Exception as e:
+            # Workers will retry loading on their own
+            logger.error(f"Error preloading DialoGPT model: {str(e)}")
+            return None, None
+    return _preloaded[model_path]
+
+
+def get_model(model_path):
+    """Return the preloaded (model, tokenizer) if available, else load them."""
+    if model_path in _preloaded:
+        return _preloaded[model_path]
+    return load_model(model_path)
+
+
+def warm_up_model(model, tokenizer):
+    """
+    Run a short dummy generation so the first real request doesn't pay for
+    lazy buffer allocation.
+    """
+    generate_batch(model, tokenizer, [WARMUP_PROMPT], max_new_tokens=WARMUP_MAX_NEW_TOKENS)
+
+
+def make_streamer(tokenizer, on_text, skip_prompt=True):
+    """Build a streamer that calls on_text() with each newly decoded chunk."""
+    from transformers import TextStreamer
+
+    class CallbackStreamer(TextStreamer):
+        def on_finalized_text(self, text, stream_end=False):
+            if text:
+                on_text(text)
+
+    return CallbackStreamer(tokenizer, skip_prompt=skip_prompt, skip_special_tokens=True)
+
+
+def generate_batch(model, tokenizer, prompts, max_new_tokens=None, deadline=None, on_text=None):
+    """
+    Run one batched generation and return the decoded replies in order.
+    Generation stops after `max_new_tokens` or at the `deadline` wall-clock
+    time, whichever comes first, keeping whatever was generated so far.
+    With `on_text` (single prompt only) decoded text is also passed to the
+    callback as it is generated.
+    """
+    import torch
+    from transformers import MaxTimeCriteria, StoppingCriteriaList
+
+    options = dict(GENERATION_KWARGS)
+    if max_new_tokens:
+        options['max_new_tokens'] = max_new_tokens
+    else:
+        options['max_length'] = 1000
+    if deadline is not None:
+        now = time.time()
+        options['stopping_criteria'] = StoppingCriteriaList([
+            MaxTimeCriteria(max(deadline - now, 0), initial_timestamp=now)
+        ])
+    if on_text is not None:
+        options['streamer'] = make_streamer(tokenizer, on_text)
+
+    inputs = tokenizer(
+        [prompt + tokenizer.eos_token for prompt in prompts],
+        return_tensors='pt',
+        padding=True,
+    )
+    with torch.no_grad():
+        response_ids = model.generate(
+            inputs['input_ids'],
+            attention_mask=inputs['attention_mask'],
+            pad_token_id=tokenizer.eos_token_id,
+            **options
+        )
+    prompt_length = inputs['input_ids'].shape[-1]
+    return tokenizer.batch_decode(response_ids[:, prompt_length:], skip_special_tokens=True)
+
+
+def _collect_batch(jobs, first_job, max_batch_size, window):
+    """
+    Gather jobs that arrive within `window` seconds of the first one.
+    Returns (batch, stop) where stop is True if the shutdown sentinel was seen.
+    """
+    batch = [first_job]
+    until = time.monotonic() + window
+    while len(batch) < max_batch_size:
+        remaining = until - time.monotonic()
+        if remaining <= 0:
+            break
+        try:
+            job = jobs.get(timeout=remaining)
+        except queue.Empty:
+            break
+        if job is None:
+            return batch, True
+        batch.append(job)
+    return batch, False
+
+
+def _worker_main(worker_id, model_path, options, jobs, results):
+    """
+    Entry point of an inference worker process. `options` holds num_threads,
+    max_batch_size, batch_window (seconds), kv_cache_bytes,
+    kv_cache_idle_timeout and max_context_tokens.
+    """
+    cache = ConversationCache(options['kv_cache_bytes'], options['kv_cache_idle_timeout'])
+    try:
+        import torch
+
+        if options['num_threads']:
+            torch.set_num_threads(options['num_threads'])
+        model, tokenizer = get_model(model_path)
+        if model is not None:
+            warm_up_model(model, tokenizer)
+    except Exception as e:
+        logger.error(f"Inference worker {worker_id} failed to load model: {str(e)}")
+        model, tokenizer = None, None
+    results.put((None, 'ready', worker_id, {'model_loaded': model is not None}))
+
+    stop = False
+    while not stop:
+        try:
+            job = jobs.get(timeout=options['kv_cache_idle_timeout'])
+        except queue.Empty:
+            # Free the memory of conversations that have gone quiet
+            cache.expire()
+            continue
+        if job is None:
+            break
+        batch, stop = _collect_batch(jobs, job, options['max_batch_size'], options['batch_window'])
+
+        # Jobs with the same token budget share a generate call; they were
+        # queued within one batching window, so their deadlines are close
+        # and the batch stops at the earliest one. Streaming jobs and chat
+        # turns (which reuse their conversation's KV cache) run alone.
+        groups = collections.defaultdict(list)
+        for job in batch:
+            if time.time() >= job.deadline:
+                # The caller has already given up on this job
+                results.put((job.job_id, 'expired', None, {}))
+            elif model is None:
+                results.put((job.job_id, 'error', 'Model is not available', {}))
+            elif job.stream or job.conversation is not None:
+                groups[('single', job.job_id)].append(job)
+            else:
+                groups[job.max_new_tokens].append(job)
+
+        for group in groups.values():
+            if group[0].conversation is not None:
+                _run_turn(model, tokenizer, cache, group[0], worker_id, options['max_context_tokens'], results)
+            else:
+                _run_group(model, tokenizer, group, results)
+
+
+def _token_callback(job, results):
+    """Callback sending a streaming job's text back as it is generated."""
+    if not job.stream:
+        return None
+
+    def on_text(text):
+        results.put((job.job_id, 'token', text, {}))
+    return on_text
+
+
+def _run_group(model, tokenizer, group, results):
+    """Generate one batch of jobs and send each reply back."""
+    started = time.time()
+    deadline = min(job.deadline for job in group)
+    try:
+        replies = generate_batch(
+            model, tokenizer, [job.prompt for job in group],
+            max_new_tokens=group[0].max_new_tokens, deadline=deadline,
+            on_text=_token_callback(group[0], results),
+        )
+    except Exception as e:
+        for job in group:
+            results.put((job.job_id, 'error', str(e), {}))
+        return
+
+    finished = time.time()
+    for job, reply in zip(group, replies):
+        results.put((job.job_id, 'done', reply, {
+            'batch_size': len(group),
+            'queue_wait_ms': (started - job.enqueued_at) * 1000,
+            'generation_ms': (finished - started) * 1000,
+            'truncated': finished >= deadline,
+        }))
+
+
+def _run_turn(model, tokenizer, cache, job, worker_id, max_context, results):
+    """Generate a chat turn, reusing the conversation's cached keys/values."""
+    started = time.time()
+    key, history = job.conversation
+    on_text = _token_callback(job, results)
+    try:
+        reply, hit = generate_turn(
+            model, tokenizer, cache, key, history, job.prompt, GENERATION_KWARGS,
+            job.max_new_tokens, job.deadline, max_context,
+            streamer=make_streamer(tokenizer, on_text, skip_prompt=False) if on_text else None,
+        )
+    except Exception as e:
+        results.put((job.job_id, 'error', str(e), {}))
+        return
+
+    finished = time.time()
+    results.put((job.job_id, 'done', reply, {
+        'batch_size': 1,
+        'queue_wait_ms': (started - job.enqueued_at) * 1000,
+        'generation_ms': (finished - started) * 1000,
+        'truncated': finished >= job.deadline,
+        'kv_cache': 'hit' if hit else 'miss',
+        'worker': worker_id,
+        'kv_cache_stats': cache.stats(),
+    }))
+
+
+class Histogram:
+    """Fixed-bucket histogram; each bucket counts values <= its bound."""
+
+    def __init__(self, bounds):
+        self.bounds = list(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.total += value
+
+    def percentile(self, q):
+        """Upper bound of the bucket containing the q-th percentile."""
+        if not self.count:
+            return None
+        rank = q / 100 * self.count
+        seen = 0
+        for bound, count in zip(self.bounds + [float('inf')], self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return float('inf')
+
+    def as_dict(self):
+        labels = [str(bound) for bound in self.bounds] + ['+Inf']
+        return {
+            'buckets': dict(zip(labels, self.counts)),
+            'count': self.count,
+            'mean': self.total / self.count if self.count else None,
+            'p50': self.percentile(50),
+            'p95': self.percentile(95),
+        }
+
+
+class InferenceStats:
+    """Batch-size and latency histograms for tuning the batching window."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.batch_size = Histogram(BATCH_SIZE_BUCKETS)
+        self.queue_wait_ms = Histogram(LATENCY_BUCKETS_MS)
+        self.generation_ms = Histogram(LATENCY_BUCKETS_MS)
+        self.latency_ms = Histogram(LATENCY_BUCKETS_MS)
+        self.first_token_ms = Histogram(LATENCY_BUCKETS_MS)
+        self.errors = 0
+        self.truncated = 0
+        self.kv_cache_hits = 0
+        self.kv_cache_misses = 0
+        # Latest cache size/eviction figures reported by each worker
+        self.kv_cache_workers = {}
+
+    def record(self, latency_ms, meta):
+        with self._lock:
+            self.latency_ms.observe(latency_ms)
+            if meta.get('truncated'):
+                self.truncated += 1
+            if 'kv_cache' in meta:
+                if meta['kv_cache'] == 'hit':
+                    self.kv_cache_hits += 1
+                else:
+                    self.kv_cache_misses += 1
+                self.kv_cache_workers[meta['worker']] = meta['kv_cache_stats']
+            if 'batch_size' in meta:
+                self.batch_size.observe(meta['batch_size'])
+                self.queue_wait_ms.observe(meta['queue_wait_ms'])
+                self.generation_ms.observe(meta['generation_ms'])
+
+    def record_first_token(self, latency_ms):
+        with self._lock:
+            self.first_token_ms.observe(latency_ms)
+
+    def record_error(self):
+        with self._lock:
+            self.errors += 1
+
+    def as_dict(self):
+        with self._lock:
+            return {
+                'first_token_ms': self.first_token_ms.as_dict(),
+                'batch_size': self.batch_size.as_dict(),
+                'queue_wait_ms': self.queue_wait_ms.as_dict(),
+                'generation_ms': self.generation_ms.as_dict(),
+                'latency_ms': self.latency_ms.as_dict(),
+                'errors': self.errors,
+                'truncated': self.truncated,
+                'kv_cache': {
+                    'hits': self.kv_cache_hits,
+                    'misses': self.kv_cache_misses,
+                    'workers': dict(self.kv_cache_workers),
+                },
+            }
+
+
+class InferencePool:
+    """A fixed-size pool of model-holding worker processes."""
+
+    def __init__(self, workers, model_path, queue_size=32, threads_per_worker=0,
+                 max_batch_size=8, batch_window_ms=20, kv_cache_bytes=256 * 1024 * 1024,
+                 kv_cache_idle_timeout=600, max_context_tokens=768):
+        self.workers = workers
+        self.model_path = model_path
+        self.queue_size = queue_size
+        if not threads_per_worker:
+            threads_per_worker = max(1, (os.cpu_count() or 1) // workers)
+        self.threads_per_worker = threads_per_worker
+        self.max_batch_size = max(1, max_batch_size)
+        self.batch_window_ms = batch_window_ms
+        self.kv_cache_bytes = kv_cache_bytes
+        self.kv_cache_idle_timeout = kv_cache_idle_timeout
+        self.max_context_tokens = max_context_tokens
+        self.stats = InferenceStats()
+
+        self._ids = itertools.count()
+        self._next_queue = itertools.count()
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._processes = []
+        self._ready = {}
+        self._started = False
+
+    def start(self):
+        methods = multiprocessing.get_all_start_methods()
+        self._ctx = multiprocessing.get_context('fork' if 'fork' in methods else 'spawn')
+        # One queue per worker so that a conversation's turns always reach
+        # the worker holding its KV cache; the total stays queue_size.
+        per_worker = max(1, -(-self.queue_size // self.workers))
+        self._queues = [self._ctx.Queue(per_worker) for _ in range(self.workers)]
+        self._results = self._ctx.Queue()
+
+        for worker_id in range(self.workers):
+            self._processes.append(self._spawn(worker_id))
+
+        self._dispatcher = threading.Thread(target=self._dispatch, name='inference-dispatcher', daemon=True)
+        self._dispatcher.start()
+        self._started = True
+        logger.info(
+            f"Started {self.workers} inference workers ({self.threads_per_worker} threads each, "
+            f"batches of up to {self.max_batch_size} over {self.batch_window_ms} ms)"
+        )
+
+    def _spawn(self, worker_id):
+        process = self._ctx.Process(
+            target=_worker_main,
+            args=(
+                worker_id, self.model_path,
+                {
+                    'num_threads': self.threads_per_worker,
+                    'max_batch_size': self.max_batch_size,
+                    'batch_window': self.batch_window_ms / 1000,
+                    'kv_cache_bytes': self.kv_cache_bytes,
+                    'kv_cache_idle_timeout': self.kv_cache_idle_timeout,
+                    'max_context_tokens': self.max_context_tokens,
+                },
+                self._queues[worker_id], self._results,
+            ),
+            name=f'inference-worker-{worker_id}',
+            daemon=True,
+        )
+        process.start()
+        return process
+
+    def _dispatch(self):
+        """Route results from the workers back to the waiting futures."""
+        while True:
+            try:
+                job_id, status, payload, meta = self._results.get(timeout=1)
+            except queue.Empty:
+                self._replace_dead_workers()
+                continue
+            except (EOFError, OSError):
+                break
+
+            if status == 'ready':
+                self._ready[payload] = meta['model_loaded']
+                continue
+
+            if status == 'token':
+                with self._lock:
+                    future = self._pending.get(job_id)
+                if future is not None and future.on_text is not None:
+                    if not future.first_token_at:
+                        future.first_token_at = time.time()
+                        self.stats.record_first_token((future.first_token_at - future.submitted_at) * 1000)
+                    future.on_text(payload)
+                continue
+
+            with self._lock:
+                future = self._pending.pop(job_id, None)
+            if future is None or future.done():
+                continue
+            if status == 'done':
+                self.stats.record((time.time() - future.submitted_at) * 1000, meta)
+                future.set_result(payload)
+            else:
+                self.stats.record_error()
+                future.set_exception(InferenceError(payload or status))
+
+    def _replace_dead_workers(self):
+        for worker_id, process in enumerate(self._processes):
+            if not process.is_alive():
+                logger.warning(f"Inference worker {worker_id} exited with code {process.exitcode}, restarting")
+                self._ready.pop(worker_id, None)
+                self._processes[worker_id] = self._spawn(worker_id)
+
+    def _queue_for(self, conversation):
+        """
+        The queue of the worker owning `conversation`, else the shortest
+        queue (round-robin where queue sizes aren't available).
+        """
+        if conversation is not None and conversation[0] is not None:
+            worker_id = zlib.crc32(str(conversation[0]).encode()) % self.workers
+            return self._queues[worker_id]
+        try:
+            return min(self._queues, key=lambda jobs: jobs.qsize())
+        except NotImplementedError:
+            return self._queues[next(self._next_queue) % self.workers]
+
+    def submit(self, prompt, max_new_tokens, deadline, on_text=None, conversation=None):
+        """
+        Queue a generation job and return a Future for its text. With
+        `on_text` the job is streamed and the callback receives each chunk
+        (on the dispatcher thread) before the future completes.
+        `conversation` is a (key, history) pair for chat turns; history
+        lists the recent messages oldest first, without `prompt`.
+        """
+        future = Future()
+        job_id = future.job_id = next(self._ids)
+        future.submitted_at = time.time()
+        future.first_token_at = None
+        future.on_text = on_text
+        with self._lock:
+            self._pending[job_id] = future
+        try:
+            self._queue_for(conversation).put_nowait(Job(
+                job_id, prompt, max_new_tokens, deadline, future.submitted_at, on_text is not None,
+                conversation,
+            ))
+        except queue.Full:
+            with self._lock:
+                self._pending.pop(job_id, None)
+            self.stats.record_error()
+            future.set_exception(InferenceBusy('Inference queue is full'))
+        return future
+
+    def forget(self, future):
+        """Drop a future the caller stopped waiting for."""
+        with self._lock:
+            self._pending.pop(getattr(future, 'job_id', None), None)
+
+    def status(self):
+        """
+        'warming' until a worker has finished warming up, then 'ready'
+        ('degraded' if no worker could load the model).
+        """
+        if any(self._ready.values()):
+            return 'ready'
+        if len(self._ready) < self.workers:
+            return 'warming'
+        return 'degraded'
+
+    def get_stats(self):
+        stats = self.stats.as_dict()
+        stats.update({
+            'backend': 'pool',
+            'status': self.status(),
+            'workers': self.workers,
+            'ready_workers': sum(1 for loaded in self._ready.values() if loaded),
+            'alive_workers': sum(1 for process in self._processes if process.is_alive()),
+            'max_batch_size': self.max_batch_size,
+            'batch_window_ms': self.batch_window_ms,
+            'kv_cache_bytes_per_worker': self.kv_cache_bytes,
+            'pending': len(self._pending),
+        })
+        return stats
+
+    def shutdown(self):
+        for jobs in self._queues:
+            try:
+                jobs.put_nowait(None)
+            except queue.Full:
+                pass
+        for process in self._processes:
+            process.join(timeout=5)
+            if process.is_alive():
+                process.terminate()
+        self._processes = []
+        self._started = False
+
+
+class LocalBackend:
+    """Generate in the calling thread; used when INFERENCE_WORKERS is 0."""
+
+    def __init__(self, model_path, kv_cache_bytes=256 * 1024 * 1024, kv_cache_idle_timeout=600,
+                 max_context_tokens=768):
+        self.model_path = model_path
+        self.model = None
+        self.tokenizer = None
+        self.cache = ConversationCache(kv_cache_bytes, kv_cache_idle_timeout)
+        self.max_context_tokens = max_context_tokens
+        self.stats = InferenceStats()
+        self._lock = threading.Lock()
+        self._status = 'warming'
+
+    def start(self):
+        """
+        Load and warm up the model, once: a failure is logged and leaves the
+        backend 'degraded' (submit then fails fast) rather than being retried
+        by every request.
+        """
+        with self._lock:
+            if self._status != 'warming':
+                return
+            try:
+                self.model, self.tokenizer = get_model(self.model_path)
+                if self.model is not None:
+                    warm_up_model(self.model, self.tokenizer)
+            except Exception as e:
+                logger.error(f"Error loading DialoGPT model: {str(e)}")
+                self.model = self.tokenizer = None
+            self._status = 'ready' if self.model is not None else 'degraded'
+
+    def status(self):
+        return self._status
+
+    def submit(self, prompt, max_new_tokens, deadline, on_text=None, conversation=None):
+        future = Future()
+        started = time.time()
+        try:
+            self.start()
+            if self.model is None:
+                raise InferenceError('Model is not available')
+            meta = {}
+            with self._lock:
+                if conversation is not None:
+                    key, history = conversation
+                    streamer = make_streamer(self.tokenizer, on_text, skip_prompt=False) if on_text else None
+                    reply, hit = generate_turn(
+                        self.model, self.tokenizer, self.cache, key, history, prompt, GENERATION_KWARGS,
+                        max_new_tokens, deadline, self.max_context_tokens, streamer=streamer,
+                    )
+                    meta = {'kv_cache': 'hit' if hit else 'miss', 'worker': 0, 'kv_cache_stats': self.cache.stats()}
+                else:
+                    reply = generate_batch(
+                        self.model, self.tokenizer, [prompt],
+                        max_new_tokens=max_new_tokens, deadline=deadline, on_text=on_text,
+                    )[0]
+            meta['truncated'] = time.time() >= deadline
+            self.stats.record((time.time() - started) * 1000, meta)
+            future.set_result(reply)
+        except Exception as e:
+            self.stats.record_error()
+            future.set_exception(e)
+        return future
+
+    def forget(self, future):
+        pass
+
+    def get_stats(self):
+        stats = self.stats.as_dict()
+        stats['backend'] = 'local'
+        stats['status'] = self.status()
+        return stats
+
+    def shutdown(self):
+        pass
+
+
+_backend = None
+_backend_pid = None
+_backend_lock = threading.Lock()
+
+
+def get_backend():
+    """Return this process's inference backend, starting it on first use."""
+    global _backend, _backend_pid
+
+    # A backend inherited across fork (e.g. gunicorn --preload) is not usable
+    # in the child, so each process builds its own.
+    if _backend is not None and _backend_pid == os.getpid():
+        return _backend
+
+    with _backend_lock:
+        if _backend is None or _backend_pid != os.getpid():
+            workers = settings.INFERENCE_WORKERS
+            if workers > 0:
+                backend = InferencePool(
+                    workers,
+                    settings.CHATBOT_MODEL_PATH,
+                    queue_size=settings.INFERENCE_QUEUE_SIZE,
+                    threads_per_worker=settings.INFERENCE_THREADS_PER_WORKER,
+                    max_batch_size=settings.INFERENCE_MAX_BATCH_SIZE,
+                    batch_window_ms=settings.INFERENCE_BATCH_WINDOW_MS,
+                    kv_cache_bytes=settings.KV_CACHE_MAX_BYTES,
+                    kv_cache_idle_timeout=settings.KV_CACHE_IDLE_TIMEOUT,
+                    max_context_tokens=settings.CHAT_CONTEXT_TOKENS,
+                )
+            else:
+                backend = LocalBackend(
+                    settings.CHATBOT_MODEL_PATH,
+                    kv_cache_bytes=settings.KV_CACHE_MAX_BYTES,
+                    kv_cache_idle_timeout=settings.KV_CACHE_IDLE_TIMEOUT,
+                    max_context_tokens=settings.CHAT_CONTEXT_TOKENS,
+                )
+            backend.start()
+            _backend, _backend_pid = backend, os.getpid()
+    return _backend
+
+
+def warm_up():
+    """
+    Start this process's backend in the background; the pool workers load
+    and warm up the model themselves. Called from gunicorn's worker hook
+    and from the ASGI entry point.
+    """
+    threading.Thread(target=get_backend, name='inference-warmup', daemon=True).start()
+
+
+def get_status():
+    """Readiness of this process's backend without starting it."""
+    if _backend is None or _backend_pid != os.getpid():
+        return 'cold'
+    return _backend.status()
+
+
+def get_budget(name):
+    """
+    Return the generation budget for an endpoint as a dict with
+    'max_new_tokens' and 'max_time' (seconds, including queue wait).
+    """
+    budget = {'max_new_tokens': None, 'max_time': settings.INFERENCE_TIMEOUT}
+    budget.update(settings.GENERATION_BUDGETS.get(name, {}))
+    return budget
+
+
+def generate_text(prompt, budget='default', max_new_tokens=None, max_time=None, conversation=None):
+    """
+    Submit a prompt to the inference backend and wait for the reply.
+    `budget` names an entry of GENERATION_BUDGETS; `max_new_tokens` and
+    `max_time` override it for this call. `conversation` is a (key,
+    history) pair for chat turns (see InferencePool.submit). The reply may
+    be cut short at the deadline. Raises InferenceError (or TimeoutError)
+    if no reply arrives at all.
+    """
+    limits = get_budget(budget)
+    if max_new_tokens is not None:
+        limits['max_new_tokens'] = max_new_tokens
+    if max_time is not None:
+        limits['max_time'] = max_time
+
+    backend = get_backend()
+    deadline = time.time() + limits['max_time']
+    future = backend.submit(prompt, limits['max_new_tokens'], deadline, conversation=conversation)
+    try:
+        return future.result(timeout=limits['max_time'] + RESULT_GRACE)
+    except FutureTimeoutError:
+        backend.forget(future)
+        raise TimeoutError('No reply before the generation deadline')
+
+
+def stream_text(prompt, budget='default', conversation=None):
+    """
+    Generate a reply for `prompt`, yielding chunks of text as they are
+    produced. Raises InferenceError (or TimeoutError) like generate_text.
+    """
+    limits = get_budget(budget)
+    chunks = queue.Queue()
+    done = object()
+
+    backend = get_backend()
+    deadline = time.time() + limits['max_time']
+    future = backend.submit(
+        prompt, limits['max_new_tokens'], deadline, on_text=chunks.put, conversation=conversation
+    )
+    future.add_done_callback(lambda _: chunks.put(done))
+    try:
+        while True:
+            remaining = deadline + RESULT_GRACE - time.time()
+            try:
+                chunk = chunks.get(timeout=max(remaining, 0))
+            except queue.Empty:
+                raise TimeoutError('No reply before the generation deadline')
+            if chunk is done:
+                break
+            yield chunk
+    finally:
+        if not future.done():
+            backend.forget(future)
+    # Re-raise a failed generation
+    future.result()
+
+
+async def _asubmit(prompt, limits, on_text=None, conversation=None):
+    """Submit a job from async code and return (backend, future, deadline)."""
+    deadline = time.time() + limits['max_time']
+
+    def submit():
+        # Starting the backend (and the local backend's generation) blocks
+        backend = get_backend()
+        return backend, backend.submit(
+            prompt, limits['max_new_tokens'], deadline, on_text=on_text, conversation=conversation
+        )
+
+    backend, future = await asyncio.to_thread(submit)
+    return backend, future, deadline
+
+
+async def agenerate_text(prompt, budget='default', conversation=None):
+    """Async version of generate_text."""
+    limits = get_budget(budget)
+    backend, future, deadline = await _asubmit(prompt, limits, conversation=conversation)
+    try:
+        return await asyncio.wait_for(asyncio.wrap_future(future), limits['max_time'] + RESULT_GRACE)
+    except asyncio.TimeoutError:
+        backend.forget(future)
+        raise TimeoutError('No reply before the generation deadline')
+
+
+async def astream_text(prompt, budget='default', conversation=None):
+    """Async version of stream_text."""
+    limits = get_budget(budget)
+    loop = asyncio.get_running_loop()
+    chunks = asyncio.Queue()
+    done = object()
+
+    def on_text(text):
+        loop.call_soon_threadsafe(chunks.put_nowait, text)
+
+    backend, future, deadline = await _asubmit(prompt, limits, on_text=on_text, conversation=conversation)
+    future.add_done_callback(lambda _: loop.call_soon_threadsafe(chunks.put_nowait, done))
+    try:
+        while True:
+            remaining = deadline + RESULT_GRACE - time.time()
+            try:
+                chunk = await asyncio.wait_for(chunks.get(), max(remaining, 0))
+            except asyncio.TimeoutError:
+                raise TimeoutError('No reply before the generation deadline')
+            if chunk is done:
+                break
+            yield chunk
+    finally:
+        if not future.done():
+            backend.forget(future)
+    # Re-raise a failed generation
+    future.result()
+
+
+def get_stats():
+    """Histograms and pool state for this web process."""
+    return get_backend().get_stats()
@@ -1,23 +1,301 @@
+"""
+A file-based journal for offline/CLI use, separate from the JournalEntry
+table, stored as an append-only log in JOURNAL_DIR:
+
+- ``<n>.ndjson`` segments hold the entries, one JSON object per line.
+- ``<n>.idx`` files hold a fixed-size (offset, length, timestamp) record per
+  entry, so entry number i is found with one read of segment
+  i // SEGMENT_ENTRIES's index, and date ranges are filtered without
+  parsing the entries.
+
+Appending takes an exclusive lock (``fcntl.flock`` on ``lock``, so
+concurrent gunicorn workers serialize), writes the line and then its index
+record, and never rewrites anything: the cost of a save doesn't depend on
+the size of the journal. Writes reach the OS on every save, so they survive
+a crashed process; they are fsynced to disk after SYNC_EVERY entries or at
+most SYNC_INTERVAL seconds after the first unsynced one (by a timer thread,
+so an idle process doesn't hold them back), whichever comes first, and on
+exit. That bounds what a power loss can take. A torn tail (an entry without
+its index record, or index records past the end of the data) is cut off by
+the next writer.
+
+Readers don't lock: records are only ever appended, and an index record is
+written after its entry. The legacy JOURNAL_FILE (a JSON array) and
+JOURNAL_LOG are moved into the store on first use and renamed to
+``*.migrated``. ``manage.py benchmark_journal`` measures append latency as
+the journal grows.
+"""
+import atexit
+import contextlib
+import fcntl
 import json
 import os
+import struct
+import threading
+import time
 from datetime import datetime
 
-# File to store journal entries
+# Legacy JSON array of entries, rewritten on every save
 JOURNAL_FILE = "journal_entries.json"
+# Legacy append-only log, one JSON object per line
+JOURNAL_LOG = "journal_entries.ndjson"
+JOURNAL_DIR = "journal"
+
+DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+# Index record: entry offset and length in the segment, and its POSIX time
+INDEX_RECORD = struct.Struct("<QId")
+SEGMENT_ENTRIES = 65536
+SYNC_EVERY = 100
+SYNC_INTERVAL = 1.0  # seconds
+
+class JournalStore:
+    """Append-only, segmented journal log in `directory`."""
+
+    def __init__(self, directory, segment_entries=SEGMENT_ENTRIES, sync_every=SYNC_EVERY, sync_interval=SYNC_INTERVAL):
+        self.directory = directory
+        self.segment_entries = segment_entries
+        self.sync_every = sync_every
+        self.sync_interval = sync_interval
+        os.makedirs(directory, exist_ok=True)
+
+        self._thread_lock = threading.Lock()
+        self._lock_file = None
+        # The segment this process appends to, as (number, data fd, index fd)
+        self._segment = None
+        self._unsynced = 0
+        self._synced_at = time.monotonic()
+        # Pending fsync of entries appended since the last one
+        self._timer = None
+
+    def _path(self, segment, extension):
+        return os.path.join(self.directory, f"{segment:06d}.{extension}")
+
+    @contextlib.contextmanager
+    def _locked(self):
+        """Exclusive across threads and processes"""
+        with self._thread_lock:
+            if self._lock_file is None:
+                self._lock_file = open(os.path.join(self.directory, "lock"), "a")
+            fcntl.flock(self._lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(self._lock_file, fcntl.LOCK_UN)
+
+    def last_segment(self):
+        segment = self._segment[0] if self._segment else max(
+            (int(name.split(".")[0]) for name in os.listdir(self.directory) if name.endswith(".idx")),
+            default=0
+        )
+        # Another process may have started newer segments
+        while os.path.exists(self._path(segment + 1, "idx")):
+            segment += 1
+        return segment
+
+    def _open_segment(self, segment):
+        if self._segment and self._segment[0] == segment:
+            return
+        self._close_segment()
+        flags = os.O_RDWR | os.O_APPEND | os.O_CREAT
+        self._segment = (
+            segment,
+            os.open(self._path(segment, "ndjson"), flags, 0o644),
+            os.open(self._path(segment, "idx"), flags, 0o644),
+        )
+
+    def _close_segment(self):
+        if self._segment:
+            self._sync()
+            os.close(self._segment[1])
+            os.close(self._segment[2])
+            self._segment = None
+
+    def _repair(self):
+        """
+        (entries, data size) of the open segment, after cutting off a torn
+        tail: a partial index record, index records past the end of the data
+        (their entries never reached the disk), or data without an index
+        record. Must be called with the lock held.
+        """
+        _, data, index = self._segment
+        index_size = os.fstat(index).st_size
+        data_size = os.fstat(data).st_size
+        valid, end = index_size - index_size % INDEX_RECORD.size, 0
+        while valid:
+            offset, length, _ = INDEX_RECORD.unpack(os.pread(index, INDEX_RECORD.size, valid - INDEX_RECORD.size))
+            if offset + length <= data_size:
+                end = offset + length
+                break
+            valid -= INDEX_RECORD.size
+        if valid != index_size:
+            os.ftruncate(index, valid)
+        if end != data_size:
+            os.ftruncate(data, end)
+        return valid // INDEX_RECORD.size, end
+
+    def _sync(self):
+        if self._segment and self._unsynced:
+            os.fsync(self._segment[1])
+            os.fsync(self._segment[2])
+        self._unsynced = 0
+        self._synced_at = time.monotonic()
+
+    def _append_locked(self, content, date):
+        line = (json.dumps({"date": date.strftime(DATE_FORMAT), "content": content}) + "\n").encode()
+        segment = self.last_segment()
+        self._open_segment(segment)
+        count, end = self._repair()
+        if count >= self.segment_entries:
+            segment += 1
+            self._open_segment(segment)
+            count, end = 0, 0
+        _, data, index = self._segment
+        os.write(data, line)
+        os.write(index, INDEX_RECORD.pack(end, len(line), date.timestamp()))
+        self._unsynced += 1
+        return segment * self.segment_entries + count
+
+    def append(self, content, date=None):
+        """Add an entry; returns its number"""
+        with self._locked():
+            number = self._append_locked(content, date or datetime.now())
+            if self._unsynced >= self.sync_every or time.monotonic() - self._synced_at >= self.sync_interval:
+                self._sync()
+            elif self._timer is None:
+                self._timer = threading.Timer(self.sync_interval, self._sync_later)
+                self._timer.daemon = True
+                self._timer.start()
+        return number
+
+    def _sync_later(self):
+        with self._thread_lock:
+            self._timer = None
+            self._sync()
+
+    def flush(self):
+        """fsync appended entries now"""
+        with self._thread_lock:
+            self._sync()
+
+    def close(self):
+        with self._thread_lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            self._close_segment()
+            if self._lock_file is not None:
+                self._lock_file.close()
+                self._lock_file = None
+
+    def _read_index(self, segment):
+        try:
+            with open(self._path(segment, "idx"), "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            return []
+        return list(INDEX_RECORD.iter_unpack(data[:len(data) - len(data) % INDEX_RECORD.size]))
+
+    def __len__(self):
+        segment = self.last_segment()
+        try:
+            size = os.path.getsize(self._path(segment, "idx"))
+        except FileNotFoundError:
+            size = 0
+        return segment * self.segment_entries + size // INDEX_RECORD.size
+
+    def get(self, number):
+        """Entry `number` (from 0, in append order); raises IndexError"""
+        if number < 0:
+            raise IndexError(number)
+        segment, position = divmod(number, self.segment_entries)
+        try:
+            with open(self._path(segment, "idx"), "rb") as f:
+                record = os.pread(f.fileno(), INDEX_RECORD.size, position * INDEX_RECORD.size)
+        except FileNotFoundError:
+            record = b""
+        if len(record) < INDEX_RECORD.size:
+            raise IndexError(number)
+        offset, length, _ = INDEX_RECORD.unpack(record)
+        with open(self._path(segment, "ndjson"), "rb") as f:
+            line = os.pread(f.fileno(), length, offset)
+        if len(line) < length:
+            # Indexed by a writer that crashed before the entry was stored
+            raise IndexError(number)
+        return json.loads(line)
+
+    def entries(self, start=None, end=None):
+        """
+        Entries in append order, read lazily, optionally only those dated
+        from `start` up to (not including) `end`.
+        """
+        low = start.timestamp() if start else float("-inf")
+        high = end.timestamp() if end else float("inf")
+        for segment in range(self.last_segment() + 1):
+            records = [
+                (offset, length) for offset, length, timestamp in self._read_index(segment)
+                if low <= timestamp < high
+            ]
+            if not records:
+                continue
+            with open(self._path(segment, "ndjson"), "rb") as f:
+                position = 0
+                for offset, length in records:
+                    if offset != position:
+                        f.seek(offset)
+                    line = f.read(length)
+                    if len(line) < length:
+                        break
+                    position = offset + length
+                    yield json.loads(line)
+
+_store = None
+_store_lock = threading.Lock()
+
+def _parse_date(value):
+    try:
+        return datetime.strptime(value, DATE_FORMAT)
+    except (TypeError, ValueError):
+        return datetime.now()
+
+def migrate_legacy(store):
+    """Move entries from JOURNAL_FILE and JOURNAL_LOG into the store, once."""
+    # Under the store's lock, so two processes starting at once don't both
+    # copy the same file
+    with store._locked():
+        for path in (JOURNAL_FILE, JOURNAL_LOG):
+            if not os.path.exists(path):
+                continue
+            with open(path, "r", encoding="utf-8") as f:
+                if path == JOURNAL_FILE:
+                    entries = json.load(f)
+                else:
+                    entries = (json.loads(line) for line in f if line.endswith("\n"))
+                for entry in entries:
+                    store._append_locked(entry["content"], _parse_date(entry.get("date")))
+            store._sync()
+            os.replace(path, path + ".migrated")
+
+def get_store():
+    """The journal store in JOURNAL_DIR, migrating the legacy files on first use."""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                store = JournalStore(JOURNAL_DIR)
+                migrate_legacy(store)
+                atexit.register(store.close)
+                _store = store
+    return _store
 
 def save_entry(entry):
-    """Save a journal entry to the journal file."""
-    entries = get_entries()
-    entries.append({
-        "date": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-        "content": entry
-    })
-    with open(JOURNAL_FILE, "w") as f:
-        json.dump(entries, f, indent=4)
-
-def get_entries():
-    """Retrieve all journal entries from the journal file."""
-    if os.path.exists(JOURNAL_FILE):
-        with open(JOURNAL_FILE, "r") as f:
-            return json.load(f)
-    return []
+    """Save a journal entry to the journal."""
+    return get_store().append(entry)
+
+def get_entry(number):
+    """Retrieve one journal entry by number."""
+    return get_store().get(number)
+
+def get_entries(start=None, end=None):
+    """Lazily retrieve journal entries, optionally only those from `start` up to `end`."""
+    return get_store().entries(start, end)
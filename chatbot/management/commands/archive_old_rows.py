@@ -0,0 +1,36 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from chatbot.retention import POLICIES, archive, cutoff
+
+
+class Command(BaseCommand):
+    help = 'Archives rows older than RETENTION_DAYS to gzipped JSON Lines in RETENTION_ARCHIVE_DIR and deletes them'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--policy', choices=sorted(POLICIES), action='append', help='Only run these policies')
+        parser.add_argument('--chunk-size', type=int, default=1000, help='Rows archived and deleted per transaction')
+        parser.add_argument('--dry-run', action='store_true', help='Only count the eligible rows')
+
+    def handle(self, *args, **options):
+        for name in options['policy'] or sorted(POLICIES):
+            limit = cutoff(name)
+            if limit is None:
+                self.stdout.write(f'{name}: kept forever (RETENTION_DAYS is 0)')
+                continue
+
+            started = time.time()
+            total, path = archive(
+                name,
+                chunk_size=options['chunk_size'],
+                dry_run=options['dry_run'],
+                progress=lambda done: self.stdout.write(f'{name}: {done} rows archived')
+            )
+            if options['dry_run']:
+                self.stdout.write(f'{name}: {total} rows older than {limit:%Y-%m-%d} would be archived')
+            else:
+                self.stdout.write(self.style.SUCCESS(
+                    f'{name}: archived {total} rows older than {limit:%Y-%m-%d}'
+                    f"{f' to {path}' if path else ''} in {time.time() - started:.1f}s"
+                ))
@@ -0,0 +1,117 @@
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from chatbot import inference, model_backends
+
+BENCHMARK_PROMPTS = [
+    "Hello, how are you today?",
+    "I have been feeling a bit anxious about work.",
+    "Can you suggest something to help me sleep better?",
+    "I went for a walk this morning and it helped.",
+]
+
+
+def _rss_mb():
+    """Current resident set size of this process in MB."""
+    try:
+        with open('/proc/self/statm') as statm:
+            return int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / (1024 * 1024)
+    except OSError:
+        return _peak_rss_mb()
+
+
+def _peak_rss_mb():
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+class Command(BaseCommand):
+    help = 'Compares generation speed and memory of the inference backends'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--backends', nargs='+', choices=model_backends.BACKENDS, default=list(model_backends.BACKENDS))
+        parser.add_argument('--max-new-tokens', type=int, default=32)
+        parser.add_argument('--rounds', type=int, default=3, help='Passes over the benchmark prompts')
+        parser.add_argument('--batch-size', type=int, default=1)
+        parser.add_argument('--model-path', default=settings.CHATBOT_MODEL_PATH)
+        # Internal: benchmark a single backend in this process and print JSON
+        parser.add_argument('--run-one', choices=model_backends.BACKENDS, help='Internal use')
+
+    def handle(self, *args, **options):
+        if options['run_one']:
+            result = self.run_one(options['run_one'], options)
+            self.stdout.write(json.dumps(result))
+            return
+
+        self.stdout.write(
+            f"{'backend':<10} {'load s':>8} {'tokens/s':>10} {'RSS MB':>8} {'peak MB':>8}"
+        )
+        for backend in options['backends']:
+            # Each backend runs in a fresh process so RSS figures don't mix
+            command = [
+                sys.executable, sys.argv[0], 'benchmark_inference', '--run-one', backend,
+                '--max-new-tokens', str(options['max_new_tokens']),
+                '--rounds', str(options['rounds']),
+                '--batch-size', str(options['batch_size']),
+                '--model-path', options['model_path'],
+            ]
+            completed = subprocess.run(command, capture_output=True, text=True)
+            if completed.returncode != 0:
+                self.stderr.write(f"{backend}: failed\n{completed.stderr.strip()}")
+                continue
+            result = json.loads(completed.stdout.strip().splitlines()[-1])
+            self.stdout.write(
+                f"{backend:<10} {result['load_s']:>8.1f} {result['tokens_per_s']:>10.1f} "
+                f"{result['rss_mb']:>8.0f} {result['peak_rss_mb']:>8.0f}"
+            )
+
+    def run_one(self, backend, options):
+        import torch
+
+        started = time.time()
+        model, tokenizer = inference.load_model(options['model_path'], backend=backend)
+        if model is None:
+            raise CommandError(f"Model files not found at {options['model_path']}")
+        inference.warm_up_model(model, tokenizer)
+        load_s = time.time() - started
+
+        max_new_tokens = options['max_new_tokens']
+        batch_size = options['batch_size']
+        prompts = BENCHMARK_PROMPTS * options['rounds']
+        tokens = 0
+        started = time.time()
+        for i in range(0, len(prompts), batch_size):
+            inputs = tokenizer(
+                [prompt + tokenizer.eos_token for prompt in prompts[i:i + batch_size]],
+                return_tensors='pt',
+                padding=True,
+            )
+            with torch.no_grad():
+                # Fixed-length replies so every backend does the same work
+                output = model.generate(
+                    inputs['input_ids'],
+                    attention_mask=inputs['attention_mask'],
+                    pad_token_id=tokenizer.eos_token_id,
+                    max_new_tokens=max_new_tokens,
+                    min_new_tokens=max_new_tokens,
+                    **inference.GENERATION_KWARGS
+                )
+            tokens += (output.shape[-1] - inputs['input_ids'].shape[-1]) * output.shape[0]
+        elapsed = time.time() - started
+
+        return {
+            'backend': backend,
+            'load_s': load_s,
+            'tokens': tokens,
+            'tokens_per_s': tokens / elapsed if elapsed else 0.0,
+            'rss_mb': _rss_mb(),
+            'peak_rss_mb': _peak_rss_mb(),
+        }
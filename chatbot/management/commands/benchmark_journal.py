@@ -0,0 +1,64 @@
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from django.core.management.base import BaseCommand
+
+from chatbot.journaling import JournalStore
+from chatbot.management.commands.benchmark_sentiment import sample_texts
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+class Command(BaseCommand):
+    help = 'Measures journal store append and lookup latency as the journal grows (in a temporary directory)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--entries', type=int, default=1000000)
+        parser.add_argument('--window', type=int, default=10000, help='Appends timed before each report')
+        parser.add_argument('--sync-every', type=int, default=100, help='Entries per fsync')
+
+    def handle(self, *args, **options):
+        total, window = options['entries'], options['window']
+        texts = sample_texts(1000)
+        checkpoints = sorted({min(total, 10 ** power) for power in range(3, 10) if 10 ** power // 10 < total} | {total})
+        first_day = datetime(2020, 1, 1)
+
+        with tempfile.TemporaryDirectory() as directory:
+            store = JournalStore(directory, sync_every=options['sync_every'])
+            self.stdout.write(f"{'entries':>9} {'append p50 us':>14} {'p99 us':>8} {'max us':>8} {'get p50 us':>11}")
+            latencies = []
+            started = time.perf_counter()
+            for i in range(total):
+                date = first_day + timedelta(minutes=i)
+                before = time.perf_counter()
+                store.append(texts[i % len(texts)], date)
+                latencies.append(time.perf_counter() - before)
+                latencies = latencies[-window:] if len(latencies) > 2 * window else latencies
+
+                if i + 1 in checkpoints:
+                    recent = latencies[-window:]
+                    gets = []
+                    for number in random.sample(range(i + 1), min(1000, i + 1)):
+                        before = time.perf_counter()
+                        store.get(number)
+                        gets.append(time.perf_counter() - before)
+                    self.stdout.write(
+                        f'{i + 1:>9} {percentile(recent, 0.5) * 1e6:>14.1f} {percentile(recent, 0.99) * 1e6:>8.1f} '
+                        f'{max(recent) * 1e6:>8.1f} {percentile(gets, 0.5) * 1e6:>11.1f}'
+                    )
+            store.flush()
+            self.stdout.write(f'Appended {total} entries in {time.perf_counter() - started:.1f}s')
+
+            before = time.perf_counter()
+            count = sum(1 for _ in store.entries())
+            self.stdout.write(f'Read all {count} entries in {time.perf_counter() - before:.2f}s')
+            before = time.perf_counter()
+            middle = first_day + timedelta(minutes=total // 2)
+            count = sum(1 for _ in store.entries(middle, middle + timedelta(days=1)))
+            self.stdout.write(f'Read one day ({count} entries) in {(time.perf_counter() - before) * 1000:.1f}ms')
+            store.close()
@@ -0,0 +1,106 @@
+from datetime import timedelta
+import time
+
+import numpy as np
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+
+from chatbot import search
+
+SYLLABLES = ['ka', 'lo', 'mi', 'ren', 'sa', 'tu', 'vel', 'no', 'pi', 'dar', 'e', 'shu', 'gro', 'bin', 'ta', 'wen']
+
+
+def vocabulary(size, rng):
+    """Distinct pseudo-words of two to four syllables"""
+    words = set()
+    while len(words) < size:
+        words.add(''.join(rng.choice(SYLLABLES, size=rng.integers(2, 5))))
+    return sorted(words)
+
+
+class Command(BaseCommand):
+    help = ('Measures full-text search latency over a synthetic corpus, in a temporary index table '
+            'that shadows the real one for this connection only')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--entries', type=int, default=1_000_000)
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--words-per-entry', type=int, default=40)
+        parser.add_argument('--vocabulary', type=int, default=20000)
+        parser.add_argument('--queries', type=int, default=200, help='Queries timed per query type')
+        parser.add_argument('--target-ms', type=float, default=50, help='Fail if a p95 latency exceeds this')
+
+    def handle(self, *args, **options):
+        try:
+            statements = search.schema(temporary=True)
+        except search.SearchUnavailable as e:
+            raise CommandError(str(e))
+
+        rng = np.random.default_rng(0)
+        words = np.array(vocabulary(options['vocabulary'], rng))
+        # Zipf-like word frequencies, like natural text
+        frequencies = 1 / np.arange(1, len(words) + 1)
+        frequencies /= frequencies.sum()
+
+        with connection.cursor() as cursor:
+            for statement in statements:
+                cursor.execute(statement)
+        try:
+            self.measure(options, rng, words, frequencies)
+        finally:
+            # Drop the synthetic corpus, unshadowing the real index
+            with connection.cursor() as cursor:
+                cursor.execute(f'DROP TABLE {"temp." if connection.vendor == "sqlite" else "pg_temp."}{search.TABLE}')
+
+    def measure(self, options, rng, words, frequencies):
+        # Committed in chunks: FTS5 answers prefix queries slowly over
+        # uncommitted rows, which a live index never has many of
+        started = time.time()
+        now = timezone.now()
+        chunk_size = 10000
+        for start in range(0, options['entries'], chunk_size):
+            count = min(chunk_size, options['entries'] - start)
+            texts = words[rng.choice(len(words), size=(count, options['words_per_entry']), p=frequencies)]
+            users = rng.integers(1, options['users'] + 1, size=count)
+            with transaction.atomic():
+                search.index_rows(
+                    (
+                        ('journal', start + i + 1, int(users[i]), now - timedelta(minutes=start + i), ' '.join(texts[i]))
+                        for i in range(count)
+                    ),
+                    replace=False
+                )
+            if (start // chunk_size) % 10 == 9:
+                self.stdout.write(f'{start + count} entries indexed')
+        self.stdout.write(f"Indexed {options['entries']} entries in {time.time() - started:.1f}s")
+
+        # Common, mid-frequency and rare words, two-word queries and prefixes
+        query_types = {
+            'common word': lambda: words[rng.integers(0, 20)],
+            'mid word': lambda: words[rng.integers(100, 1000)],
+            'rare word': lambda: words[rng.integers(5000, len(words))],
+            'two words': lambda: f'{words[rng.integers(0, 200)]} {words[rng.integers(0, 200)]}',
+            'prefix': lambda: words[rng.integers(0, 1000)][:3],
+        }
+        self.stdout.write(f"{'query':>12} {'p50 ms':>8} {'p95 ms':>8} {'max ms':>8} {'hits/page':>9}")
+        slow = []
+        for name, make_query in query_types.items():
+            latencies, hits = [], 0
+            for _ in range(options['queries']):
+                user_id = int(rng.integers(1, options['users'] + 1))
+                query = make_query()
+                started = time.perf_counter()
+                results, _, _ = search.search(user_id, query)
+                latencies.append((time.perf_counter() - started) * 1000)
+                hits += len(results)
+            p50, p95 = np.percentile(latencies, [50, 95])
+            self.stdout.write(
+                f'{name:>12} {p50:>8.1f} {p95:>8.1f} {max(latencies):>8.1f} {hits / options["queries"]:>9.1f}'
+            )
+            if p95 > options['target_ms']:
+                slow.append(name)
+
+        if slow:
+            raise CommandError(f"p95 above {options['target_ms']:.0f} ms for: {', '.join(slow)}")
+        self.stdout.write(self.style.SUCCESS(f"All p95 latencies under {options['target_ms']:.0f} ms"))
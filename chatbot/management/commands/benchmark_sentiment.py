@@ -0,0 +1,57 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings
+
+from chatbot.sentiment_analysis import FAST_TIER, SentimentUnavailable, get_pipeline, get_sentiments
+
+SAMPLE_SENTENCES = [
+    "I had a good day today.",
+    "Work was stressful and I couldn't focus on anything.",
+    "I went for a long walk by the river and felt calmer afterwards.",
+    "I'm worried about my exams next week and I haven't been sleeping well.",
+    "Talking to my sister really helped me put things in perspective.",
+    "Nothing special happened.",
+]
+
+
+def sample_texts(count, seed=0):
+    """Journal-like texts of mixed length, from one sentence to a few paragraphs."""
+    rng = random.Random(seed)
+    return [
+        ' '.join(rng.choice(SAMPLE_SENTENCES) for _ in range(rng.choice([1, 2, 4, 8, 24])))
+        for _ in range(count)
+    ]
+
+
+class Command(BaseCommand):
+    help = 'Measures per-text sentiment scoring latency at different batch sizes, with and without the fast path'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-sizes', type=int, nargs='+', default=[1, 8, 32])
+        parser.add_argument('--texts', type=int, default=128, help='Texts scored per batch size')
+
+    def handle(self, *args, **options):
+        texts = sample_texts(options['texts'])
+        try:
+            get_pipeline()
+        except SentimentUnavailable as e:
+            raise CommandError(str(e))
+        # Load the models and allocate buffers before timing
+        with override_settings(SENTIMENT_FAST_PATH=False):
+            get_sentiments(texts[:8], batch_size=8)
+        get_sentiments(texts[:8], batch_size=8)
+
+        self.stdout.write(f"{'fast path':>9} {'batch size':>10} {'total s':>8} {'ms/text':>8} {'lexicon':>8}")
+        for fast_path in (False, True):
+            with override_settings(SENTIMENT_FAST_PATH=fast_path):
+                for batch_size in options['batch_sizes']:
+                    started = time.perf_counter()
+                    results = get_sentiments(texts, batch_size=batch_size)
+                    elapsed = time.perf_counter() - started
+                    lexicon = sum(1 for result in results if result.tier == FAST_TIER) / len(texts)
+                    self.stdout.write(
+                        f"{'on' if fast_path else 'off':>9} {batch_size:>10} {elapsed:>8.2f} "
+                        f"{elapsed * 1000 / len(texts):>8.1f} {lexicon:>8.0%}"
+                    )
@@ -0,0 +1,53 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from chatbot import inference, model_backends
+
+# Prompt lengths generated with while filling the compiled-kernel cache
+COMPILE_PROMPTS = [
+    "Hi",
+    "I have been feeling a bit anxious today.",
+    "Work has been really stressful lately and I can't seem to switch off in the evenings, any ideas?",
+]
+
+
+class Command(BaseCommand):
+    help = 'Builds and caches the optimized DialoGPT model for an inference backend'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--backend', choices=['int8', 'compiled'], default=None,
+            help='Backend to build (default: INFERENCE_BACKEND)'
+        )
+        parser.add_argument('--model-path', default=settings.CHATBOT_MODEL_PATH)
+
+    def handle(self, *args, **options):
+        backend = options['backend'] or settings.INFERENCE_BACKEND
+        model_path = options['model_path']
+        if backend == 'fp32':
+            self.stdout.write('The fp32 backend has nothing to build')
+            return
+
+        started = time.time()
+        if backend == 'int8':
+            model, tokenizer = inference.load_model(model_path, backend='fp32')
+            if model is None:
+                raise CommandError(f'Model files not found at {model_path}')
+            model = model_backends.quantize_int8(model)
+            path = model_backends.save_int8(model, model_path)
+            # Make sure the cached module loads and generates
+            model, tokenizer = inference.load_model(model_path, backend='int8')
+            inference.warm_up_model(model, tokenizer)
+        else:
+            model, tokenizer = inference.load_model(model_path, backend='compiled')
+            if model is None:
+                raise CommandError(f'Model files not found at {model_path}')
+            for prompt in COMPILE_PROMPTS:
+                inference.generate_batch(model, tokenizer, [prompt], max_new_tokens=inference.WARMUP_MAX_NEW_TOKENS)
+            path = model_backends.artifact_dir(model_path, 'compiled')
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Built {backend} model in {path} ({time.time() - started:.1f}s)'
+        ))
@@ -0,0 +1,55 @@
+import subprocess
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+# Heavy ML packages that only the inference and sentiment code paths may load
+FORBIDDEN_MODULES = ['torch', 'transformers', 'tokenizers', 'nltk', 'sklearn', 'scipy']
+
+# Imports everything a web process or a management command loads at start
+STARTUP_SCRIPT = """
+import django
+django.setup()
+import mental_wellness.urls
+from django.core.management import get_commands, load_command_class
+for name, app in get_commands().items():
+    load_command_class(app, name)
+"""
+
+
+class Command(BaseCommand):
+    help = 'Fails if starting the app or any management command imports heavy ML packages (python -X importtime)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--max-ms', type=float, default=1000, help='Budget for the total import time')
+        parser.add_argument('--top', type=int, default=10, help='Slowest imports to list')
+
+    def handle(self, *args, **options):
+        completed = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', STARTUP_SCRIPT],
+            capture_output=True, text=True
+        )
+        if completed.returncode != 0:
+            raise CommandError(f'Startup imports failed:\n{completed.stderr[-2000:]}')
+
+        # Lines look like "import time:  self [us] | cumulative | imported package"
+        imports = []
+        for line in completed.stderr.splitlines():
+            if not line.startswith('import time:') or 'self [us]' in line:
+                continue
+            _, cumulative, name = line[len('import time:'):].split('|')
+            imports.append((name.strip(), int(cumulative), len(name) - len(name.lstrip())))
+
+        # Top-level imports (least indented) add up to the total
+        total_ms = sum(cumulative for _, cumulative, indent in imports if indent == 1) / 1000
+        self.stdout.write(f'Startup import time: {total_ms:.0f} ms')
+        for name, cumulative, _ in sorted(imports, key=lambda item: -item[1])[:options['top']]:
+            self.stdout.write(f'  {cumulative / 1000:8.1f} ms  {name}')
+
+        loaded = {name.split('.')[0] for name, _, _ in imports}
+        forbidden = sorted(loaded.intersection(FORBIDDEN_MODULES))
+        if forbidden:
+            raise CommandError(f"Startup imports load {', '.join(forbidden)}; import them lazily")
+        if total_ms > options['max_ms']:
+            raise CommandError(f"Startup imports took {total_ms:.0f} ms (budget {options['max_ms']:.0f} ms)")
+        self.stdout.write(self.style.SUCCESS('No heavy ML packages imported at startup'))
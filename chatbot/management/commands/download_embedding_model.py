@@ -0,0 +1,22 @@
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = 'Downloads EMBEDDING_MODEL from the Hugging Face Hub into EMBEDDING_MODEL_PATH (needs network access)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--model', default=settings.EMBEDDING_MODEL)
+        parser.add_argument('--path', default=settings.EMBEDDING_MODEL_PATH)
+
+    def handle(self, *args, **options):
+        # Read when transformers is imported, so clear it first
+        os.environ.pop('TRANSFORMERS_OFFLINE', None)
+        from transformers import AutoModel, AutoTokenizer
+
+        os.makedirs(options['path'], exist_ok=True)
+        AutoTokenizer.from_pretrained(options['model']).save_pretrained(options['path'])
+        AutoModel.from_pretrained(options['model']).save_pretrained(options['path'])
+        self.stdout.write(self.style.SUCCESS(f"Saved {options['model']} to {options['path']}"))
@@ -0,0 +1,31 @@
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = (
+        'Downloads SENTIMENT_MODEL from the Hugging Face Hub into SENTIMENT_MODEL_PATH and the '
+        'VADER lexicon into NLTK_DATA_PATH (needs network access)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--model', default=settings.SENTIMENT_MODEL)
+        parser.add_argument('--path', default=settings.SENTIMENT_MODEL_PATH)
+
+    def handle(self, *args, **options):
+        # Read when transformers is imported, so clear it first
+        os.environ.pop('TRANSFORMERS_OFFLINE', None)
+        from transformers import AutoModelForSequenceClassification, AutoTokenizer
+
+        os.makedirs(options['path'], exist_ok=True)
+        AutoTokenizer.from_pretrained(options['model']).save_pretrained(options['path'])
+        AutoModelForSequenceClassification.from_pretrained(options['model']).save_pretrained(options['path'])
+        self.stdout.write(self.style.SUCCESS(f"Saved {options['model']} to {options['path']}"))
+
+        import nltk
+
+        # Lexicon for the fast path (see chatbot/sentiment_analysis.py)
+        nltk.download('vader_lexicon', download_dir=settings.NLTK_DATA_PATH)
+        self.stdout.write(self.style.SUCCESS(f"Saved the VADER lexicon to {settings.NLTK_DATA_PATH}"))
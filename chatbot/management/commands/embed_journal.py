@@ -0,0 +1,35 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from chatbot.embeddings import EmbeddingsUnavailable, embed_instances, stale
+from chatbot.models import JournalEntry
+
+
+class Command(BaseCommand):
+    help = 'Stores embeddings for journal entries not yet encoded by EMBEDDING_MODEL, or edited since'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=512, help='Rows loaded and saved at a time')
+        parser.add_argument('--batch-size', type=int, default=32, help='Texts per model forward pass')
+
+    def handle(self, *args, **options):
+        started = time.time()
+        total = 0
+        last_pk = 0
+        while True:
+            chunk = list(
+                stale(JournalEntry.objects.filter(pk__gt=last_pk))
+                .order_by('pk')
+                .only('pk', 'content')[:options['chunk_size']]
+            )
+            if not chunk:
+                break
+            try:
+                total += embed_instances(chunk, batch_size=options['batch_size'])
+            except EmbeddingsUnavailable as e:
+                raise CommandError(str(e))
+            last_pk = chunk[-1].pk
+            self.stdout.write(f'{total} journal entries encoded')
+
+        self.stdout.write(self.style.SUCCESS(f'Encoded {total} journal entries in {time.time() - started:.1f}s'))
@@ -0,0 +1,60 @@
+import os
+import sys
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from chatbot.export import FORMATS, export_chunks, export_users
+
+
+class Command(BaseCommand):
+    help = "Exports a user's full wellness history as NDJSON or CSV, or every user's to a directory"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', help='Username to export')
+        parser.add_argument('--all', action='store_true', help='Export every user, one file each, into --output')
+        parser.add_argument('--output', help='File for --user (default: stdout), directory for --all')
+        parser.add_argument('--format', choices=sorted(FORMATS), default='ndjson')
+        parser.add_argument('--gzip', action='store_true', help='Compress the output')
+        parser.add_argument('--processes', type=int, default=os.cpu_count(), help='Worker processes for --all')
+
+    def handle(self, *args, **options):
+        if bool(options['user']) == options['all']:
+            raise CommandError('Pass either --user or --all')
+
+        started = time.time()
+        if options['user']:
+            user = User.objects.filter(username=options['user']).first()
+            if user is None:
+                raise CommandError(f"No user named {options['user']}")
+            chunks = export_chunks(user.id, options['format'], options['gzip'])
+            if options['output']:
+                with open(options['output'], 'wb') as f:
+                    for chunk in chunks:
+                        f.write(chunk)
+                self.stderr.write(f"Exported {user.username} to {options['output']} in {time.time() - started:.1f}s")
+            else:
+                for chunk in chunks:
+                    sys.stdout.buffer.write(chunk)
+                sys.stdout.buffer.flush()
+            return
+
+        if not options['output']:
+            raise CommandError('--all needs an --output directory')
+        user_ids = list(User.objects.order_by('id').values_list('id', flat=True))
+        total, failed = 0, 0
+        for done, (user_id, written, error) in enumerate(export_users(
+            user_ids, options['output'], options['format'], options['gzip'], options['processes']
+        ), 1):
+            if error:
+                failed += 1
+                self.stderr.write(f'User {user_id}: {error}')
+            total += written
+            if done % 100 == 0:
+                self.stdout.write(f'{done}/{len(user_ids)} users')
+
+        message = f'Exported {len(user_ids) - failed} users ({total / 1e6:.1f} MB) in {time.time() - started:.1f}s'
+        if failed:
+            raise CommandError(f'{message}; {failed} failed')
+        self.stdout.write(self.style.SUCCESS(message))
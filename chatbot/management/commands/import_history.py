@@ -0,0 +1,54 @@
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from chatbot.importer import FORMATS, KINDS, import_file
+
+
+class Command(BaseCommand):
+    help = ("Imports mood and journal entries from JSON, NDJSON or CSV files (or the legacy "
+            "journal_entries.json) into a user's history; re-running skips rows already imported")
+
+    def add_arguments(self, parser):
+        parser.add_argument('paths', nargs='+', help='Files to import (.json, .ndjson/.jsonl, .csv, optionally .gz)')
+        parser.add_argument('--user', required=True, help='Username to import into')
+        parser.add_argument('--format', choices=FORMATS, help='File format (default: from the extension)')
+        parser.add_argument('--type', choices=sorted(KINDS), help='Record type for records without one')
+        parser.add_argument('--chunk-size', type=int, default=500, help='Rows written per transaction')
+        parser.add_argument('--dry-run', action='store_true', help='Only validate the files')
+
+    def handle(self, *args, **options):
+        user = User.objects.filter(username=options['user']).first()
+        if user is None:
+            raise CommandError(f"No user named {options['user']}")
+
+        invalid = 0
+        for path in options['paths']:
+            started = time.time()
+            try:
+                result = import_file(
+                    user,
+                    path,
+                    options['format'],
+                    default_kind=options['type'],
+                    chunk_size=options['chunk_size'],
+                    dry_run=options['dry_run'],
+                    progress=lambda read: self.stdout.write(f'{path}: {read} records read'),
+                )
+            except (OSError, ValueError) as e:
+                # InvalidRecord here means the file itself is malformed
+                raise CommandError(f'{path}: {e}')
+
+            for error in result.errors:
+                self.stderr.write(f'{path}: {error}')
+            invalid += result.invalid
+            summary = (
+                f'{path}: {result.created} created, {result.duplicates} already imported, '
+                f'{result.skipped} of other types skipped, {result.invalid} invalid '
+                f'in {time.time() - started:.1f}s'
+            )
+            self.stdout.write(self.style.SUCCESS(summary) if not result.invalid else summary)
+
+        if invalid:
+            raise CommandError(f'{invalid} invalid records were not imported')
@@ -0,0 +1,37 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from chatbot.analytics import rebuild_rollups
+from chatbot.models import MoodDailyRollup, MoodEntry, MoodHourlyRollup
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds the per-day and weekday/hour mood rollups behind the dashboard statistics from the mood entries'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', help='Only rebuild this username')
+        parser.add_argument('--chunk-size', type=int, default=100, help='Users rebuilt per transaction')
+
+    def handle(self, *args, **options):
+        started = time.time()
+        entries = MoodEntry.objects.order_by()
+        rollups = MoodDailyRollup.objects.all()
+        hourly_rollups = MoodHourlyRollup.objects.all()
+        if options['user']:
+            entries = entries.filter(user__username=options['user'])
+            rollups = rollups.filter(user__username=options['user'])
+            hourly_rollups = hourly_rollups.filter(user__username=options['user'])
+        # Users whose entries are all gone have nothing to rebuild
+        rollups.exclude(user_id__in=entries.values('user_id')).delete()
+        hourly_rollups.exclude(user_id__in=entries.values('user_id')).delete()
+        user_ids = list(entries.values_list('user_id', flat=True).distinct().order_by('user_id'))
+
+        total = 0
+        for i in range(0, len(user_ids), options['chunk_size']):
+            total += rebuild_rollups(user_ids[i:i + options['chunk_size']])
+            self.stdout.write(f'{min(i + options["chunk_size"], len(user_ids))}/{len(user_ids)} users')
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Wrote {total} daily rollups for {len(user_ids)} users in {time.time() - started:.1f}s'
+        ))
@@ -0,0 +1,23 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from chatbot import search
+
+
+class Command(BaseCommand):
+    help = 'Refills the full-text search index from all journal entries and chat messages'
+
+    def handle(self, *args, **options):
+        started = time.time()
+        try:
+            with transaction.atomic(), connection.cursor() as cursor:
+                cursor.execute(f'DELETE FROM {search.TABLE}')
+                search.fill(cursor)
+                cursor.execute(f'SELECT COUNT(*) FROM {search.TABLE}')
+                total = cursor.fetchone()[0]
+        except search.SearchUnavailable as e:
+            raise CommandError(str(e))
+
+        self.stdout.write(self.style.SUCCESS(f'Indexed {total} rows in {time.time() - started:.1f}s'))
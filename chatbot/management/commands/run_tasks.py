@@ -0,0 +1,34 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from chatbot import tasks
+
+
+class Command(BaseCommand):
+    help = 'Runs queued background tasks (dashboard insights and suggestions)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Run the tasks that are due, then exit')
+        parser.add_argument('--poll-interval', type=float, default=settings.BACKGROUND_TASK_POLL_INTERVAL)
+
+    def handle(self, *args, **options):
+        self.stdout.write('Background task worker started')
+        while True:
+            close_old_connections()
+            tasks.requeue_stale()
+            task = tasks.claim_next()
+            if task is None:
+                if options['once']:
+                    break
+                time.sleep(options['poll_interval'])
+                continue
+
+            started = time.time()
+            ok = tasks.run_task(task)
+            self.stdout.write(
+                f"{task.kind} for user {task.user_id}: {'done' if ok else 'failed'} "
+                f"({time.time() - started:.1f}s)"
+            )
@@ -0,0 +1,46 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from chatbot.models import ChatMessage, JournalEntry
+from chatbot.sentiment_analysis import score_instances, stale
+
+
+class Command(BaseCommand):
+    help = 'Stores sentiment scores for journal entries and chat messages not yet scored by SENTIMENT_MODEL'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=512, help='Rows loaded and saved at a time')
+        parser.add_argument('--batch-size', type=int, default=32, help='Texts per model forward pass')
+
+    def handle(self, *args, **options):
+        for model, text_field in [(JournalEntry, 'content'), (ChatMessage, 'message')]:
+            started = time.time()
+            total = 0
+            unscored = 0
+            last_pk = 0
+            while True:
+                # Walk the stale rows by primary key so each chunk is one
+                # indexed query, however many rows there are
+                chunk = list(
+                    stale(model.objects.filter(pk__gt=last_pk))
+                    .order_by('pk')
+                    .only('pk', text_field, 'sentiment_model')[:options['chunk_size']]
+                )
+                if not chunk:
+                    break
+                scored = score_instances(chunk, text_field, batch_size=options['batch_size'])
+                total += scored
+                # Without the transformer only the lexicon's answers are stored
+                unscored += len(chunk) - scored
+                last_pk = chunk[-1].pk
+                self.stdout.write(f'{model._meta.verbose_name_plural}: {total} scored')
+
+            self.stdout.write(self.style.SUCCESS(
+                f'Scored {total} {model._meta.verbose_name_plural} in {time.time() - started:.1f}s'
+            ))
+            if unscored:
+                self.stdout.write(self.style.WARNING(
+                    f'{unscored} {model._meta.verbose_name_plural} left unscored: no local sentiment model; '
+                    f'run `manage.py download_sentiment_model`'
+                ))
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.10 on 2026-10-18 18:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chatbot', '0009_chatmessage_error_message_chatmessage_is_error_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='chatmessage',
+            name='first_token_time',
+            field=models.FloatField(blank=True, null=True),
+        ),
+    ]
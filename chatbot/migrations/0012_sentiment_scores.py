@@ -0,0 +1,43 @@
+# Generated by Django 4.2.10 on 2026-10-18 19:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chatbot', '0011_backgroundtask_dashboardsnapshot'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='chatmessage',
+            name='sentiment_label',
+            field=models.CharField(blank=True, max_length=20, null=True),
+        ),
+        migrations.AddField(
+            model_name='chatmessage',
+            name='sentiment_model',
+            field=models.CharField(blank=True, max_length=200, null=True),
+        ),
+        migrations.AddField(
+            model_name='chatmessage',
+            name='sentiment_score',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='journalentry',
+            name='sentiment_label',
+            field=models.CharField(blank=True, max_length=20, null=True),
+        ),
+        migrations.AddField(
+            model_name='journalentry',
+            name='sentiment_model',
+            field=models.CharField(blank=True, max_length=200, null=True),
+        ),
+        migrations.AddField(
+            model_name='journalentry',
+            name='sentiment_score',
+            field=models.FloatField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.2.10 on 2026-10-18 19:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chatbot', '0012_sentiment_scores'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='chatmessage',
+            name='sentiment_tier',
+            field=models.CharField(blank=True, max_length=20, null=True),
+        ),
+        migrations.AddField(
+            model_name='journalentry',
+            name='sentiment_tier',
+            field=models.CharField(blank=True, max_length=20, null=True),
+        ),
+    ]
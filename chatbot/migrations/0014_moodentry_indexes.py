@@ -0,0 +1,21 @@
+# Generated by Django 4.2.10 on 2026-10-18 19:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chatbot', '0013_sentiment_tier'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='moodentry',
+            index=models.Index(fields=['user', 'created_at'], name='chatbot_moo_user_id_a7a8b5_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='moodentry',
+            index=models.Index(fields=['user', 'mood'], name='chatbot_moo_user_id_fa355e_idx'),
+        ),
+    ]
@@ -0,0 +1,74 @@
+# Generated by Django 4.2.10 on 2026-10-18 19:06
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Case, Count, IntegerField, Max, Min, Q, Sum, Value, When
+from django.db.models.functions import TruncDate
+import django.db.models.deletion
+
+MOOD_VALUES = {'very_sad': 1, 'sad': 2, 'neutral': 3, 'happy': 4, 'very_happy': 5}
+
+
+def build_rollups(apps, schema_editor):
+    MoodEntry = apps.get_model('chatbot', 'MoodEntry')
+    MoodDailyRollup = apps.get_model('chatbot', 'MoodDailyRollup')
+    rows = (
+        MoodEntry.objects.order_by()
+        .annotate(day=TruncDate('created_at'))
+        .values('user_id', 'day')
+        .annotate(
+            count=Count('id'),
+            value_sum=Sum(Case(
+                *[When(mood=mood, then=Value(value)) for mood, value in MOOD_VALUES.items()],
+                output_field=IntegerField()
+            )),
+            first_at=Min('created_at'),
+            last_at=Max('created_at'),
+            **{f'{mood}_count': Count('id', filter=Q(mood=mood)) for mood in MOOD_VALUES}
+        )
+    )
+    MoodDailyRollup.objects.bulk_create((MoodDailyRollup(**row) for row in rows.iterator()), batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('chatbot', '0014_moodentry_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MoodDailyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('value_sum', models.PositiveIntegerField(default=0)),
+                ('very_happy_count', models.PositiveIntegerField(default=0)),
+                ('happy_count', models.PositiveIntegerField(default=0)),
+                ('neutral_count', models.PositiveIntegerField(default=0)),
+                ('sad_count', models.PositiveIntegerField(default=0)),
+                ('very_sad_count', models.PositiveIntegerField(default=0)),
+                ('first_at', models.DateTimeField()),
+                ('last_at', models.DateTimeField()),
+            ],
+            options={
+                'ordering': ['day'],
+            },
+        ),
+        migrations.RemoveIndex(
+            model_name='moodentry',
+            name='chatbot_moo_user_id_fa355e_idx',
+        ),
+        migrations.AddField(
+            model_name='mooddailyrollup',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='mood_rollups', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddConstraint(
+            model_name='mooddailyrollup',
+            constraint=models.UniqueConstraint(fields=('user', 'day'), name='unique_mood_rollup_per_day'),
+        ),
+        migrations.RunPython(build_rollups, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.10 on 2026-10-18 19:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chatbot', '0015_mooddailyrollup'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='journalentry',
+            index=models.Index(fields=['user', 'created_at'], name='chatbot_jou_user_id_52b764_idx'),
+        ),
+    ]
@@ -0,0 +1,62 @@
+from django.db import migrations
+
+# The index as of this migration, spelled out rather than taken from
+# chatbot.search so later changes there don't alter it. Row ids are the
+# source row id times two plus the kind (journal 0, chat 1).
+SQLITE_SCHEMA = [
+    """CREATE VIRTUAL TABLE chatbot_search USING fts5(
+        body, owner, kind UNINDEXED, object_id UNINDEXED, created_at UNINDEXED,
+        tokenize = 'porter unicode61', prefix = '2 3 4'
+    )""",
+    "INSERT INTO chatbot_search (rowid, body, owner, kind, object_id, created_at) "
+    "SELECT id * 2, content, 'u' || user_id, 'journal', id, created_at FROM chatbot_journalentry",
+    "INSERT INTO chatbot_search (rowid, body, owner, kind, object_id, created_at) "
+    "SELECT id * 2 + 1, message, 'u' || user_id, 'chat', id, created_at FROM chatbot_chatmessage",
+]
+
+POSTGRES_SCHEMA = [
+    """CREATE TABLE chatbot_search (
+        id bigint PRIMARY KEY,
+        kind varchar(10) NOT NULL,
+        object_id bigint NOT NULL,
+        user_id integer NOT NULL,
+        created_at timestamp with time zone NOT NULL,
+        body text NOT NULL,
+        document tsvector GENERATED ALWAYS AS (to_tsvector('english', body)) STORED
+    )""",
+    "CREATE INDEX chatbot_search_document ON chatbot_search USING GIN (document)",
+    "CREATE INDEX chatbot_search_user ON chatbot_search (user_id)",
+    "INSERT INTO chatbot_search (id, kind, object_id, user_id, created_at, body) "
+    "SELECT id * 2, 'journal', id, user_id, created_at, content FROM chatbot_journalentry",
+    "INSERT INTO chatbot_search (id, kind, object_id, user_id, created_at, body) "
+    "SELECT id * 2 + 1, 'chat', id, user_id, created_at, message FROM chatbot_chatmessage",
+]
+
+
+def create_index(apps, schema_editor):
+    conn = schema_editor.connection
+    statements = {'sqlite': SQLITE_SCHEMA, 'postgresql': POSTGRES_SCHEMA}.get(conn.vendor)
+    if statements is None:
+        return
+    with conn.cursor() as cursor:
+        for statement in statements:
+            cursor.execute(statement)
+
+
+def drop_index(apps, schema_editor):
+    conn = schema_editor.connection
+    if conn.vendor not in ('sqlite', 'postgresql'):
+        return
+    with conn.cursor() as cursor:
+        cursor.execute('DROP TABLE IF EXISTS chatbot_search')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chatbot', '0016_journalentry_user_created_at'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_index, drop_index),
+    ]
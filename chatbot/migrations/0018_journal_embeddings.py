@@ -0,0 +1,28 @@
+# Generated by Django 4.2.10 on 2026-10-18 19:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chatbot', '0017_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='journalentry',
+            name='embedded_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='journalentry',
+            name='embedding',
+            field=models.BinaryField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='journalentry',
+            name='embedding_model',
+            field=models.CharField(blank=True, max_length=200, null=True),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.10 on 2026-10-18 19:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chatbot', '0018_journal_embeddings'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='selfcaresuggestion',
+            index=models.Index(fields=['user', 'is_completed', 'created_at'], name='chatbot_sel_user_id_041121_idx'),
+        ),
+    ]
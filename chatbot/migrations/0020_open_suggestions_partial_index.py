@@ -0,0 +1,21 @@
+# Generated by Django 4.2.10 on 2026-10-18 19:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chatbot', '0019_selfcaresuggestion_open_index'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='selfcaresuggestion',
+            name='chatbot_sel_user_id_041121_idx',
+        ),
+        migrations.AddIndex(
+            model_name='selfcaresuggestion',
+            index=models.Index(condition=models.Q(('is_completed', False)), fields=['user', '-created_at'], name='open_suggestions_by_user'),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 4.2.10 on 2026-10-18 19:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chatbot', '0020_open_suggestions_partial_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='journalentry',
+            name='external_id',
+            field=models.CharField(blank=True, max_length=64, null=True),
+        ),
+        migrations.AddField(
+            model_name='moodentry',
+            name='external_id',
+            field=models.CharField(blank=True, max_length=64, null=True),
+        ),
+        migrations.AddConstraint(
+            model_name='journalentry',
+            constraint=models.UniqueConstraint(fields=('user', 'external_id'), name='unique_journal_external_id'),
+        ),
+        migrations.AddConstraint(
+            model_name='moodentry',
+            constraint=models.UniqueConstraint(fields=('user', 'external_id'), name='unique_mood_external_id'),
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 4.2.10 on 2026-10-18 19:41
+
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def drop_duplicate_pending(apps, schema_editor):
+    """Keep the first pending task of each user and kind"""
+    BackgroundTask = apps.get_model('chatbot', 'BackgroundTask')
+    seen = set()
+    duplicates = []
+    for task_id, user_id, kind in BackgroundTask.objects.filter(status='pending').order_by(
+        'run_after', 'id'
+    ).values_list('id', 'user_id', 'kind'):
+        if (user_id, kind) in seen:
+            duplicates.append(task_id)
+        seen.add((user_id, kind))
+    BackgroundTask.objects.filter(id__in=duplicates).update(
+        status='failed',
+        finished_at=timezone.now(),
+        error_message='Superseded by a pending task of the same kind'
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chatbot', '0021_external_ids'),
+    ]
+
+    operations = [
+        migrations.RunPython(drop_duplicate_pending, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='backgroundtask',
+            constraint=models.UniqueConstraint(condition=models.Q(('status', 'pending')), fields=('user', 'kind'), name='one_pending_task_per_kind'),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 4.2.10 on 2026-10-18 19:42
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('chatbot', '0022_one_pending_task_per_kind'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResponseCacheVersion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source', models.CharField(max_length=20)),
+                ('version', models.CharField(max_length=32)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='responsecacheversion',
+            constraint=models.UniqueConstraint(fields=('user', 'source'), name='unique_response_cache_version'),
+        ),
+    ]
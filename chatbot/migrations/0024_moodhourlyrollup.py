@@ -0,0 +1,61 @@
+# Generated by Django 4.2.10 on 2026-10-18 19:44
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Case, Count, IntegerField, Sum, Value, When
+from django.db.models.functions import ExtractHour, ExtractIsoWeekDay
+import django.db.models.deletion
+
+MOOD_VALUES = {'very_sad': 1, 'sad': 2, 'neutral': 3, 'happy': 4, 'very_happy': 5}
+
+
+def build_rollups(apps, schema_editor):
+    MoodEntry = apps.get_model('chatbot', 'MoodEntry')
+    MoodHourlyRollup = apps.get_model('chatbot', 'MoodHourlyRollup')
+    rows = (
+        MoodEntry.objects.order_by()
+        .annotate(weekday=ExtractIsoWeekDay('created_at'), hour=ExtractHour('created_at'))
+        .values('user_id', 'weekday', 'hour')
+        .annotate(
+            count=Count('id'),
+            value_sum=Sum(Case(
+                *[When(mood=mood, then=Value(value)) for mood, value in MOOD_VALUES.items()],
+                output_field=IntegerField()
+            )),
+        )
+        .values_list('user_id', 'weekday', 'hour', 'count', 'value_sum')
+    )
+    MoodHourlyRollup.objects.bulk_create(
+        (
+            MoodHourlyRollup(user_id=user_id, weekday=weekday - 1, hour=hour, count=count, value_sum=value_sum)
+            for user_id, weekday, hour, count, value_sum in rows.iterator()
+        ),
+        batch_size=1000
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('chatbot', '0023_responsecacheversion'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MoodHourlyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('weekday', models.PositiveSmallIntegerField()),
+                ('hour', models.PositiveSmallIntegerField()),
+                ('count', models.IntegerField(default=0)),
+                ('value_sum', models.IntegerField(default=0)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='mood_hour_rollups', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='moodhourlyrollup',
+            constraint=models.UniqueConstraint(fields=('user', 'weekday', 'hour'), name='unique_mood_rollup_per_hour'),
+        ),
+        migrations.RunPython(build_rollups, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,87 @@
+"""
+CPU-optimized variants of the local DialoGPT model.
+
+``INFERENCE_BACKEND`` picks one of:
+
+- ``fp32``: the weights as shipped in ``models/dialoGPT-small``.
+- ``int8``: dynamic int8 quantization of the linear layers. GPT-2 implements
+  its attention and MLP projections as ``Conv1D`` rather than ``nn.Linear``,
+  so they are converted first or quantize_dynamic would skip them. The
+  quantized module is cached by ``manage.py build_inference_model`` in
+  ``models/dialoGPT-small-int8/`` and loaded directly, without ever
+  materializing the fp32 weights.
+- ``compiled``: ``model.forward`` compiled with ``torch.compile``. Compiled
+  kernels are cached in ``models/dialoGPT-small-compiled/``, which the build
+  command fills so that workers don't compile from scratch on every start.
+
+``manage.py benchmark_inference`` compares tokens/sec and memory per backend.
+"""
+import os
+
+BACKENDS = ('fp32', 'int8', 'compiled')
+
+
+def artifact_dir(model_path, backend):
+    """Directory holding the cached artifact of `backend`, next to the model."""
+    return f"{os.path.normpath(model_path)}-{backend}"
+
+
+def int8_model_path(model_path):
+    return os.path.join(artifact_dir(model_path, 'int8'), 'model.pt')
+
+
+def conv1d_to_linear(model):
+    """Replace the transformers Conv1D layers of `model` with equivalent nn.Linear ones."""
+    import torch
+    from transformers.pytorch_utils import Conv1D
+
+    for module in list(model.modules()):
+        for name, child in list(module.named_children()):
+            if isinstance(child, Conv1D):
+                in_features, out_features = child.weight.shape
+                linear = torch.nn.Linear(in_features, out_features)
+                # Conv1D stores its weight transposed
+                linear.weight.data = child.weight.data.t().contiguous()
+                linear.bias.data = child.bias.data
+                setattr(module, name, linear)
+    return model
+
+
+def quantize_int8(model):
+    """Dynamically quantize the linear layers of `model` to int8."""
+    import torch
+
+    conv1d_to_linear(model)
+    return torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+
+def save_int8(model, model_path):
+    import torch
+
+    path = int8_model_path(model_path)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    # Quantized modules have no from_pretrained, so the whole module is pickled
+    torch.save(model, path)
+    return path
+
+
+def load_int8(model_path):
+    """Load the cached int8 model, or return None if it hasn't been built."""
+    import torch
+
+    path = int8_model_path(model_path)
+    if not os.path.exists(path):
+        return None
+    return torch.load(path)
+
+
+def compile_model(model, model_path):
+    """
+    Compile the model's forward pass in place. Only forward is compiled so
+    that generate() and the chat sampling loop both use the compiled graph.
+    """
+    import torch
+
+    os.environ.setdefault('TORCHINDUCTOR_CACHE_DIR', artifact_dir(model_path, 'compiled'))
+    model.forward = torch.compile(model.forward, dynamic=True)
+    return model
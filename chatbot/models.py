@@ -15,9 +15,17 @@ class MoodEntry(models.Model):
     mood = models.CharField(max_length=20, choices=MOOD_CHOICES)
     notes = models.TextField(blank=True)
     created_at = models.DateTimeField(default=timezone.now)
+    # Set by chatbot.importer, so importing the same file again adds nothing
+    external_id = models.CharField(max_length=64, blank=True, null=True)
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['user', 'created_at']),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'external_id'], name='unique_mood_external_id'),
+        ]
 
     def __str__(self):
         return f"{self.user.username}'s mood: {self.mood} on {self.created_at.strftime('%Y-%m-%d')}"
@@ -27,10 +35,27 @@ class JournalEntry(models.Model):
     content = models.TextField()
     created_at = models.DateTimeField(default=timezone.now)
     updated_at = models.DateTimeField(auto_now=True)
+    # Set by chatbot.sentiment_analysis.score_instances; sentiment_model is
+    # the model version that produced the score
+    sentiment_label = models.CharField(max_length=20, blank=True, null=True)
+    sentiment_score = models.FloatField(null=True, blank=True)
+    sentiment_tier = models.CharField(max_length=20, blank=True, null=True)  # lexicon or transformer
+    sentiment_model = models.CharField(max_length=200, blank=True, null=True)
+    # Set by chatbot.embeddings.embed_instances: a unit-length float16 vector
+    embedding = models.BinaryField(null=True, blank=True)
+    embedding_model = models.CharField(max_length=200, blank=True, null=True)
+    embedded_at = models.DateTimeField(null=True, blank=True)
+    external_id = models.CharField(max_length=64, blank=True, null=True)  # see MoodEntry.external_id
 
     class Meta:
         ordering = ['-created_at']
         verbose_name_plural = "Journal entries"
+        indexes = [
+            models.Index(fields=['user', 'created_at']),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'external_id'], name='unique_journal_external_id'),
+        ]
 
     def __str__(self):
         return f"{self.user.username}'s journal entry on {self.created_at.strftime('%Y-%m-%d')}"
@@ -43,6 +68,11 @@ class ChatMessage(models.Model):
     is_error = models.BooleanField(default=False)
     error_message = models.TextField(blank=True, null=True)
     response_time = models.FloatField(null=True, blank=True)  # Store response time in seconds
+    first_token_time = models.FloatField(null=True, blank=True)  # Time to first streamed token in seconds
+    sentiment_label = models.CharField(max_length=20, blank=True, null=True)
+    sentiment_score = models.FloatField(null=True, blank=True)
+    sentiment_tier = models.CharField(max_length=20, blank=True, null=True)  # lexicon or transformer
+    sentiment_model = models.CharField(max_length=200, blank=True, null=True)
 
     class Meta:
         ordering = ['created_at']
@@ -59,6 +89,11 @@ class ChatMessage(models.Model):
         """Get recent chat history for a user"""
         return cls.objects.filter(user=user).order_by('-created_at')[:limit]
 
+    @classmethod
+    async def aget_recent_chat_history(cls, user, limit=5):
+        """Async version of get_recent_chat_history, returned as a list"""
+        return [msg async for msg in cls.get_recent_chat_history(user, limit)]
+
 class SelfCareSuggestion(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     suggestion = models.TextField()
@@ -81,6 +116,15 @@ class SelfCareSuggestion(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Only open suggestions, which the dashboard reads on every load;
+            # completed ones are left to the retention job
+            models.Index(
+                fields=['user', '-created_at'],
+                condition=models.Q(is_completed=False),
+                name='open_suggestions_by_user'
+            ),
+        ]
 
     def __str__(self):
         return f"{self.user.username}'s {self.category} suggestion: {self.suggestion[:50]}..."
@@ -155,4 +199,120 @@ class GoalProgress(models.Model):
         unique_together = ('goal', 'date')
 
     def __str__(self):
-        return f"{self.goal} - {self.date}" 
\ No newline at end of file
+        return f"{self.goal} - {self.date}"
+
+
+class BackgroundTask(models.Model):
+    """Work queued for the `run_tasks` worker (see chatbot/tasks.py)"""
+    KIND_CHOICES = [
+        ('dashboard', 'Dashboard Insights'),
+        ('refresh_suggestions', 'Refresh Suggestions'),
+    ]
+
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ]
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    kind = models.CharField(max_length=50, choices=KIND_CHOICES)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    attempts = models.IntegerField(default=0)
+    run_after = models.DateTimeField(default=timezone.now)
+    created_at = models.DateTimeField(default=timezone.now)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    error_message = models.TextField(blank=True, null=True)
+
+    class Meta:
+        ordering = ['run_after']
+        indexes = [
+            models.Index(fields=['status', 'run_after']),
+            models.Index(fields=['user', 'kind', 'status']),
+        ]
+        constraints = [
+            # enqueue() relies on this to merge requests for the same work
+            models.UniqueConstraint(
+                fields=['user', 'kind'],
+                condition=models.Q(status='pending'),
+                name='one_pending_task_per_kind'
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.get_kind_display()} for {self.user.username} ({self.status})"
+
+
+class DashboardSnapshot(models.Model):
+    """Precomputed dashboard content so `home` never waits on the model"""
+    user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='dashboard_snapshot')
+    mood_insights = models.TextField(blank=True, null=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.user.username}'s dashboard snapshot from {self.updated_at.strftime('%Y-%m-%d %H:%M')}"
+
+
+class MoodDailyRollup(models.Model):
+    """A user's mood entries for one day, kept up to date by the MoodEntry signals"""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='mood_rollups')
+    day = models.DateField()
+    count = models.PositiveIntegerField(default=0)
+    value_sum = models.PositiveIntegerField(default=0)  # sum of the 1-5 mood values
+    very_happy_count = models.PositiveIntegerField(default=0)
+    happy_count = models.PositiveIntegerField(default=0)
+    neutral_count = models.PositiveIntegerField(default=0)
+    sad_count = models.PositiveIntegerField(default=0)
+    very_sad_count = models.PositiveIntegerField(default=0)
+    first_at = models.DateTimeField()
+    last_at = models.DateTimeField()
+
+    class Meta:
+        ordering = ['day']
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'day'], name='unique_mood_rollup_per_day'),
+        ]
+
+    def __str__(self):
+        return f"{self.user.username}'s moods on {self.day}: {self.count}"
+
+
+class MoodHourlyRollup(models.Model):
+    """
+    A user's mood entries in one weekday/hour cell of the dashboard heatmap,
+    over their whole history; adjusted by the MoodEntry signals
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='mood_hour_rollups')
+    weekday = models.PositiveSmallIntegerField()  # 0 is Monday
+    hour = models.PositiveSmallIntegerField()
+    count = models.IntegerField(default=0)
+    value_sum = models.IntegerField(default=0)  # sum of the 1-5 mood values
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'weekday', 'hour'], name='unique_mood_rollup_per_hour'),
+        ]
+
+    def __str__(self):
+        return f"{self.user.username}'s moods on weekday {self.weekday} at {self.hour}h: {self.count}"
+
+
+class ResponseCacheVersion(models.Model):
+    """
+    The current version of a user's mood, journal or chat data, part of
+    every cached reply's key (see chatbot/response_cache.py). Kept in the
+    database so every process sees a change at once.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    source = models.CharField(max_length=20)
+    version = models.CharField(max_length=32)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'source'], name='unique_response_cache_version'),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id}/{self.source}: {self.version}"
@@ -0,0 +1,47 @@
+"""
+Keyset (cursor) pagination for the history pages.
+
+Pages are ordered newest first by (created_at, id), and a cursor holds the
+(created_at, id) of the last row shown, so the next page is one range query
+on the (user, created_at) index however far back the user has scrolled.
+OFFSET pagination would scan every skipped row instead.
+"""
+import base64
+from datetime import datetime
+
+from django.db.models import Q
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(instance):
+    """Opaque cursor pointing just after `instance`"""
+    raw = f'{instance.created_at.isoformat()}|{instance.pk}'
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """(created_at, pk) from a cursor made by encode_cursor"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        created_at, pk = raw.split('|')
+        return datetime.fromisoformat(created_at), int(pk)
+    except (ValueError, UnicodeDecodeError) as e:
+        raise InvalidCursor(f'Invalid cursor: {cursor}') from e
+
+
+def keyset_page(queryset, cursor=None, page_size=50):
+    """
+    One page of `queryset`, newest first, and the cursor of the next page
+    (None on the last page).
+    """
+    queryset = queryset.order_by('-created_at', '-pk')
+    if cursor:
+        created_at, pk = decode_cursor(cursor)
+        queryset = queryset.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, pk__lt=pk))
+
+    rows = list(queryset[:page_size + 1])
+    page, more = rows[:page_size], len(rows) > page_size
+    return page, encode_cursor(page[-1]) if more else None
@@ -0,0 +1,89 @@
+"""
+Cache of model replies to the dashboard prompts (mood insights, self-care).
+
+Entries live in the ``responses`` cache (see CACHES in the settings), which
+applies the TTL and evicts least recently used entries. A key is the hash of
+the exact prompt together with the user's data versions: one random token
+per (user, source) where the sources are the user's mood entries, journal
+entries and chat messages. The signals in ``chatbot/signals.py`` replace a
+version whenever a row of that source is saved or deleted, so stale replies
+are never looked up again and simply age out.
+
+The versions are ResponseCacheVersion rows rather than cache entries: a
+per-process cache would let the web process bump a version that the
+``run_tasks`` worker never sees. The replies themselves may live in a
+per-process cache (they are only ever looked up by the current key), but
+then each process computes its own; ``chatbot/checks.py`` rejects that
+for multi-worker deploys.
+"""
+import hashlib
+import json
+import threading
+import uuid
+
+from django.core.cache import caches
+from django.db import IntegrityError, transaction
+
+from .models import ResponseCacheVersion
+
+CACHE_ALIAS = 'responses'
+
+# Data each cached prompt is built from
+SOURCES = {
+    'mood_insights': ('mood',),
+    'self_care': ('mood', 'journal', 'chat'),
+}
+
+_stats_lock = threading.Lock()
+_stats = {'hits': 0, 'misses': 0}
+
+
+def get_cache():
+    return caches[CACHE_ALIAS]
+
+
+def invalidate(user_id, source):
+    """Stop serving cached replies that depend on the user's `source` data."""
+    # Without a version row nothing can be cached yet (make_key creates it),
+    # so only existing rows are replaced. Inserting one here would break
+    # deleting a user, whose cascade sends post_delete for each row.
+    ResponseCacheVersion.objects.filter(user_id=user_id, source=source).update(version=uuid.uuid4().hex)
+
+
+def _versions(user_id, sources):
+    versions = dict(ResponseCacheVersion.objects.filter(
+        user_id=user_id, source__in=sources
+    ).values_list('source', 'version'))
+    for source in sources:
+        if source not in versions:
+            # First use: start a fresh version
+            try:
+                with transaction.atomic():
+                    ResponseCacheVersion.objects.create(user_id=user_id, source=source, version=uuid.uuid4().hex)
+            except IntegrityError:
+                # Created meanwhile by another process
+                pass
+            versions[source] = ResponseCacheVersion.objects.get(user_id=user_id, source=source).version
+    return [versions[source] for source in sources]
+
+
+def make_key(user_id, budget, prompt, max_new_tokens=None):
+    versions = _versions(user_id, SOURCES.get(budget, ('mood', 'journal', 'chat')))
+    payload = json.dumps([budget, max_new_tokens, versions, prompt])
+    return f'llm:{budget}:{hashlib.sha256(payload.encode()).hexdigest()}'
+
+
+def lookup(key):
+    response = get_cache().get(key)
+    with _stats_lock:
+        _stats['hits' if response is not None else 'misses'] += 1
+    return response
+
+
+def store(key, response):
+    get_cache().set(key, response)
+
+
+def get_stats():
+    with _stats_lock:
+        return dict(_stats)
@@ -0,0 +1,131 @@
+"""
+Retention for the tables that grow with use: old rows are archived to
+gzipped JSON Lines files and then deleted, so the hot tables stay small.
+
+RETENTION_DAYS in the settings sets how old a row must be for each policy (0
+keeps everything); POLICIES says which rows are eligible. ``manage.py
+archive_old_rows`` walks the eligible rows by primary key in chunks: each
+chunk is appended to the policy's archive file and flushed to disk before
+the same rows are deleted in one short transaction, so memory use and lock
+time are bounded by the chunk size, and an interrupted run loses nothing.
+
+Rows are deleted with a plain DELETE rather than through the ORM, which
+would send post_delete for every row (invalidating caches and queueing
+dashboard tasks for history nobody is looking at); search index entries
+are dropped in bulk instead.
+"""
+from collections import namedtuple
+from datetime import timedelta
+import gzip
+import json
+import os
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from . import search
+from .models import ChatMessage, SelfCareSuggestion
+
+# eligible(cutoff) -> Q of rows to archive; search_kind is the row's kind in
+# the search index, if it is indexed
+Policy = namedtuple('Policy', ['model', 'eligible', 'search_kind'])
+
+POLICIES = {
+    # Done or replaced suggestions; saved-for-later ones stay
+    'suggestions': Policy(
+        SelfCareSuggestion,
+        lambda cutoff: Q(is_completed=True, is_saved=False, created_at__lt=cutoff),
+        None
+    ),
+    'chat': Policy(
+        ChatMessage,
+        lambda cutoff: Q(created_at__lt=cutoff),
+        'chat'
+    ),
+}
+
+
+def cutoff(name, now=None):
+    """Rows older than this are archived by policy `name` (None if it keeps everything)"""
+    days = settings.RETENTION_DAYS.get(name, 0)
+    if not days:
+        return None
+    return (now or timezone.now()) - timedelta(days=days)
+
+
+def eligible_rows(name, now=None):
+    policy = POLICIES[name]
+    limit = cutoff(name, now)
+    if limit is None:
+        return policy.model.objects.none()
+    return policy.model.objects.filter(policy.eligible(limit))
+
+
+def archive_path(name, now=None):
+    """A new archive file for this run of policy `name`"""
+    now = now or timezone.now()
+    return os.path.join(settings.RETENTION_ARCHIVE_DIR, name, f"{name}-{now.strftime('%Y%m%dT%H%M%S')}.jsonl.gz")
+
+
+def delete_rows(name, ids):
+    """Delete rows of policy `name` by id in one transaction, without ORM signals"""
+    policy = POLICIES[name]
+    table = connection.ops.quote_name(policy.model._meta.db_table)
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"DELETE FROM {table} WHERE id IN ({', '.join(['%s'] * len(ids))})",
+                ids
+            )
+            deleted = cursor.rowcount
+        if policy.search_kind:
+            try:
+                search.remove_ids(policy.search_kind, ids)
+            except search.SearchUnavailable:
+                pass
+    return deleted
+
+
+def archive(name, chunk_size=1000, now=None, dry_run=False, progress=None):
+    """
+    Archive and delete the rows policy `name` makes eligible, `chunk_size`
+    at a time; returns (rows archived, archive path or None). With
+    `dry_run`, only counts them.
+    """
+    now = now or timezone.now()
+    rows = eligible_rows(name, now)
+    if dry_run:
+        return rows.count(), None
+
+    path = archive_path(name, now)
+    total, last_id = 0, 0
+    archive_file = None
+    try:
+        while True:
+            chunk = list(rows.filter(id__gt=last_id).order_by('id').values()[:chunk_size])
+            if not chunk:
+                break
+            if archive_file is None:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                raw = open(path, 'ab')
+                archive_file = gzip.GzipFile(fileobj=raw, mode='ab')
+            for row in chunk:
+                archive_file.write(json.dumps(row, cls=DjangoJSONEncoder).encode() + b'\n')
+            # On disk before the rows are gone
+            archive_file.flush()
+            raw.flush()
+            os.fsync(raw.fileno())
+
+            ids = [row['id'] for row in chunk]
+            total += delete_rows(name, ids)
+            last_id = ids[-1]
+            if progress:
+                progress(total)
+    finally:
+        if archive_file is not None:
+            archive_file.close()
+            raw.close()
+    return total, path if total else None
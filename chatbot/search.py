@@ -0,0 +1,291 @@
+"""
+Full-text search over a user's journal entries and chat messages.
+
+Both are copied into one inverted index table, ``chatbot_search``, which the
+signals in ``chatbot/signals.py`` keep up to date on save and delete:
+
+- SQLite: an FTS5 virtual table (porter stemming, with prefix indexes for
+  search-as-you-type). The owner is an indexed ``u<id>`` token, so
+  restricting a query to one user is part of the index lookup rather than a
+  filter over every user's matches. FTS5's bm25() is not used for ranking:
+  its IDF pass walks the match list of every user, which takes 50-200 ms
+  for common words and prefixes in a 1M-row index. Instead the user's
+  MAX_CANDIDATES most recent matches (by created_at) are ranked in Python
+  by their length-normalized match counts; when there are more, the
+  search reports that it was truncated, so the page can suggest a
+  narrower query.
+- PostgreSQL: a table with a generated ``tsvector`` column and a GIN index,
+  ranked by ts_rank, with ts_headline snippets.
+
+Each row's id is the source row id times two plus the kind, so saving a row
+replaces its index entry. The table is created (and filled from existing
+rows) by migration 0017; ``manage.py rebuild_search_index`` refills it.
+"""
+from datetime import datetime, timezone as dt_timezone
+import html
+import re
+
+from django.db import connection
+
+TABLE = 'chatbot_search'
+
+# kind: (model label, text field); the position is folded into the row id
+KINDS = {
+    'journal': ('chatbot.JournalEntry', 'content'),
+    'chat': ('chatbot.ChatMessage', 'message'),
+}
+KIND_NUMBERS = {kind: number for number, kind in enumerate(KINDS)}
+
+# Snippet highlight markers, replaced with <mark> after HTML-escaping
+START, STOP = '\x02', '\x03'
+
+SQLITE_SCHEMA = [
+    """CREATE VIRTUAL TABLE {table} USING fts5(
+        body, owner, kind UNINDEXED, object_id UNINDEXED, created_at UNINDEXED,
+        tokenize = 'porter unicode61', prefix = '2 3 4'
+    )""",
+]
+
+POSTGRES_SCHEMA = [
+    """CREATE TABLE {table} (
+        id bigint PRIMARY KEY,
+        kind varchar(10) NOT NULL,
+        object_id bigint NOT NULL,
+        user_id integer NOT NULL,
+        created_at timestamp with time zone NOT NULL,
+        body text NOT NULL,
+        document tsvector GENERATED ALWAYS AS (to_tsvector('english', body)) STORED
+    )""",
+    "CREATE INDEX {table}_document ON {table} USING GIN (document)",
+    "CREATE INDEX {table}_user ON {table} (user_id)",
+]
+
+
+class SearchUnavailable(Exception):
+    pass
+
+
+def vendor(conn=None):
+    vendor = (conn or connection).vendor
+    if vendor not in ('sqlite', 'postgresql'):
+        raise SearchUnavailable(f'Full-text search is not supported on {vendor}')
+    return vendor
+
+
+def schema(conn=None, table=TABLE, temporary=False):
+    """CREATE statements for the index table"""
+    statements = SQLITE_SCHEMA if vendor(conn) == 'sqlite' else POSTGRES_SCHEMA
+    if temporary:
+        # A temporary table of the same name shadows the real one for this
+        # connection (used by the benchmark)
+        statements = [
+            statement.replace('CREATE VIRTUAL TABLE {table}', 'CREATE VIRTUAL TABLE temp.{table}')
+            .replace('CREATE TABLE', 'CREATE TEMPORARY TABLE')
+            for statement in statements
+        ]
+    return [statement.format(table=table) for statement in statements]
+
+
+def row_id(kind, object_id):
+    return object_id * len(KINDS) + KIND_NUMBERS[kind]
+
+
+def rows_sql(kind, conn=None):
+    """SELECT producing index rows for every row of `kind`, in the table's column order"""
+    model_label, text_field = KINDS[kind]
+    source = f"chatbot_{model_label.split('.')[1].lower()}"
+    number, count = KIND_NUMBERS[kind], len(KINDS)
+    if vendor(conn) == 'sqlite':
+        return (
+            f"SELECT id * {count} + {number}, {text_field}, 'u' || user_id, '{kind}', id, created_at "
+            f"FROM {source}"
+        )
+    return f"SELECT id * {count} + {number}, '{kind}', id, user_id, created_at, {text_field} FROM {source}"
+
+
+def fill(cursor, conn=None, table=TABLE):
+    """Index every journal entry and chat message (the table must be empty)"""
+    columns = (
+        '(rowid, body, owner, kind, object_id, created_at)' if vendor(conn) == 'sqlite'
+        else '(id, kind, object_id, user_id, created_at, body)'
+    )
+    for kind in KINDS:
+        cursor.execute(f'INSERT INTO {table} {columns} {rows_sql(kind, conn)}')
+
+
+def sqlite_datetime(value):
+    """`value` the way Django stores datetimes on SQLite (naive UTC)"""
+    return str(value.astimezone(dt_timezone.utc).replace(tzinfo=None))
+
+
+def parse_datetime(value):
+    """Stored created_at as an aware datetime"""
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    return value if value.tzinfo else value.replace(tzinfo=dt_timezone.utc)
+
+
+def index_rows(rows, replace=True):
+    """
+    Add index entries from (kind, object_id, user_id, created_at, text)
+    tuples, replacing existing entries for the same rows unless `replace` is
+    False (for rows known to be new).
+    """
+    rows = list(rows)
+    if not rows:
+        return
+    with connection.cursor() as cursor:
+        if vendor() == 'sqlite':
+            if replace:
+                ids = [(row_id(kind, object_id),) for kind, object_id, _, _, _ in rows]
+                cursor.executemany(f'DELETE FROM {TABLE} WHERE rowid = %s', ids)
+            cursor.executemany(
+                f'INSERT INTO {TABLE} (rowid, body, owner, kind, object_id, created_at) VALUES (%s, %s, %s, %s, %s, %s)',
+                [
+                    (row_id(kind, object_id), text, f'u{user_id}', kind, object_id, sqlite_datetime(created_at))
+                    for kind, object_id, user_id, created_at, text in rows
+                ]
+            )
+        else:
+            cursor.executemany(
+                f'INSERT INTO {TABLE} (id, kind, object_id, user_id, created_at, body) VALUES (%s, %s, %s, %s, %s, %s) '
+                'ON CONFLICT (id) DO UPDATE SET body = EXCLUDED.body, created_at = EXCLUDED.created_at',
+                [
+                    (row_id(kind, object_id), kind, object_id, user_id, created_at, text)
+                    for kind, object_id, user_id, created_at, text in rows
+                ]
+            )
+
+
+def index_instance(kind, instance):
+    """Add or replace the index entry of a journal entry or chat message"""
+    text = getattr(instance, KINDS[kind][1])
+    index_rows([(kind, instance.pk, instance.user_id, instance.created_at, text)])
+
+
+def remove_ids(kind, object_ids):
+    """Drop the index entries of the given rows of `kind`"""
+    column = 'rowid' if vendor() == 'sqlite' else 'id'
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            f'DELETE FROM {TABLE} WHERE {column} = %s',
+            [(row_id(kind, object_id),) for object_id in object_ids]
+        )
+
+
+def remove_instance(kind, instance):
+    remove_ids(kind, [instance.pk])
+
+
+# Longest prefix with its own FTS5 prefix index (see SQLITE_SCHEMA)
+MAX_PREFIX = 4
+
+# Most recent matches (by created_at) ranked per SQLite query
+MAX_CANDIDATES = 300
+
+
+def match_expression(user_id, query):
+    """
+    FTS5 query for the user's rows containing every word. A short last word
+    also matches as a prefix (as typed so far); longer words rely on
+    stemming, since prefixes beyond MAX_PREFIX have no index.
+    """
+    words = re.findall(r'\w+', query.lower())
+    if not words:
+        return None
+    terms = [f'"{word}"' for word in words]
+    if len(words[-1]) <= MAX_PREFIX:
+        terms[-1] += '*'
+    return f'owner : "u{user_id}" AND body : ({" ".join(terms)})'
+
+
+def highlight(snippet):
+    """HTML for a snippet: escaped text with the matches in <mark>"""
+    return html.escape(snippet).replace(START, '<mark>').replace(STOP, '</mark>')
+
+
+def rank_candidates(rows, k1=1.2, b=0.75):
+    """
+    (score, row) pairs, best first, for (kind, object_id, created_at,
+    highlighted text) rows newest first. The score is BM25's term-frequency
+    part over the highlighted matches, normalized by the row's length
+    against the candidates' average.
+    """
+    if not rows:
+        return []
+    lengths = [len(row[3].split()) for row in rows]
+    average_length = sum(lengths) / len(lengths)
+    scored = []
+    for row, length in zip(rows, lengths):
+        matches = row[3].count(START)
+        score = matches * (k1 + 1) / (matches + k1 * (1 - b + b * length / average_length))
+        scored.append((score, row))
+    # sorted() is stable, so equal scores stay newest first
+    return sorted(scored, key=lambda item: -item[0])
+
+
+def make_snippet(highlighted, words=16):
+    """About `words` words of highlighted text around its first match"""
+    tokens = highlighted.split()
+    first = next((i for i, token in enumerate(tokens) if START in token), 0)
+    start = max(0, min(first - words // 4, len(tokens) - words))
+    snippet = ' '.join(tokens[start:start + words])
+    snippet += STOP * (snippet.count(START) - snippet.count(STOP))
+    return ('…' if start > 0 else '') + snippet + ('…' if start + words < len(tokens) else '')
+
+
+def search(user_id, query, page=1, page_size=20):
+    """
+    One page of the user's journal entries and chat messages matching
+    `query`, best match first, whether there is a next page, and whether
+    only the MAX_CANDIDATES most recent matches were ranked (SQLite).
+    Results are dicts with kind, id, created_at, rank and an HTML snippet.
+    """
+    offset = (page - 1) * page_size
+    truncated = False
+    with connection.cursor() as cursor:
+        if vendor() == 'sqlite':
+            expression = match_expression(user_id, query)
+            if expression is None:
+                return [], False, False
+            # created_at is stored as ISO text, which sorts chronologically;
+            # one more row than is ranked tells whether there are more
+            cursor.execute(
+                f"SELECT kind, object_id, created_at, highlight({TABLE}, 0, %s, %s) "
+                f"FROM {TABLE} WHERE {TABLE} MATCH %s ORDER BY created_at DESC, rowid DESC LIMIT %s",
+                [START, STOP, expression, MAX_CANDIDATES + 1]
+            )
+            candidates = cursor.fetchall()
+            truncated = len(candidates) > MAX_CANDIDATES
+            rows = [
+                (kind, object_id, created_at, score, make_snippet(highlighted))
+                for score, (kind, object_id, created_at, highlighted)
+                in rank_candidates(candidates[:MAX_CANDIDATES])
+            ][offset:offset + page_size + 1]
+        else:
+            if not query.strip():
+                return [], False, False
+            # Rank in the inner query so ts_headline only runs on the page
+            cursor.execute(
+                f"SELECT page.kind, page.object_id, page.created_at, page.rank, "
+                f"ts_headline('english', page.body, page.query, %s) "
+                f"FROM (SELECT kind, object_id, created_at, body, query, ts_rank(document, query) AS rank "
+                f"FROM {TABLE}, websearch_to_tsquery('english', %s) query "
+                f"WHERE user_id = %s AND document @@ query "
+                f"ORDER BY rank DESC, created_at DESC LIMIT %s OFFSET %s) page "
+                f"ORDER BY page.rank DESC, page.created_at DESC",
+                [f'StartSel={START}, StopSel={STOP}, MaxWords=24, MinWords=8', query, user_id, page_size + 1, offset]
+            )
+            rows = cursor.fetchall()
+
+    results = [
+        {
+            'kind': kind,
+            'id': object_id,
+            'created_at': parse_datetime(created_at).isoformat(),
+            'rank': round(float(rank), 6),
+            'snippet': highlight(snippet),
+        }
+        for kind, object_id, created_at, rank, snippet in rows[:page_size]
+    ]
+    return results, len(rows) > page_size, truncated
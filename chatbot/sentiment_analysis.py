@@ -1,10 +1,212 @@
-from transformers import pipeline
+"""
+Sentiment scoring for journal entries and chat messages.
 
-# Load a sentiment-analysis pipeline
-sentiment_pipeline = pipeline("sentiment-analysis")
+The model is loaded lazily, once per process, from the local directory
+SENTIMENT_MODEL_PATH (``models/sentiment``) with the Hub switched off, the
+same way the DialoGPT model is loaded from ``models/dialoGPT-small``.
+Importing this module doesn't import torch or transformers, so web
+processes, management commands and ``start.py`` don't pay for them until
+something is actually scored (``manage.py check_import_time`` verifies this).
+Fetch the model once with ``manage.py download_sentiment_model``.
+
+Scoring is tiered. Short texts first go through NLTK's VADER lexicon, which
+takes microseconds; when its compound score is clear-cut (at least
+SENTIMENT_FAST_PATH_THRESHOLD either way) that answer is used, and only the
+remaining texts are batched through the transformer. Every result records
+the tier that produced it, and ``get_tier_stats()`` counts them per process.
+Without a local transformer the lexicon's answers are still returned, and
+the texts it wasn't sure about are left unscored (stale) until one is there.
+"""
+import collections
+import logging
+import os
+import threading
+
+from django.conf import settings
+from django.db.models import Q
+
+logger = logging.getLogger(__name__)
+
+# Texts per forward pass in get_sentiments
+DEFAULT_BATCH_SIZE = 16
+
+# Tier names stored on scored rows
+FAST_TIER = 'lexicon'
+TRANSFORMER_TIER = 'transformer'
+
+Sentiment = collections.namedtuple('Sentiment', ['label', 'score', 'tier'])
+
+_pipeline = None
+_pipeline_lock = threading.Lock()
+_vader = None
+_vader_lock = threading.Lock()
+_vader_missing = False
+
+_tier_stats_lock = threading.Lock()
+_tier_stats = collections.Counter()
+
+class SentimentUnavailable(Exception):
+    """Raised when the local sentiment model can't be loaded."""
+
+def load_pipeline(model_path):
+    """Build the sentiment-analysis pipeline from a local directory, offline."""
+    if not os.path.exists(os.path.join(model_path, 'config.json')):
+        raise SentimentUnavailable(
+            f"Sentiment model files not found at {model_path}; run `manage.py download_sentiment_model`"
+        )
+
+    # Set environment variables for offline mode
+    os.environ['TRANSFORMERS_OFFLINE'] = '1'
+    os.environ['HF_DATASETS_OFFLINE'] = '1'
+    from transformers import AutoModelForSequenceClassification, AutoTokenizer, pipeline
+
+    tokenizer = AutoTokenizer.from_pretrained(model_path, local_files_only=True)
+    model = AutoModelForSequenceClassification.from_pretrained(model_path, local_files_only=True)
+    logger.info(f"Loaded sentiment model from {model_path}")
+    return pipeline("sentiment-analysis", model=model, tokenizer=tokenizer)
+
+def get_pipeline():
+    """Return the process-wide pipeline, loading it on first use."""
+    global _pipeline
+    if _pipeline is None:
+        with _pipeline_lock:
+            if _pipeline is None:
+                _pipeline = load_pipeline(settings.SENTIMENT_MODEL_PATH)
+    return _pipeline
+
+def get_vader():
+    """
+    Return the process-wide VADER analyzer, or None if the lexicon isn't in
+    NLTK_DATA_PATH (then every text goes to the transformer).
+    """
+    global _vader, _vader_missing
+    if _vader is None and not _vader_missing:
+        with _vader_lock:
+            if _vader is None and not _vader_missing:
+                import nltk
+                from nltk.sentiment.vader import SentimentIntensityAnalyzer
+
+                if settings.NLTK_DATA_PATH not in nltk.data.path:
+                    nltk.data.path.insert(0, settings.NLTK_DATA_PATH)
+                try:
+                    _vader = SentimentIntensityAnalyzer()
+                except LookupError:
+                    logger.warning(
+                        f"VADER lexicon not found in {settings.NLTK_DATA_PATH}; run "
+                        f"`manage.py download_sentiment_model`. Scoring everything with the transformer."
+                    )
+                    _vader_missing = True
+    return _vader
+
+def model_version():
+    """
+    Identifies what produced a stored score: the transformer plus, when the
+    fast path is on, the lexicon threshold. Rows with another version are
+    re-scored by `manage.py score_sentiment`.
+    """
+    if not settings.SENTIMENT_FAST_PATH:
+        return settings.SENTIMENT_MODEL
+    return f"{settings.SENTIMENT_MODEL}+vader>={settings.SENTIMENT_FAST_PATH_THRESHOLD}"
+
+def fast_sentiment(text):
+    """The lexicon tier's answer for `text`, or None if it isn't confident."""
+    if len(text) > settings.SENTIMENT_FAST_PATH_MAX_CHARS:
+        return None
+    vader = get_vader()
+    if vader is None:
+        return None
+    compound = vader.polarity_scores(text)['compound']
+    if abs(compound) < settings.SENTIMENT_FAST_PATH_THRESHOLD:
+        return None
+    # Map |compound| in [threshold, 1] onto a confidence like the transformer's
+    return Sentiment('POSITIVE' if compound > 0 else 'NEGATIVE', (1 + abs(compound)) / 2, FAST_TIER)
+
+def get_sentiments(texts, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Score many texts at once; returns Sentiment(label, score, tier) tuples in
+    input order. Clear-cut short texts are answered by the lexicon tier; the
+    rest are sorted by length before batching so each batch is only padded
+    to its own longest text, and anything longer than the model's maximum
+    input is truncated. If the transformer is needed but there is no local
+    model, the texts the lexicon didn't answer are left as None.
+    """
+    texts = list(texts)
+    results = [None] * len(texts)
+    if settings.SENTIMENT_FAST_PATH:
+        for i, text in enumerate(texts):
+            results[i] = fast_sentiment(text)
+
+    remaining = [i for i, result in enumerate(results) if result is None]
+    if remaining:
+        try:
+            sentiment_pipeline = get_pipeline()
+        except SentimentUnavailable as e:
+            logger.warning(f"{e}; leaving {len(remaining)} of {len(texts)} texts unscored")
+            sentiment_pipeline = None
+    if remaining and sentiment_pipeline is not None:
+        order = sorted(remaining, key=lambda i: len(texts[i]))
+        for start in range(0, len(order), batch_size):
+            batch = order[start:start + batch_size]
+            outputs = sentiment_pipeline(
+                [texts[i] for i in batch],
+                batch_size=len(batch),
+                truncation=True
+            )
+            for i, result in zip(batch, outputs):
+                results[i] = Sentiment(result['label'], result['score'], TRANSFORMER_TIER)
+
+    with _tier_stats_lock:
+        _tier_stats[FAST_TIER] += len(texts) - len(remaining)
+        _tier_stats[TRANSFORMER_TIER] += sum(1 for i in remaining if results[i] is not None)
+    return results
 
 def get_sentiment(text):
-    result = sentiment_pipeline(text)[0]
-    label = result['label']
-    score = result['score']
-    return label, score
+    """(label, score) of one text; raises SentimentUnavailable if it can't be scored."""
+    result = get_sentiments([text])[0]
+    if result is None:
+        raise SentimentUnavailable(f"No local sentiment model at {settings.SENTIMENT_MODEL_PATH}")
+    return result.label, result.score
+
+def get_tier_stats():
+    """Texts answered by each tier in this process, and the lexicon's share."""
+    with _tier_stats_lock:
+        fast, transformer = _tier_stats[FAST_TIER], _tier_stats[TRANSFORMER_TIER]
+    total = fast + transformer
+    return {
+        FAST_TIER: fast,
+        TRANSFORMER_TIER: transformer,
+        'fast_path_ratio': fast / total if total else None,
+    }
+
+def is_stale(instance):
+    """True if the row has no score from the current model version"""
+    return instance.sentiment_model != model_version()
+
+def stale(queryset):
+    """Rows of a JournalEntry/ChatMessage queryset that need (re-)scoring"""
+    return queryset.filter(Q(sentiment_model__isnull=True) | ~Q(sentiment_model=model_version()))
+
+def score_instances(instances, text_field, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Score the stale rows among `instances` (JournalEntry or ChatMessage
+    objects, whose text is in `text_field`) and save them with one
+    bulk_update. Returns the number of rows scored; rows nothing could score
+    (see get_sentiments) stay stale.
+    """
+    instances = [instance for instance in instances if is_stale(instance)]
+    if not instances:
+        return 0
+
+    sentiments = get_sentiments([getattr(instance, text_field) for instance in instances], batch_size)
+    version = model_version()
+    scored = []
+    for instance, sentiment in zip(instances, sentiments):
+        if sentiment is None:
+            continue
+        instance.sentiment_label, instance.sentiment_score, instance.sentiment_tier = sentiment
+        instance.sentiment_model = version
+        scored.append(instance)
+    type(instances[0]).objects.bulk_update(
+        scored, ['sentiment_label', 'sentiment_score', 'sentiment_tier', 'sentiment_model'], batch_size=500
+    )
+    return len(scored)
@@ -0,0 +1,108 @@
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from . import analytics, response_cache, search, tasks
+from .models import ChatMessage, JournalEntry, MoodEntry
+
+SEARCH_KINDS = {
+    JournalEntry: 'journal',
+    ChatMessage: 'chat',
+}
+
+SOURCE_MODELS = {
+    MoodEntry: 'mood',
+    JournalEntry: 'journal',
+    ChatMessage: 'chat',
+}
+
+
+@receiver([post_save, post_delete], sender=MoodEntry)
+@receiver([post_save, post_delete], sender=JournalEntry)
+@receiver([post_save, post_delete], sender=ChatMessage)
+def invalidate_cached_responses(sender, instance, **kwargs):
+    """New or changed user data makes cached dashboard replies stale"""
+    response_cache.invalidate(instance.user_id, SOURCE_MODELS[sender])
+
+
+@receiver(post_save, sender=MoodEntry)
+@receiver(post_save, sender=JournalEntry)
+@receiver(post_save, sender=ChatMessage)
+def schedule_dashboard_refresh(sender, instance, **kwargs):
+    """Precompute the dashboard in the background once the user's data changes"""
+    tasks.enqueue(instance.user_id, 'dashboard')
+
+
+@receiver(post_delete, sender=MoodEntry)
+@receiver(post_delete, sender=JournalEntry)
+@receiver(post_delete, sender=ChatMessage)
+def schedule_dashboard_refresh_after_delete(sender, instance, **kwargs):
+    """
+    Like schedule_dashboard_refresh, once the delete is committed: when the
+    row goes because its user is deleted, a task queued now would point at
+    the user being removed.
+    """
+    user_id = instance.user_id
+
+    def enqueue():
+        if User.objects.filter(pk=user_id).exists():
+            tasks.enqueue(user_id, 'dashboard')
+
+    transaction.on_commit(enqueue)
+
+
+@receiver(pre_save, sender=MoodEntry)
+def remember_mood_day(sender, instance, **kwargs):
+    """Note what an edited entry was, in case the edit moves it to another day or heatmap cell"""
+    if instance.pk is None:
+        return
+    previous = MoodEntry.objects.filter(pk=instance.pk).values_list('user_id', 'created_at', 'mood').first()
+    if previous:
+        instance._previous_rollup_day = (previous[0], timezone.localdate(previous[1]))
+        instance._previous_entry = previous
+
+
+@receiver([post_save, post_delete], sender=MoodEntry)
+def update_mood_rollup(sender, instance, **kwargs):
+    """Keep the MoodDailyRollup of the entry's day in step with it"""
+    day = (instance.user_id, timezone.localdate(instance.created_at))
+    previous_day = getattr(instance, '_previous_rollup_day', None)
+    if previous_day and previous_day != day:
+        analytics.refresh_rollup(*previous_day)
+    analytics.refresh_rollup(*day)
+
+
+@receiver(post_save, sender=MoodEntry)
+def add_to_hourly_rollup(sender, instance, **kwargs):
+    """Move the entry's count in the heatmap rollup from its old cell (if edited) to its cell"""
+    previous = getattr(instance, '_previous_entry', None)
+    if previous:
+        analytics.adjust_hourly_rollup(*previous, -1)
+        del instance._previous_entry
+    analytics.adjust_hourly_rollup(instance.user_id, instance.created_at, instance.mood, 1)
+
+
+@receiver(post_delete, sender=MoodEntry)
+def remove_from_hourly_rollup(sender, instance, **kwargs):
+    analytics.adjust_hourly_rollup(instance.user_id, instance.created_at, instance.mood, -1)
+
+
+@receiver(post_save, sender=JournalEntry)
+@receiver(post_save, sender=ChatMessage)
+def index_for_search(sender, instance, **kwargs):
+    """Add or replace the row's full-text search entry"""
+    try:
+        search.index_instance(SEARCH_KINDS[sender], instance)
+    except search.SearchUnavailable:
+        pass
+
+
+@receiver(post_delete, sender=JournalEntry)
+@receiver(post_delete, sender=ChatMessage)
+def remove_from_search(sender, instance, **kwargs):
+    try:
+        search.remove_instance(SEARCH_KINDS[sender], instance)
+    except search.SearchUnavailable:
+        pass
@@ -0,0 +1,66 @@
+"""
+Persistence for generated self-care suggestions.
+
+A generated batch is written once, with one bulk_create in one transaction.
+Suggestions the user already has open (same category and text, ignoring
+case and spacing) are skipped, and each user keeps at most
+MAX_OPEN_SUGGESTIONS open suggestions: the oldest ones not saved for later
+are deleted beyond that, so the table doesn't grow with every refresh.
+"""
+from django.conf import settings
+from django.db import transaction
+
+from .models import SelfCareSuggestion
+
+DURATION_MAX_LENGTH = SelfCareSuggestion._meta.get_field('duration').max_length
+
+
+def suggestion_key(category, text):
+    return category, ' '.join(text.lower().split())
+
+
+def save_suggestions(user, suggestions, sentiment, replace=False):
+    """
+    Save parsed suggestions ({'category', 'suggestion', 'duration'} dicts)
+    that aren't open duplicates; returns the created rows. With `replace`,
+    the user's open suggestions are marked completed in the same
+    transaction first (nothing happens for an empty batch).
+    """
+    if not suggestions:
+        return []
+
+    with transaction.atomic():
+        open_suggestions = SelfCareSuggestion.objects.filter(user=user, is_completed=False)
+        if replace:
+            open_suggestions.update(is_completed=True)
+            seen = set()
+        else:
+            seen = {
+                suggestion_key(category, text)
+                for category, text in open_suggestions.values_list('category', 'suggestion')
+            }
+
+        rows = []
+        for suggestion in suggestions:
+            key = suggestion_key(suggestion['category'], suggestion['suggestion'])
+            if key in seen:
+                continue
+            seen.add(key)
+            rows.append(SelfCareSuggestion(
+                user=user,
+                suggestion=suggestion['suggestion'],
+                category=suggestion['category'],
+                duration=suggestion['duration'][:DURATION_MAX_LENGTH],
+                sentiment=sentiment
+            ))
+        created = SelfCareSuggestion.objects.bulk_create(rows)
+
+        # Cap the open suggestions, keeping the newest and the saved ones
+        excess = list(
+            open_suggestions.filter(is_saved=False)
+            .order_by('-created_at', '-id')
+            .values_list('id', flat=True)[settings.MAX_OPEN_SUGGESTIONS:]
+        )
+        if excess:
+            SelfCareSuggestion.objects.filter(id__in=excess).delete()
+    return created
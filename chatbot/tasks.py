@@ -0,0 +1,161 @@
+"""
+A small database-backed task queue for the dashboard's model work.
+
+Saving a mood entry, journal entry or chat message enqueues a ``dashboard``
+task for the user (see ``chatbot/signals.py``); the "Get New Suggestions"
+button enqueues ``refresh_suggestions``. ``manage.py run_tasks`` polls the
+BackgroundTask table and runs them, so ``home`` only renders what is stored
+in the user's DashboardSnapshot and SelfCareSuggestion rows.
+
+A pending task for the same user and kind absorbs new requests, and tasks
+wait ``BACKGROUND_TASK_DELAY`` seconds before running, so a burst of saves
+(e.g. a chat conversation) costs one precomputation. Workers claim a task
+with a conditional UPDATE, which works the same on SQLite and PostgreSQL
+and lets several workers share the table.
+"""
+from datetime import timedelta
+import logging
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from .models import BackgroundTask, ChatMessage, DashboardSnapshot, JournalEntry, MoodEntry
+from . import embeddings
+from .sentiment_analysis import score_instances, stale
+from .utils import get_mood_insights, generate_self_care_suggestions
+
+logger = logging.getLogger(__name__)
+
+MAX_ATTEMPTS = 3
+# A running task not finished after this long is assumed lost with its worker
+STALE_AFTER = timedelta(minutes=10)
+
+
+def enqueue(user_id, kind, delay=None):
+    """Queue `kind` for the user unless it is already pending; returns the task."""
+    if delay is None:
+        delay = settings.BACKGROUND_TASK_DELAY
+    task = BackgroundTask.objects.filter(user_id=user_id, kind=kind, status='pending').first()
+    if task is None:
+        try:
+            with transaction.atomic():
+                task = BackgroundTask.objects.create(
+                    user_id=user_id,
+                    kind=kind,
+                    run_after=timezone.now() + timedelta(seconds=delay)
+                )
+        except IntegrityError:
+            # Another process queued it first (one_pending_task_per_kind)
+            task = BackgroundTask.objects.get(user_id=user_id, kind=kind, status='pending')
+    return task
+
+
+def _requeue(task, run_after, error_message=None):
+    """
+    Put a task back as pending, unless the same work is already pending
+    (queued while it ran), in which case it is dropped in favour of that one.
+    Returns whether it was requeued.
+    """
+    fields = {'status': 'pending', 'run_after': run_after, 'error_message': error_message}
+    if not BackgroundTask.objects.filter(user_id=task.user_id, kind=task.kind, status='pending').exists():
+        try:
+            with transaction.atomic():
+                BackgroundTask.objects.filter(pk=task.pk).update(**fields)
+            return True
+        except IntegrityError:
+            pass
+    BackgroundTask.objects.filter(pk=task.pk).update(
+        status='failed',
+        finished_at=timezone.now(),
+        error_message='Superseded by a pending task of the same kind' + (f' after: {error_message}' if error_message else '')
+    )
+    return False
+
+
+def is_refreshing(user_id):
+    """True while dashboard work for the user is queued or running."""
+    return BackgroundTask.objects.filter(user_id=user_id, status__in=['pending', 'running']).exists()
+
+
+def claim_next():
+    """Mark the next due task as running and return it (None if there is none)."""
+    now = timezone.now()
+    for task in BackgroundTask.objects.filter(status='pending', run_after__lte=now)[:10]:
+        claimed = BackgroundTask.objects.filter(pk=task.pk, status='pending').update(
+            status='running', started_at=now, attempts=task.attempts + 1
+        )
+        if claimed:
+            task.refresh_from_db()
+            return task
+    return None
+
+
+def requeue_stale():
+    """Put back tasks whose worker died while running them; returns how many."""
+    stale_tasks = BackgroundTask.objects.filter(status='running', started_at__lt=timezone.now() - STALE_AFTER)
+    return sum(_requeue(task, timezone.now()) for task in stale_tasks)
+
+
+def run_task(task):
+    """Run a claimed task, retrying with a backoff if it fails."""
+    try:
+        TASKS[task.kind](task.user)
+    except Exception as e:
+        logger.error(f"Background task {task.pk} ({task.kind}) failed: {str(e)}")
+        if task.attempts < MAX_ATTEMPTS:
+            _requeue(task, timezone.now() + timedelta(seconds=30 * 2 ** task.attempts), str(e))
+        else:
+            task.status = 'failed'
+            task.finished_at = timezone.now()
+            task.error_message = str(e)
+            task.save(update_fields=['status', 'finished_at', 'error_message'])
+        return False
+
+    task.status = 'done'
+    task.finished_at = timezone.now()
+    task.save(update_fields=['status', 'finished_at'])
+    return True
+
+
+def score_new_rows(user):
+    """Store the sentiment of the user's journal entries and chat messages saved since the last run."""
+    score_instances(stale(JournalEntry.objects.filter(user=user)), 'content')
+    score_instances(stale(ChatMessage.objects.filter(user=user)), 'message')
+
+
+def embed_new_entries(user):
+    """Encode the user's journal entries added or edited since the last run."""
+    try:
+        embeddings.embed_instances(embeddings.stale(JournalEntry.objects.filter(user=user)))
+    except embeddings.EmbeddingsUnavailable as e:
+        logger.warning(str(e))
+
+
+def refresh_dashboard(user):
+    """Precompute mood insights and self-care suggestions for the user."""
+    score_new_rows(user)
+    embed_new_entries(user)
+
+    mood_entries = list(MoodEntry.objects.filter(user=user).order_by('-created_at')[:10])
+    recent_moods = MoodEntry.objects.filter(user=user).order_by('-created_at')[:5]
+    recent_journals = JournalEntry.objects.filter(user=user).order_by('-created_at')[:5]
+
+    DashboardSnapshot.objects.update_or_create(
+        user=user,
+        defaults={'mood_insights': get_mood_insights(mood_entries) if mood_entries else None}
+    )
+    generate_self_care_suggestions(user, recent_moods, recent_journals)
+
+
+def refresh_suggestions(user):
+    """Replace the user's open suggestions with newly generated ones."""
+    recent_moods = MoodEntry.objects.filter(user=user).order_by('-created_at')[:5]
+    recent_journals = JournalEntry.objects.filter(user=user).order_by('-created_at')[:5]
+    generate_self_care_suggestions(user, recent_moods, recent_journals, refresh=True)
+
+
+TASKS = {
+    'dashboard': refresh_dashboard,
+    'refresh_suggestions': refresh_suggestions,
+}
@@ -0,0 +1,73 @@
+import time
+
+from django.test import SimpleTestCase
+
+from chatbot.conversation import ConversationCache, Session
+
+
+class Tensor:
+    """Just the size methods Session reads from a key/value tensor"""
+
+    def __init__(self, nbytes):
+        self.nbytes = nbytes
+
+    def element_size(self):
+        return 1
+
+    def nelement(self):
+        return self.nbytes
+
+
+def session(nbytes, turns=('hi', 'hello')):
+    # One layer of (key, value)
+    return Session(ids=None, past=[(Tensor(nbytes // 2), Tensor(nbytes // 2))], turns=turns)
+
+
+class SessionTests(SimpleTestCase):
+    def test_size(self):
+        self.assertEqual(session(100).nbytes, 100)
+
+    def test_continues_only_from_its_last_turn(self):
+        current = session(10, turns=('how are you', 'fine'))
+        self.assertTrue(current.continues(['hi', 'hello', 'how are you', 'fine']))
+        self.assertFalse(current.continues(['how are you', 'fine', 'and you?', 'good']))
+        self.assertFalse(current.continues(['fine']))
+
+
+class ConversationCacheTests(SimpleTestCase):
+    def test_evicts_least_recently_stored_over_the_budget(self):
+        cache = ConversationCache(max_bytes=300, idle_timeout=60)
+        for key in 'abc':
+            cache.put(key, session(100))
+        cache.put('a', cache.pop('a'))
+        cache.put('d', session(100))
+
+        self.assertIsNone(cache.pop('b'))
+        self.assertIsNotNone(cache.pop('a'))
+        self.assertEqual(cache.stats()['evictions'], 1)
+
+    def test_replacing_a_key_keeps_the_byte_count(self):
+        cache = ConversationCache(max_bytes=1000, idle_timeout=60)
+        cache.put('a', session(100))
+        cache.put('a', session(300))
+        self.assertEqual(cache.bytes, 300)
+        self.assertEqual(cache.stats()['entries'], 1)
+
+    def test_too_large_sessions_are_not_kept(self):
+        cache = ConversationCache(max_bytes=100, idle_timeout=60)
+        cache.put('a', session(50))
+        cache.put('b', session(200))
+        self.assertIsNone(cache.pop('b'))
+        self.assertEqual(cache.bytes, 50)
+
+    def test_idle_sessions_expire(self):
+        cache = ConversationCache(max_bytes=1000, idle_timeout=60)
+        old, fresh = session(100), session(100)
+        old.last_used = time.monotonic() - 120
+        cache.put('old', old)
+        cache.put('fresh', fresh)
+
+        cache.expire()
+        self.assertEqual(cache.stats()['entries'], 1)
+        self.assertEqual(cache.bytes, 100)
+        self.assertIs(cache.pop('fresh'), fresh)
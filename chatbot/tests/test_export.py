@@ -0,0 +1,119 @@
+from datetime import datetime, timezone as dt_timezone
+import csv
+import gzip
+import io
+import json
+
+from asgiref.sync import async_to_sync
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+
+from chatbot import export, importer
+from chatbot.models import (
+    BreathingExercise, ChatMessage, GoalProgress, JournalEntry, MeditationSession, MoodEntry, WellnessGoal
+)
+
+CREATED_AT = datetime(2024, 3, 1, 8, 30, 15, 123456, tzinfo=dt_timezone.utc)
+
+
+def export_text(user, export_format='ndjson', compress=False):
+    data = b''.join(export.export_chunks(user.id, export_format, compress, batch_bytes=64))
+    return (gzip.decompress(data) if compress else data).decode()
+
+
+class ExportTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('alice', password='secret')
+        MoodEntry.objects.create(user=self.user, mood='happy', notes='Sunny, "warm"', created_at=CREATED_AT)
+        JournalEntry.objects.create(user=self.user, content='Line one\nline two', created_at=CREATED_AT)
+        ChatMessage.objects.create(user=self.user, message='Hello', is_user=True, created_at=CREATED_AT)
+        exercise = BreathingExercise.objects.create(
+            name='Box', description='4-4-4', inhale_duration=4, hold_duration=4, exhale_duration=4
+        )
+        MeditationSession.objects.create(user=self.user, exercise=exercise, duration=5, completed=True)
+        goal = WellnessGoal.objects.create(user=self.user, goal_type='water', target='2L', frequency='daily')
+        GoalProgress.objects.create(goal=goal, progress='1L')
+        # Someone else's rows stay out
+        MoodEntry.objects.create(user=User.objects.create_user('bob'), mood='sad')
+
+    def test_ndjson_has_every_section_with_full_timestamps(self):
+        records = [json.loads(line) for line in export_text(self.user).splitlines()]
+        self.assertEqual(
+            [record['type'] for record in records], ['mood', 'journal', 'chat', 'meditation', 'goal', 'goal_progress']
+        )
+        self.assertEqual(records[0]['created_at'], '2024-03-01T08:30:15.123456+00:00')
+        self.assertEqual(records[1]['content'], 'Line one\nline two')
+        self.assertEqual(records[3]['exercise_name'], 'Box')
+
+    def test_csv_matches_ndjson(self):
+        rows = list(csv.DictReader(io.StringIO(export_text(self.user, 'csv'))))
+        self.assertEqual(rows[0]['type'], 'mood')
+        self.assertEqual(rows[0]['notes'], 'Sunny, "warm"')
+        self.assertEqual(rows[0]['created_at'], '2024-03-01T08:30:15.123456+00:00')
+        self.assertEqual(rows[0]['content'], '')
+        self.assertEqual(rows[1]['content'], 'Line one\nline two')
+        self.assertEqual(len(rows), 6)
+
+    def test_gzip(self):
+        self.assertEqual(export_text(self.user, compress=True), export_text(self.user))
+
+    def test_round_trip_through_the_importer(self):
+        for export_format in ('ndjson', 'csv'):
+            with self.subTest(export_format):
+                copy = User.objects.create_user(f'copy-{export_format}')
+                text = export_text(self.user, export_format)
+                result = importer.import_records(copy, importer.read_records(io.StringIO(text), export_format))
+                self.assertEqual((result.created, result.invalid), (2, 0))
+                self.assertEqual(
+                    list(MoodEntry.objects.filter(user=copy).values_list('mood', 'notes', 'created_at')),
+                    list(MoodEntry.objects.filter(user=self.user).values_list('mood', 'notes', 'created_at'))
+                )
+                self.assertEqual(JournalEntry.objects.get(user=copy).created_at, CREATED_AT)
+
+                # The copy's own export maps onto the same external ids
+                result = importer.import_records(
+                    copy, importer.read_records(io.StringIO(export_text(copy, export_format)), export_format)
+                )
+                self.assertEqual((result.created, result.duplicates), (0, 2))
+
+    def test_importing_an_export_into_the_same_account_adds_nothing(self):
+        # Entries saved through the app have no external id
+        MoodEntry.objects.create(user=self.user, mood='sad', notes='')
+        for export_format in ('ndjson', 'csv'):
+            with self.subTest(export_format):
+                text = export_text(self.user, export_format)
+                result = importer.import_records(self.user, importer.read_records(io.StringIO(text), export_format))
+                self.assertEqual((result.created, result.duplicates), (0, 3))
+        self.assertEqual(MoodEntry.objects.filter(user=self.user).count(), 2)
+        self.assertEqual(JournalEntry.objects.filter(user=self.user).count(), 1)
+
+    def test_async_chunks_match(self):
+        async def collect():
+            return [chunk async for chunk in export.aexport_chunks(self.user.id, 'csv', batch_bytes=64)]
+
+        chunks = async_to_sync(collect)()
+        self.assertGreater(len(chunks), 1)
+        self.assertEqual(b''.join(chunks).decode(), export_text(self.user, 'csv'))
+
+    @override_settings(ASYNC_VIEWS=True)
+    def test_view_streams_asynchronously_under_asgi(self):
+        self.client.login(username='alice', password='secret')
+        response = self.client.get('/export/')
+        self.assertTrue(response.is_async)
+        response.close()
+
+    def test_view_streams_a_download(self):
+        self.client.login(username='alice', password='secret')
+        response = self.client.get('/export/', {'format': 'csv', 'gzip': '1'})
+        self.assertEqual(response['Content-Type'], 'application/gzip')
+        self.assertIn(f'wellness-history-{self.user.id}.csv.gz', response['Content-Disposition'])
+        body = gzip.decompress(b''.join(response.streaming_content)).decode()
+        self.assertEqual(body, export_text(self.user, 'csv'))
+
+    def test_view_only_lets_staff_export_others(self):
+        self.client.login(username='alice', password='secret')
+        response = self.client.get('/export/', {'user': 'bob'})
+        records = [json.loads(line) for line in b''.join(response.streaming_content).decode().splitlines()]
+        self.assertNotIn('sad', [record.get('mood') for record in records])
+
+        self.assertEqual(self.client.get('/export/', {'format': 'xml'}).status_code, 400)
@@ -0,0 +1,112 @@
+import gzip
+import io
+import json
+import os
+import shutil
+import tempfile
+
+from django.contrib.auth.models import User
+from django.test import SimpleTestCase, TestCase
+
+from chatbot import importer, search
+from chatbot.models import JournalEntry, MoodEntry
+
+
+def ndjson(*records):
+    return io.StringIO(''.join(json.dumps(record) + '\n' for record in records))
+
+
+class ParseRecordTests(SimpleTestCase):
+    def test_infers_the_kind(self):
+        kind, fields = importer.parse_record({'content': 'Hello', 'date': '2024-01-01 10:00:00'})
+        self.assertEqual(kind, 'journal')
+        self.assertEqual(fields['created_at'].isoformat(), '2024-01-01T10:00:00+00:00')
+        self.assertTrue(fields['external_id'].startswith('journal:'))
+
+    def test_rejects_invalid_records(self):
+        for record, message in [
+            ({'type': 'mood', 'mood': 'meh', 'created_at': '2024-01-01'}, 'invalid mood'),
+            ({'type': 'journal', 'content': ' ', 'created_at': '2024-01-01T00:00'}, 'missing content'),
+            ({'type': 'mood', 'mood': 'happy'}, 'missing created_at'),
+            ({'type': 'mood', 'mood': 'happy', 'created_at': 'yesterday'}, 'invalid created_at'),
+            ({'notes': 'no kind'}, 'no type'),
+            ([1, 2], 'not an object'),
+        ]:
+            with self.assertRaisesMessage(importer.InvalidRecord, message):
+                importer.parse_record(record)
+
+    def test_other_types_are_unsupported(self):
+        with self.assertRaises(importer.UnsupportedRecord):
+            importer.parse_record({'type': 'chat', 'message': 'hi', 'created_at': '2024-01-01T00:00'})
+
+    def test_given_external_id_is_kept(self):
+        _, fields = importer.parse_record({'mood': 'sad', 'created_at': '2024-01-01T00:00', 'external_id': 'abc'})
+        self.assertEqual(fields['external_id'], 'abc')
+
+
+class JsonArrayTests(SimpleTestCase):
+    def test_decodes_across_small_reads(self):
+        data = json.dumps([{'n': i, 'text': 'x' * i} for i in range(50)] + [12345])
+        values = list(importer.iter_json_array(io.StringIO(data), read_size=7))
+        self.assertEqual(values[-1], 12345)
+        self.assertEqual([value['n'] for value in values[:-1]], list(range(50)))
+
+    def test_rejects_a_non_array(self):
+        with self.assertRaises(importer.InvalidRecord):
+            list(importer.iter_json_array(io.StringIO('{"a": 1}')))
+
+
+class ImportTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('alice')
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    def records(self):
+        return ndjson(
+            {'type': 'mood', 'mood': 'happy', 'notes': 'sunny', 'created_at': '2024-01-01T09:00:00Z'},
+            {'type': 'journal', 'content': 'Walked by the river', 'created_at': '2024-01-02T20:00:00Z'},
+            {'type': 'chat', 'message': 'skipped', 'created_at': '2024-01-02T20:00:00Z'},
+            {'type': 'mood', 'mood': 'grumpy', 'created_at': '2024-01-03T09:00:00Z'},
+        )
+
+    def test_imports_and_reports(self):
+        result = importer.import_records(self.user, importer.read_records(self.records(), 'ndjson'))
+        self.assertEqual((result.created, result.duplicates, result.skipped, result.invalid), (2, 0, 1, 1))
+        self.assertIn('record 4', result.errors[0])
+        self.assertEqual(MoodEntry.objects.get(user=self.user).notes, 'sunny')
+        # Imported journal entries are searchable
+        results, _, _ = search.search(self.user.id, 'river')
+        self.assertEqual([row['kind'] for row in results], ['journal'])
+
+    def test_importing_again_creates_nothing(self):
+        importer.import_records(self.user, importer.read_records(self.records(), 'ndjson'))
+        result = importer.import_records(self.user, importer.read_records(self.records(), 'ndjson'), chunk_size=1)
+        self.assertEqual((result.created, result.duplicates), (0, 2))
+        self.assertEqual(MoodEntry.objects.count() + JournalEntry.objects.count(), 2)
+
+    def test_dry_run_writes_nothing(self):
+        result = importer.import_records(self.user, importer.read_records(self.records(), 'ndjson'), dry_run=True)
+        self.assertEqual(result.created, 0)
+        self.assertFalse(MoodEntry.objects.exists())
+
+    def test_legacy_journal_file_gzipped(self):
+        path = os.path.join(self.directory, 'journal_entries.json.gz')
+        with gzip.open(path, 'wt', encoding='utf-8') as f:
+            json.dump([{'date': '2025-05-08 23:44:50', 'content': 'i m nice'}], f)
+        result = importer.import_file(self.user, path)
+        self.assertEqual(result.created, 1)
+        self.assertEqual(JournalEntry.objects.get(user=self.user).content, 'i m nice')
+
+    def test_csv(self):
+        path = os.path.join(self.directory, 'moods.csv')
+        with open(path, 'w', encoding='utf-8', newline='') as f:
+            f.write('type,mood,notes,created_at,content\nmood,sad,,2024-01-01T00:00:00Z,\n'
+                    'journal,,,2024-01-01T01:00:00Z,Rainy day\n')
+        result = importer.import_file(self.user, path)
+        self.assertEqual(result.created, 2)
+        self.assertEqual(MoodEntry.objects.get(user=self.user).notes, '')
+
+    def test_unknown_extension(self):
+        with self.assertRaises(ValueError):
+            importer.detect_format('history.txt')
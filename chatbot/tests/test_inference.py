@@ -0,0 +1,99 @@
+from concurrent.futures import Future
+from unittest import mock
+
+from django.test import SimpleTestCase, override_settings
+
+from chatbot import inference, utils
+
+
+class FakeBackend:
+    """Answers with a fixed reply, or never when `reply` is None"""
+
+    def __init__(self, reply=None, error=None):
+        self.reply = reply
+        self.error = error
+        self.submitted = []
+        self.forgotten = []
+
+    def submit(self, prompt, max_new_tokens, deadline, on_text=None, conversation=None):
+        self.submitted.append((prompt, max_new_tokens))
+        future = Future()
+        if self.error:
+            future.set_exception(self.error)
+        elif self.reply is not None:
+            future.set_result(self.reply)
+        return future
+
+    def forget(self, future):
+        self.forgotten.append(future)
+
+
+@override_settings(INFERENCE_TIMEOUT=30, GENERATION_BUDGETS={'chat': {'max_new_tokens': 64, 'max_time': 0.05}})
+class GenerateTextTests(SimpleTestCase):
+    def use(self, backend):
+        patcher = mock.patch.object(inference, 'get_backend', return_value=backend)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        return backend
+
+    def test_budgets(self):
+        self.assertEqual(inference.get_budget('chat'), {'max_new_tokens': 64, 'max_time': 0.05})
+        self.assertEqual(inference.get_budget('unknown'), {'max_new_tokens': None, 'max_time': 30})
+
+    def test_reply_with_the_budget(self):
+        backend = self.use(FakeBackend('Hello there'))
+        self.assertEqual(inference.generate_text('hi', budget='chat', max_new_tokens=8), 'Hello there')
+        self.assertEqual(backend.submitted, [('hi', 8)])
+
+    @mock.patch.object(inference, 'RESULT_GRACE', 0)
+    def test_timeout_forgets_the_job(self):
+        backend = self.use(FakeBackend())
+        with self.assertRaises(TimeoutError):
+            inference.generate_text('hi', budget='chat')
+        self.assertEqual(len(backend.forgotten), 1)
+
+    @mock.patch.object(inference, 'RESULT_GRACE', 0)
+    def test_get_response_falls_back(self):
+        for backend in (FakeBackend(), FakeBackend(error=inference.InferenceError('no model')), FakeBackend('  ')):
+            self.use(backend)
+            self.assertIn(utils.get_response('hi'), utils.FALLBACK_RESPONSES)
+
+    def test_stream_falls_back_without_output(self):
+        self.use(FakeBackend(error=inference.InferenceError('no model')))
+        self.assertIn(''.join(utils.stream_response('hi')), utils.FALLBACK_RESPONSES)
+
+
+class LocalBackendTests(SimpleTestCase):
+    def test_a_failed_load_is_remembered(self):
+        backend = inference.LocalBackend('models/missing')
+        with mock.patch.object(inference, 'get_model', side_effect=ImportError('No module named torch')) as get_model:
+            backend.start()
+            self.assertEqual(backend.status(), 'degraded')
+            future = backend.submit('hi', 8, deadline=0)
+            with self.assertRaises(inference.InferenceError):
+                future.result()
+            backend.submit('hi', 8, deadline=0)
+        self.assertEqual(get_model.call_count, 1)
+
+    def test_missing_model_files(self):
+        backend = inference.LocalBackend('models/missing')
+        backend.start()
+        self.assertEqual(backend.status(), 'degraded')
+
+
+class ProbeTests(SimpleTestCase):
+    def probe(self, path, status):
+        with mock.patch.object(inference, 'get_status', return_value=status), \
+                mock.patch.object(inference, 'warm_up') as warm_up:
+            response = self.client.get(path)
+        warm_up.assert_not_called()
+        return response.status_code, response.json()
+
+    def test_readiness(self):
+        self.assertEqual(self.probe('/health/', 'ready'), (200, {'status': 'ok', 'inference': 'ready'}))
+        for status in ('cold', 'warming', 'degraded'):
+            self.assertEqual(self.probe('/health/', status), (503, {'status': status, 'inference': status}))
+
+    def test_liveness_passes_without_a_model(self):
+        self.assertEqual(self.probe('/live/', 'ready'), (200, {'status': 'ok', 'inference': 'ready'}))
+        self.assertEqual(self.probe('/live/', 'degraded'), (200, {'status': 'degraded', 'inference': 'degraded'}))
@@ -0,0 +1,119 @@
+from datetime import datetime
+import json
+import os
+import shutil
+import tempfile
+import time
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from chatbot import journaling
+from chatbot.journaling import INDEX_RECORD, JournalStore
+
+
+class JournalStoreTests(SimpleTestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    def store(self, **kwargs):
+        store = JournalStore(self.directory, **kwargs)
+        self.addCleanup(store.close)
+        return store
+
+    def test_append_and_read_back_across_segments(self):
+        store = self.store(segment_entries=3)
+        numbers = [store.append(f'entry {i}', datetime(2024, 1, 1 + i)) for i in range(7)]
+        self.assertEqual(numbers, list(range(7)))
+        self.assertEqual(len(store), 7)
+        self.assertEqual(sorted(name for name in os.listdir(self.directory) if name.endswith('.idx')),
+                         ['000000.idx', '000001.idx', '000002.idx'])
+        self.assertEqual(store.get(4), {'date': '2024-01-05 00:00:00', 'content': 'entry 4'})
+        self.assertEqual([entry['content'] for entry in store.entries()], [f'entry {i}' for i in range(7)])
+        with self.assertRaises(IndexError):
+            store.get(7)
+
+    def test_date_range(self):
+        store = self.store(segment_entries=2)
+        for day in range(1, 6):
+            store.append(f'day {day}', datetime(2024, 1, day))
+        entries = store.entries(datetime(2024, 1, 2), datetime(2024, 1, 4))
+        self.assertEqual([entry['content'] for entry in entries], ['day 2', 'day 3'])
+
+    def test_another_store_sees_the_entries(self):
+        self.store().append('first')
+        other = self.store()
+        self.assertEqual(other.append('second'), 1)
+        self.assertEqual(other.get(0)['content'], 'first')
+
+    def test_entry_without_index_record_is_cut_off(self):
+        store = self.store()
+        store.append('kept')
+        store.close()
+        with open(os.path.join(self.directory, '000000.ndjson'), 'ab') as f:
+            f.write(b'{"date": "2024-01-01 00:00:00", "content": "torn"}\n')
+
+        store = self.store()
+        self.assertEqual(store.append('next'), 1)
+        self.assertEqual([entry['content'] for entry in store.entries()], ['kept', 'next'])
+
+    def test_index_records_past_the_data_are_cut_off(self):
+        store = self.store()
+        store.append('kept')
+        store.close()
+        with open(os.path.join(self.directory, '000000.idx'), 'ab') as f:
+            # A full record whose entry never reached the disk, then half a record
+            f.write(INDEX_RECORD.pack(10_000, 50, 0.0) + b'\x00' * 5)
+
+        store = self.store()
+        with self.assertRaises(IndexError):
+            store.get(1)
+        self.assertEqual(store.append('next'), 1)
+        self.assertEqual(store.get(1)['content'], 'next')
+        self.assertEqual(os.path.getsize(os.path.join(self.directory, '000000.idx')), 2 * INDEX_RECORD.size)
+
+    def test_idle_entries_are_synced_by_the_timer(self):
+        store = self.store(sync_every=100, sync_interval=0.05)
+        with mock.patch('os.fsync') as fsync:
+            store.append('one')
+            self.assertEqual(fsync.call_count, 0)
+            deadline = time.monotonic() + 2
+            while fsync.call_count < 2 and time.monotonic() < deadline:
+                time.sleep(0.01)
+        self.assertEqual(fsync.call_count, 2)
+        self.assertEqual(store._unsynced, 0)
+
+    def test_sync_every(self):
+        store = self.store(sync_every=2, sync_interval=60)
+        with mock.patch('os.fsync') as fsync:
+            store.append('one')
+            store.append('two')
+        self.assertEqual(fsync.call_count, 2)
+
+
+class LegacyMigrationTests(SimpleTestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    def test_moves_legacy_files_into_the_store_once(self):
+        legacy_file = os.path.join(self.directory, 'journal_entries.json')
+        legacy_log = os.path.join(self.directory, 'journal_entries.ndjson')
+        with open(legacy_file, 'w') as f:
+            json.dump([{'date': '2024-01-01 08:00:00', 'content': 'from the array'}], f)
+        with open(legacy_log, 'w') as f:
+            f.write(json.dumps({'date': 'not a date', 'content': 'from the log'}) + '\n')
+            f.write('{"date": "2024-01-0')
+
+        store = JournalStore(os.path.join(self.directory, 'journal'))
+        self.addCleanup(store.close)
+        with mock.patch.object(journaling, 'JOURNAL_FILE', legacy_file), \
+                mock.patch.object(journaling, 'JOURNAL_LOG', legacy_log):
+            journaling.migrate_legacy(store)
+            journaling.migrate_legacy(store)
+
+        self.assertEqual([entry['content'] for entry in store.entries()], ['from the array', 'from the log'])
+        self.assertEqual(store.get(0)['date'], '2024-01-01 08:00:00')
+        self.assertTrue(os.path.exists(legacy_file + '.migrated'))
+        self.assertFalse(os.path.exists(legacy_log))
@@ -0,0 +1,93 @@
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+import numpy as np
+from django.contrib.auth.models import User
+from django.test import SimpleTestCase, TestCase
+
+from chatbot import analytics
+from chatbot.models import MoodEntry
+from dashboard import mood_chart
+
+
+class RollingMeanTests(SimpleTestCase):
+    def test_days_without_entries_are_skipped_not_zero(self):
+        counts = np.array([1.0, 0.0, 2.0, 0.0])
+        sums = np.array([4.0, 0.0, 4.0, 0.0])
+        rolling = mood_chart.rolling_mean(counts, sums, window=2)
+        np.testing.assert_allclose(rolling, [4.0, 4.0, 2.0, 2.0])
+
+    def test_window_with_no_entries_is_nan(self):
+        rolling = mood_chart.rolling_mean(np.array([1.0, 0.0, 0.0]), np.array([3.0, 0.0, 0.0]), window=1)
+        self.assertTrue(np.isnan(rolling[1]) and np.isnan(rolling[2]))
+
+
+class TrendLineTests(SimpleTestCase):
+    def test_recovers_a_line(self):
+        x = np.arange(10)
+        slope, intercept = mood_chart.trend_line(x, 0.5 * x + 2, np.ones(10))
+        self.assertAlmostEqual(slope, 0.5)
+        self.assertAlmostEqual(intercept, 2)
+
+    def test_needs_two_days(self):
+        self.assertIsNone(mood_chart.trend_line(np.array([0]), np.array([3.0]), np.array([1.0])))
+
+
+class LttbTests(SimpleTestCase):
+    def test_short_series_is_kept_whole(self):
+        np.testing.assert_array_equal(mood_chart.lttb(np.arange(5.0), np.ones(5), 10), np.arange(5))
+
+    def test_keeps_ends_and_spikes_within_budget(self):
+        x = np.arange(1000.0)
+        y = np.zeros(1000)
+        y[333], y[777] = 5, -5
+        keep = mood_chart.lttb(x, y, 20)
+        self.assertEqual(len(keep), 20)
+        self.assertEqual((keep[0], keep[-1]), (0, 999))
+        self.assertTrue(np.all(np.diff(keep) > 0))
+        self.assertIn(333, keep)
+        self.assertIn(777, keep)
+
+
+class HeatmapTests(SimpleTestCase):
+    def test_averages_per_cell(self):
+        mean, count = mood_chart.heatmap(np.array([0, 0, 6]), np.array([9, 9, 23]), np.array([1, 3, 2]), np.array([4, 8, 2]))
+        self.assertEqual(count[0, 9], 4)
+        self.assertEqual(mean[0, 9], 3)
+        self.assertEqual(mean[6, 23], 1)
+        self.assertTrue(np.isnan(mean[3, 3]))
+
+
+class BuildChartTests(SimpleTestCase):
+    def test_empty(self):
+        chart = mood_chart.build_chart([], [], [])
+        self.assertIsNone(chart['first_day'])
+        self.assertEqual(chart['x'], [])
+        self.assertEqual(len(chart['heatmap']['count']), 7)
+
+    def test_series(self):
+        chart = mood_chart.build_chart([100, 101, 103], [1, 2, 1], [4, 6, 5], window=2)
+        self.assertEqual(chart['first_day'], 100)
+        self.assertEqual(chart['x'], [0, 1, 3])
+        self.assertEqual(chart['mood'], [4.0, 3.0, 5.0])
+        self.assertEqual(chart['rolling'], [4.0, 3.33, 5.0])
+        self.assertEqual(chart['count'], [1, 2, 1])
+        self.assertIsNotNone(chart['trend'])
+
+
+class ChartDataTests(TestCase):
+    def test_matches_the_entries(self):
+        user = User.objects.create_user('alice')
+        # A Monday, 09:00 UTC
+        monday = datetime(2024, 1, 1, 9, tzinfo=dt_timezone.utc)
+        for created_at, mood in [
+            (monday, 'happy'), (monday + timedelta(minutes=5), 'sad'), (monday + timedelta(days=2), 'very_happy'),
+        ]:
+            MoodEntry.objects.create(user=user, mood=mood, created_at=created_at)
+
+        chart = analytics.chart_data(user)
+        self.assertEqual(chart['first_day'], '2024-01-01')
+        self.assertEqual(chart['x'], [0, 2])
+        self.assertEqual(chart['mood'], [3.0, 5.0])
+        self.assertEqual(chart['heatmap']['count'][0][9], 2)
+        self.assertEqual(chart['heatmap']['mood'][0][9], 3.0)
+        self.assertEqual(chart['heatmap']['count'][2][9], 1)
@@ -0,0 +1,79 @@
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.utils import timezone
+
+from chatbot.models import ChatMessage, MoodEntry
+from chatbot.pagination import InvalidCursor, decode_cursor, encode_cursor, keyset_page
+
+
+class CursorTests(TestCase):
+    def test_round_trip(self):
+        user = User.objects.create_user('alice')
+        entry = MoodEntry.objects.create(user=user, mood='happy')
+        self.assertEqual(decode_cursor(encode_cursor(entry)), (entry.created_at, entry.pk))
+
+    def test_garbage_is_rejected(self):
+        for cursor in ('not a cursor', 'bm90IGEgY3Vyc29y', '////'):
+            with self.assertRaises(InvalidCursor):
+                decode_cursor(cursor)
+
+
+class KeysetPageTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('alice')
+        now = timezone.now()
+        # Two entries share each timestamp, so ties are broken by id
+        self.entries = [
+            MoodEntry.objects.create(user=self.user, mood='happy', created_at=now - timedelta(hours=i // 2))
+            for i in range(7)
+        ]
+
+    def test_pages_cover_every_row_once_newest_first(self):
+        queryset = MoodEntry.objects.filter(user=self.user)
+        seen, cursor = [], None
+        while True:
+            page, cursor = keyset_page(queryset, cursor, page_size=3)
+            seen.extend(page)
+            if cursor is None:
+                break
+        expected = sorted(self.entries, key=lambda entry: (entry.created_at, entry.pk), reverse=True)
+        self.assertEqual(seen, expected)
+
+    def test_last_page_has_no_cursor(self):
+        page, cursor = keyset_page(MoodEntry.objects.filter(user=self.user), page_size=7)
+        self.assertEqual(len(page), 7)
+        self.assertIsNone(cursor)
+
+
+class HistoryViewTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('alice', password='secret')
+        self.client.login(username='alice', password='secret')
+        now = timezone.now()
+        for i in range(5):
+            ChatMessage.objects.create(
+                user=self.user, message=f'message {i}', is_user=i % 2 == 0, created_at=now + timedelta(minutes=i)
+            )
+
+    def test_chat_pages_run_backwards_but_read_chronologically(self):
+        response = self.client.get('/chat-history/', {'format': 'json', 'limit': 3}).json()
+        self.assertEqual([row['message'] for row in response['results']], ['message 2', 'message 3', 'message 4'])
+
+        response = self.client.get(
+            '/chat-history/', {'format': 'json', 'limit': 3, 'cursor': response['next_cursor']}
+        ).json()
+        self.assertEqual([row['message'] for row in response['results']], ['message 0', 'message 1'])
+        self.assertIsNone(response['next_cursor'])
+
+    def test_mood_history_is_newest_first(self):
+        now = timezone.now()
+        for i in range(3):
+            MoodEntry.objects.create(user=self.user, mood='sad', notes=str(i), created_at=now - timedelta(days=i))
+        response = self.client.get('/mood-history/', {'format': 'json'}).json()
+        self.assertEqual([row['notes'] for row in response['results']], ['0', '1', '2'])
+
+    def test_invalid_cursor_is_a_bad_request(self):
+        response = self.client.get('/mood-history/', {'cursor': 'not a cursor'})
+        self.assertEqual(response.status_code, 400)
@@ -0,0 +1,52 @@
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+
+from chatbot import checks, response_cache
+from chatbot.models import JournalEntry, MoodEntry, ResponseCacheVersion
+
+LOCMEM = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+    'responses': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'test-responses'},
+}
+
+
+@override_settings(CACHES=LOCMEM)
+class ResponseCacheTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('alice')
+
+    def test_stored_replies_are_found_by_the_same_key(self):
+        key = response_cache.make_key(self.user.id, 'mood_insights', 'prompt', 100)
+        self.assertIsNone(response_cache.lookup(key))
+        response_cache.store(key, 'reply')
+        self.assertEqual(response_cache.lookup(response_cache.make_key(self.user.id, 'mood_insights', 'prompt', 100)), 'reply')
+        self.assertNotEqual(key, response_cache.make_key(self.user.id, 'mood_insights', 'prompt', 50))
+
+    def test_only_the_prompts_sources_invalidate_it(self):
+        mood_key = response_cache.make_key(self.user.id, 'mood_insights', 'prompt')
+        self_care_key = response_cache.make_key(self.user.id, 'self_care', 'prompt')
+
+        JournalEntry.objects.create(user=self.user, content='A new entry')
+        self.assertEqual(response_cache.make_key(self.user.id, 'mood_insights', 'prompt'), mood_key)
+        self.assertNotEqual(response_cache.make_key(self.user.id, 'self_care', 'prompt'), self_care_key)
+
+        MoodEntry.objects.create(user=self.user, mood='sad')
+        self.assertNotEqual(response_cache.make_key(self.user.id, 'mood_insights', 'prompt'), mood_key)
+
+    def test_invalidating_never_creates_versions(self):
+        response_cache.invalidate(self.user.id, 'mood')
+        self.assertFalse(ResponseCacheVersion.objects.exists())
+
+
+class ResponseCacheCheckTests(TestCase):
+    @override_settings(CACHES=LOCMEM)
+    def test_per_process_cache_with_several_workers(self):
+        self.assertEqual([error.id for error in checks.response_cache_errors(2)], ['chatbot.E001'])
+        self.assertEqual(checks.response_cache_errors(1), [])
+
+    @override_settings(CACHES={
+        'default': LOCMEM['default'],
+        'responses': {'BACKEND': 'django.core.cache.backends.db.DatabaseCache', 'LOCATION': 'llm_response_cache'},
+    })
+    def test_shared_cache(self):
+        self.assertEqual(checks.response_cache_errors(4), [])
@@ -0,0 +1,77 @@
+from datetime import timedelta
+import gzip
+import json
+import shutil
+import tempfile
+
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from chatbot import retention, search
+from chatbot.models import ChatMessage, SelfCareSuggestion
+
+
+class ArchiveTests(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        override = override_settings(
+            RETENTION_ARCHIVE_DIR=self.directory, RETENTION_DAYS={'chat': 30, 'suggestions': 30}
+        )
+        override.enable()
+        self.addCleanup(override.disable)
+
+        self.user = User.objects.create_user('alice')
+        self.now = timezone.now()
+        old = self.now - timedelta(days=60)
+        self.old_messages = [
+            ChatMessage.objects.create(user=self.user, message=f'old zebra {i}', is_user=True, created_at=old)
+            for i in range(5)
+        ]
+        self.recent = ChatMessage.objects.create(user=self.user, message='recent zebra', is_user=True)
+
+    def suggestion(self, **fields):
+        return SelfCareSuggestion.objects.create(
+            user=self.user, suggestion='Stretch', category='physical', sentiment='neutral', **fields
+        )
+
+    def test_archives_then_deletes_old_chat(self):
+        archived, path = retention.archive('chat', chunk_size=2, now=self.now)
+
+        self.assertEqual(archived, 5)
+        self.assertEqual(list(ChatMessage.objects.all()), [self.recent])
+        with gzip.open(path, 'rt') as f:
+            rows = [json.loads(line) for line in f]
+        self.assertEqual([row['id'] for row in rows], [message.id for message in self.old_messages])
+        self.assertEqual(rows[0]['message'], 'old zebra 0')
+        # Their search entries go with them
+        results, _, _ = search.search(self.user.id, 'zebra')
+        self.assertEqual([row['id'] for row in results], [self.recent.id])
+
+    def test_dry_run_only_counts(self):
+        self.assertEqual(retention.archive('chat', now=self.now, dry_run=True), (5, None))
+        self.assertEqual(ChatMessage.objects.count(), 6)
+
+    def test_nothing_eligible(self):
+        ChatMessage.objects.filter(pk__in=[message.pk for message in self.old_messages]).delete()
+        self.assertEqual(retention.archive('chat', now=self.now), (0, None))
+
+    def test_zero_days_keeps_everything(self):
+        with override_settings(RETENTION_DAYS={'chat': 0}):
+            self.assertIsNone(retention.cutoff('chat'))
+            self.assertEqual(retention.archive('chat', now=self.now), (0, None))
+
+    def test_only_completed_unsaved_suggestions(self):
+        old = self.now - timedelta(days=60)
+        done = self.suggestion(is_completed=True, created_at=old)
+        kept = [
+            self.suggestion(is_completed=True, is_saved=True, created_at=old),
+            self.suggestion(created_at=old),
+            self.suggestion(is_completed=True),
+        ]
+        archived, _ = retention.archive('suggestions', now=self.now)
+
+        self.assertEqual(archived, 1)
+        self.assertFalse(SelfCareSuggestion.objects.filter(pk=done.pk).exists())
+        self.assertEqual(SelfCareSuggestion.objects.count(), len(kept))
@@ -0,0 +1,73 @@
+from datetime import datetime, timedelta, timezone as dt_timezone
+import io
+import random
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import TestCase
+
+from chatbot import analytics
+from chatbot.models import MoodDailyRollup, MoodEntry, MoodHourlyRollup
+
+START = datetime(2024, 1, 1, tzinfo=dt_timezone.utc)
+MOODS = list(analytics.MOOD_VALUES)
+
+
+def snapshot(user):
+    """The user's rollups, with emptied heatmap cells left out"""
+    daily = list(
+        MoodDailyRollup.objects.filter(user=user).order_by('day')
+        .values_list('day', 'count', 'value_sum', *[f'{mood}_count' for mood in MOODS])
+    )
+    hourly = list(
+        MoodHourlyRollup.objects.filter(user=user, count__gt=0).order_by('weekday', 'hour')
+        .values_list('weekday', 'hour', 'count', 'value_sum')
+    )
+    return daily, hourly
+
+
+class RollupConsistencyTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('alice')
+
+    def test_signals_match_a_rebuild(self):
+        rng = random.Random(0)
+        entries = []
+        for _ in range(200):
+            action = rng.random()
+            if action < 0.5 or not entries:
+                entries.append(MoodEntry.objects.create(
+                    user=self.user, mood=rng.choice(MOODS), created_at=START + timedelta(hours=rng.randrange(24 * 21))
+                ))
+            elif action < 0.8:
+                entry = rng.choice(entries)
+                # Edits can move an entry to another day and heatmap cell
+                entry.mood = rng.choice(MOODS)
+                entry.created_at = START + timedelta(hours=rng.randrange(24 * 21))
+                entry.save()
+            else:
+                entries.pop(rng.randrange(len(entries))).delete()
+
+        incremental = snapshot(self.user)
+        analytics.rebuild_rollups([self.user.id])
+        self.assertEqual(incremental, snapshot(self.user))
+
+    def test_summary(self):
+        self.assertEqual(analytics.mood_summary(self.user), {'most_common_mood': None, 'average_mood': None})
+        for mood in ('happy', 'happy', 'very_sad'):
+            MoodEntry.objects.create(user=self.user, mood=mood)
+        summary = analytics.mood_summary(self.user)
+        self.assertEqual(summary['most_common_mood'], 'happy')
+        self.assertEqual(analytics.mood_counts(self.user), {'happy': 2, 'very_sad': 1})
+
+    def test_rebuild_command_drops_rollups_without_entries(self):
+        MoodEntry.objects.create(user=self.user, mood='sad', created_at=START)
+        # Rows deleted without signals, as a raw DELETE would
+        MoodEntry.objects.filter(user=self.user)._raw_delete(MoodEntry.objects.db)
+        other = User.objects.create_user('bob')
+        MoodEntry.objects.create(user=other, mood='happy', created_at=START)
+        MoodDailyRollup.objects.filter(user=other).delete()
+
+        call_command('rebuild_mood_rollups', stdout=io.StringIO())
+        self.assertEqual(snapshot(self.user), ([], []))
+        self.assertEqual(MoodDailyRollup.objects.get(user=other).count, 1)
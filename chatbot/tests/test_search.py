@@ -0,0 +1,72 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.utils import timezone
+
+from chatbot import search
+from chatbot.models import ChatMessage, JournalEntry
+
+
+class SearchTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('alice', password='secret')
+
+    def test_finds_the_users_own_rows_with_highlights(self):
+        entry = JournalEntry.objects.create(user=self.user, content='We went running by the lake')
+        ChatMessage.objects.create(user=self.user, message='I like lakes', is_user=True)
+        JournalEntry.objects.create(user=User.objects.create_user('bob'), content='A lake of my own')
+
+        results, has_next, truncated = search.search(self.user.id, 'lake')
+        self.assertEqual(sorted(row['kind'] for row in results), ['chat', 'journal'])
+        self.assertFalse(has_next or truncated)
+        journal = next(row for row in results if row['kind'] == 'journal')
+        self.assertEqual(journal['id'], entry.id)
+        self.assertIn('<mark>lake</mark>', journal['snippet'])
+
+    def test_short_last_word_matches_as_a_prefix(self):
+        JournalEntry.objects.create(user=self.user, content='Meditation helped')
+        self.assertEqual(len(search.search(self.user.id, 'medi')[0]), 1)
+        self.assertEqual(search.search(self.user.id, '  !!  '), ([], False, False))
+
+    def test_snippets_are_escaped(self):
+        JournalEntry.objects.create(user=self.user, content='<b>bold</b> move')
+        snippet = search.search(self.user.id, 'move')[0][0]['snippet']
+        self.assertNotIn('<b>', snippet)
+
+    def test_index_follows_edits_and_deletes(self):
+        entry = JournalEntry.objects.create(user=self.user, content='apples')
+        entry.content = 'pears'
+        entry.save()
+        self.assertEqual(search.search(self.user.id, 'apples')[0], [])
+        self.assertEqual(len(search.search(self.user.id, 'pears')[0]), 1)
+        entry.delete()
+        self.assertEqual(search.search(self.user.id, 'pears')[0], [])
+
+    def test_denser_matches_rank_first(self):
+        JournalEntry.objects.create(user=self.user, content='rain and more words to make this entry long')
+        dense = JournalEntry.objects.create(user=self.user, content='rain rain')
+        self.assertEqual(search.search(self.user.id, 'rain')[0][0]['id'], dense.id)
+
+    def test_only_the_most_recent_matches_are_ranked(self):
+        now = timezone.now()
+        # Created newest first, so ids run opposite to time
+        entries = [
+            JournalEntry.objects.create(user=self.user, content=f'tea {i}', created_at=now - timedelta(days=i))
+            for i in range(5)
+        ]
+        with mock.patch.object(search, 'MAX_CANDIDATES', 3):
+            results, has_next, truncated = search.search(self.user.id, 'tea', page_size=2)
+            self.assertTrue(truncated)
+            self.assertTrue(has_next)
+            page_two = search.search(self.user.id, 'tea', page=2, page_size=2)[0]
+        found = {row['id'] for row in results + page_two}
+        self.assertEqual(found, {entry.id for entry in entries[:3]})
+
+    def test_view(self):
+        JournalEntry.objects.create(user=self.user, content='Walking the dog')
+        self.client.login(username='alice', password='secret')
+        response = self.client.get('/search/', {'q': 'dog', 'format': 'json'}).json()
+        self.assertEqual((len(response['results']), response['has_next'], response['truncated']), (1, False, False))
+        self.assertContains(self.client.get('/search/', {'q': 'dog'}), '<mark>dog</mark>')
@@ -0,0 +1,45 @@
+import tempfile
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+
+from chatbot import sentiment_analysis
+from chatbot.models import JournalEntry
+
+
+class Vader:
+    """Clear-cut for 'great' and 'awful', unsure about anything else"""
+
+    def polarity_scores(self, text):
+        return {'compound': 0.9 if 'great' in text else -0.9 if 'awful' in text else 0.1}
+
+
+@override_settings(SENTIMENT_MODEL_PATH=tempfile.gettempdir(), SENTIMENT_FAST_PATH=True)
+class WithoutTransformerTests(TestCase):
+    def setUp(self):
+        patcher = mock.patch.object(sentiment_analysis, 'get_vader', return_value=Vader())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_lexicon_answers_are_kept(self):
+        great, unsure, awful = sentiment_analysis.get_sentiments(['A great day', 'A day', 'An awful day'])
+        self.assertEqual((great.label, great.tier), ('POSITIVE', sentiment_analysis.FAST_TIER))
+        self.assertIsNone(unsure)
+        self.assertEqual(awful.label, 'NEGATIVE')
+
+        with self.assertRaises(sentiment_analysis.SentimentUnavailable):
+            sentiment_analysis.get_sentiment('A day')
+
+    def test_unscored_rows_stay_stale(self):
+        user = User.objects.create_user('alice')
+        great = JournalEntry.objects.create(user=user, content='A great day')
+        unsure = JournalEntry.objects.create(user=user, content='A day')
+
+        scored = sentiment_analysis.score_instances(JournalEntry.objects.filter(user=user), 'content')
+        self.assertEqual(scored, 1)
+        self.assertEqual(
+            list(sentiment_analysis.stale(JournalEntry.objects.filter(user=user))), [unsure]
+        )
+        great.refresh_from_db()
+        self.assertEqual(great.sentiment_label, 'POSITIVE')
@@ -0,0 +1,32 @@
+from django.contrib.auth.models import User
+from django.test import TestCase
+
+from chatbot.models import (
+    BackgroundTask, ChatMessage, JournalEntry, MoodEntry, MoodHourlyRollup, ResponseCacheVersion
+)
+from chatbot import response_cache
+
+
+class UserDeleteTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('alice')
+        MoodEntry.objects.create(user=self.user, mood='happy')
+        JournalEntry.objects.create(user=self.user, content='A long walk')
+        ChatMessage.objects.create(user=self.user, message='Hello', is_user=True)
+        # A version row per source, as after a cached dashboard reply
+        response_cache.make_key(self.user.id, 'self_care', 'prompt')
+
+    def test_deleting_a_user_with_data(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.delete()
+
+        self.assertFalse(User.objects.filter(username='alice').exists())
+        for model in (MoodEntry, JournalEntry, ChatMessage, BackgroundTask, MoodHourlyRollup, ResponseCacheVersion):
+            self.assertFalse(model.objects.exists(), model.__name__)
+
+    def test_deleting_an_entry_queues_a_dashboard_refresh(self):
+        BackgroundTask.objects.all().delete()
+        with self.captureOnCommitCallbacks(execute=True):
+            MoodEntry.objects.get(user=self.user).delete()
+
+        self.assertTrue(BackgroundTask.objects.filter(user=self.user, kind='dashboard', status='pending').exists())
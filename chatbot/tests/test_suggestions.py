@@ -0,0 +1,69 @@
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from chatbot.models import SelfCareSuggestion
+from chatbot.suggestions import save_suggestions
+
+
+def suggestion(text, category='relaxation', duration='10 minutes'):
+    return {'category': category, 'suggestion': text, 'duration': duration}
+
+
+class SaveSuggestionsTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('alice')
+
+    def test_skips_open_duplicates_ignoring_case_and_spacing(self):
+        save_suggestions(self.user, [suggestion('Take a walk')], 'neutral')
+        created = save_suggestions(self.user, [
+            suggestion('take  a WALK'),
+            suggestion('Take a walk', category='physical'),
+            suggestion('Call a friend', category='social'),
+            suggestion('call a friend', category='social'),
+        ], 'neutral')
+
+        self.assertEqual([row.suggestion for row in created], ['Take a walk', 'Call a friend'])
+        self.assertEqual(SelfCareSuggestion.objects.filter(user=self.user).count(), 3)
+
+    def test_completed_suggestions_can_come_back(self):
+        save_suggestions(self.user, [suggestion('Stretch')], 'neutral')
+        SelfCareSuggestion.objects.update(is_completed=True)
+        self.assertEqual(len(save_suggestions(self.user, [suggestion('Stretch')], 'neutral')), 1)
+
+    def test_replace_completes_the_open_ones(self):
+        save_suggestions(self.user, [suggestion('Stretch')], 'neutral')
+        save_suggestions(self.user, [suggestion('Stretch'), suggestion('Read')], 'positive', replace=True)
+        open_rows = SelfCareSuggestion.objects.filter(user=self.user, is_completed=False)
+        self.assertEqual(sorted(open_rows.values_list('suggestion', flat=True)), ['Read', 'Stretch'])
+        self.assertEqual(SelfCareSuggestion.objects.filter(user=self.user, is_completed=True).count(), 1)
+
+    def test_empty_batch_changes_nothing(self):
+        save_suggestions(self.user, [suggestion('Stretch')], 'neutral')
+        self.assertEqual(save_suggestions(self.user, [], 'neutral', replace=True), [])
+        self.assertFalse(SelfCareSuggestion.objects.filter(is_completed=True).exists())
+
+    def test_long_durations_are_cut_to_the_column(self):
+        created = save_suggestions(self.user, [suggestion('Stretch', duration='x' * 80)], 'neutral')
+        self.assertEqual(len(created[0].duration), 50)
+
+    @override_settings(MAX_OPEN_SUGGESTIONS=3)
+    def test_caps_open_suggestions_keeping_newest_and_saved(self):
+        now = timezone.now()
+        saved = SelfCareSuggestion.objects.create(
+            user=self.user, suggestion='Old favourite', category='creative', sentiment='neutral',
+            is_saved=True, created_at=now - timedelta(days=30)
+        )
+        for i in range(3):
+            SelfCareSuggestion.objects.create(
+                user=self.user, suggestion=f'Old {i}', category='relaxation', sentiment='neutral',
+                created_at=now - timedelta(days=10 - i)
+            )
+        save_suggestions(self.user, [suggestion('New 1'), suggestion('New 2')], 'neutral')
+
+        open_rows = set(SelfCareSuggestion.objects.filter(user=self.user, is_completed=False)
+                        .values_list('suggestion', flat=True))
+        self.assertEqual(open_rows, {'Old favourite', 'Old 2', 'New 1', 'New 2'})
+        self.assertTrue(SelfCareSuggestion.objects.filter(pk=saved.pk).exists())
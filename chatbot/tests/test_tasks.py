@@ -0,0 +1,70 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from chatbot import tasks
+from chatbot.models import BackgroundTask
+
+
+@override_settings(BACKGROUND_TASK_DELAY=0)
+class TaskQueueTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('alice')
+        BackgroundTask.objects.all().delete()
+
+    def test_a_pending_task_absorbs_new_requests(self):
+        first = tasks.enqueue(self.user.id, 'dashboard')
+        self.assertEqual(tasks.enqueue(self.user.id, 'dashboard'), first)
+        self.assertNotEqual(tasks.enqueue(self.user.id, 'refresh_suggestions'), first)
+        self.assertEqual(BackgroundTask.objects.count(), 2)
+
+    def test_claim_runs_due_tasks_once(self):
+        task = tasks.enqueue(self.user.id, 'dashboard')
+        claimed = tasks.claim_next()
+        self.assertEqual((claimed.pk, claimed.status, claimed.attempts), (task.pk, 'running', 1))
+        self.assertIsNone(tasks.claim_next())
+        self.assertTrue(tasks.is_refreshing(self.user.id))
+
+    def test_tasks_wait_for_their_delay(self):
+        tasks.enqueue(self.user.id, 'dashboard', delay=60)
+        self.assertIsNone(tasks.claim_next())
+
+    def test_failures_are_retried_then_given_up(self):
+        tasks.enqueue(self.user.id, 'dashboard')
+        with mock.patch.dict(tasks.TASKS, {'dashboard': mock.Mock(side_effect=RuntimeError('boom'))}):
+            for attempt in range(1, tasks.MAX_ATTEMPTS + 1):
+                BackgroundTask.objects.update(run_after=timezone.now())
+                task = tasks.claim_next()
+                self.assertEqual(task.attempts, attempt)
+                self.assertFalse(tasks.run_task(task))
+        task.refresh_from_db()
+        self.assertEqual((task.status, task.error_message), ('failed', 'boom'))
+
+    def test_a_retry_gives_way_to_a_newer_pending_task(self):
+        tasks.enqueue(self.user.id, 'dashboard')
+        running = tasks.claim_next()
+        newer = tasks.enqueue(self.user.id, 'dashboard')
+        with mock.patch.dict(tasks.TASKS, {'dashboard': mock.Mock(side_effect=RuntimeError('boom'))}):
+            tasks.run_task(running)
+
+        running.refresh_from_db()
+        self.assertEqual(running.status, 'failed')
+        self.assertIn('Superseded', running.error_message)
+        self.assertEqual(BackgroundTask.objects.get(status='pending'), newer)
+
+    def test_stale_running_tasks_are_requeued(self):
+        tasks.enqueue(self.user.id, 'dashboard')
+        task = tasks.claim_next()
+        BackgroundTask.objects.filter(pk=task.pk).update(started_at=timezone.now() - timedelta(hours=1))
+        self.assertEqual(tasks.requeue_stale(), 1)
+        self.assertEqual(BackgroundTask.objects.get(pk=task.pk).status, 'pending')
+
+    def test_successful_run(self):
+        tasks.enqueue(self.user.id, 'dashboard')
+        with mock.patch.dict(tasks.TASKS, {'dashboard': mock.Mock()}):
+            self.assertTrue(tasks.run_task(tasks.claim_next()))
+        self.assertEqual(BackgroundTask.objects.get().status, 'done')
+        self.assertFalse(tasks.is_refreshing(self.user.id))
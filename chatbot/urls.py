@@ -1,5 +1,9 @@
+from django.conf import settings
 from django.urls import path
-from . import views
+from . import views, async_views
+
+# Views that wait on the model have async variants for ASGI deployments
+model_views = async_views if settings.ASYNC_VIEWS else views
 
 urlpatterns = [
     path('', views.home, name='home'),
@@ -9,9 +13,12 @@ urlpatterns = [
     path('mood-history/', views.mood_history, name='mood_history'),
     path('journal-history/', views.journal_history, name='journal_history'),
     path('chat-history/', views.chat_history, name='chat_history'),
+    path('search/', views.search_history, name='search'),
+    path('export/', views.export_history, name='export_history'),
+    path('journal/similar/', views.similar_journal_entries, name='similar_journal_entries'),
     path('add-mood/', views.add_mood, name='add_mood'),
     path('add-journal/', views.add_journal, name='add_journal'),
-    path('chat/', views.chat, name='chat'),
+    path('chat/', model_views.chat, name='chat'),
     path('complete-suggestion/<int:suggestion_id>/', views.complete_suggestion, name='complete_suggestion'),
     path('save-suggestion/<int:suggestion_id>/', views.save_suggestion, name='save_suggestion'),
     path('refresh-suggestions/', views.refresh_suggestions, name='refresh_suggestions'),
@@ -21,5 +28,10 @@ urlpatterns = [
     path('wellness-goals/', views.wellness_goals, name='wellness_goals'),
     path('update-goal-progress/<int:goal_id>/', views.update_goal_progress, name='update_goal_progress'),
     path('toggle-goal-status/<int:goal_id>/', views.toggle_goal_status, name='toggle_goal_status'),
-    path('get-goal-check-ins/', views.get_goal_check_ins, name='get_goal_check_ins'),
+    path('get-goal-check-ins/', model_views.get_goal_check_ins, name='get_goal_check_ins'),
+    path('inference-stats/', views.inference_stats, name='inference_stats'),
+    path('dashboard-status/', views.dashboard_status, name='dashboard_status'),
+    path('mood-chart/', views.mood_chart, name='mood_chart'),
+    path('health/', views.health, name='health'),
+    path('live/', views.live, name='live'),
 ] 
\ No newline at end of file
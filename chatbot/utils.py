@@ -1,11 +1,11 @@
 import os
-from django.conf import settings
+import random
 from datetime import datetime
 from dotenv import load_dotenv
-from django.contrib.auth.models import User
-from chatbot.models import MoodEntry, JournalEntry, ChatMessage, SelfCareSuggestion
-from transformers import AutoModelForCausalLM, AutoTokenizer
-import torch
+from chatbot.models import MoodEntry, JournalEntry, ChatMessage
+from chatbot import inference, response_cache
+from chatbot.sentiment_analysis import is_stale, score_instances
+from chatbot.suggestions import save_suggestions
 import logging
 
 load_dotenv()
@@ -17,37 +17,14 @@ DEBUG = os.getenv('DJANGO_DEBUG', 'False') == 'True'
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Initialize model and tokenizer as None
-model = None
-tokenizer = None
-
-def load_model():
-    """Load the DialoGPT model and tokenizer."""
-    global model, tokenizer
-    
-    try:
-        # Set environment variables for offline mode
-        os.environ['TRANSFORMERS_OFFLINE'] = '1'
-        os.environ['HF_DATASETS_OFFLINE'] = '1'
-        
-        # Define model paths
-        model_path = os.path.join(settings.BASE_DIR, 'models', 'dialoGPT-small')
-        config_path = os.path.join(model_path, 'config.json')
-        
-        # Check if model files exist
-        if not os.path.exists(config_path):
-            logger.warning(f"Model files not found at {model_path}. Using fallback responses.")
-            return False
-            
-        # Load model and tokenizer from local path
-        tokenizer = AutoTokenizer.from_pretrained(model_path, local_files_only=True)
-        model = AutoModelForCausalLM.from_pretrained(model_path, local_files_only=True)
-        logger.info("Successfully loaded DialoGPT model from local files")
-        return True
-        
-    except Exception as e:
-        logger.error(f"Error loading DialoGPT model: {str(e)}")
-        return False
+# Fallback responses if the model is unavailable, busy or too slow
+FALLBACK_RESPONSES = [
+    "I understand you're feeling down. Would you like to talk about what's bothering you?",
+    "It's okay to feel this way. Remember, you're not alone in this journey.",
+    "I'm here to listen. Would you like to try some breathing exercises?",
+    "Let's take a moment to breathe together. Would that help?",
+    "I'm sorry you're feeling this way. Would you like to explore some coping strategies?"
+]
 
 def format_chat_history(chat_history):
     """
@@ -62,46 +39,107 @@ def format_chat_history(chat_history):
             formatted_history.append(msg.strip())
     return '\n'.join(formatted_history)
 
-def get_response(user_input):
-    """Get a response from the model or fallback to predefined responses."""
-    global model, tokenizer
-    
-    # Fallback responses if model fails to load
-    fallback_responses = [
-        "I understand you're feeling down. Would you like to talk about what's bothering you?",
-        "It's okay to feel this way. Remember, you're not alone in this journey.",
-        "I'm here to listen. Would you like to try some breathing exercises?",
-        "Let's take a moment to breathe together. Would that help?",
-        "I'm sorry you're feeling this way. Would you like to explore some coping strategies?"
-    ]
-    
+def get_response(user_input, budget='chat', conversation=None):
+    """
+    Get a response from the inference workers or fallback to predefined responses.
+    `budget` names the GENERATION_BUDGETS entry bounding length and latency;
+    `conversation` is an optional (key, history) pair for chat turns.
+    """
     try:
-        if model is None or tokenizer is None:
-            if not load_model():
-                # Return a random fallback response if model loading fails
-                import random
-                return random.choice(fallback_responses)
-        
-        # Encode the input and generate response
-        input_ids = tokenizer.encode(user_input + tokenizer.eos_token, return_tensors='pt')
-        response_ids = model.generate(
-            input_ids,
-            max_length=1000,
-            pad_token_id=tokenizer.eos_token_id,
-            no_repeat_ngram_size=3,
-            do_sample=True,
-            top_k=100,
-            top_p=0.7,
-            temperature=0.8
-        )
-        
-        # Decode and return the response
-        response = tokenizer.decode(response_ids[:, input_ids.shape[-1]:][0], skip_special_tokens=True)
-        return response if response.strip() else random.choice(fallback_responses)
-        
+        response = inference.generate_text(user_input, budget=budget, conversation=conversation)
+        return response if response.strip() else random.choice(FALLBACK_RESPONSES)
+
+    except Exception as e:
+        logger.error(f"Error generating response: {str(e)}")
+        return random.choice(FALLBACK_RESPONSES)
+
+async def aget_response(user_input, budget='chat', conversation=None):
+    """Async version of get_response."""
+    try:
+        response = await inference.agenerate_text(user_input, budget=budget, conversation=conversation)
+        return response if response.strip() else random.choice(FALLBACK_RESPONSES)
+
     except Exception as e:
         logger.error(f"Error generating response: {str(e)}")
-        return random.choice(fallback_responses)
+        return random.choice(FALLBACK_RESPONSES)
+
+def stream_response(user_input, budget='chat', conversation=None):
+    """
+    Like get_response, but yields the reply in chunks as it is generated.
+    Falls back to a predefined response if nothing could be generated.
+    """
+    produced = False
+    try:
+        for chunk in inference.stream_text(user_input, budget=budget, conversation=conversation):
+            produced = produced or bool(chunk.strip())
+            yield chunk
+    except Exception as e:
+        logger.error(f"Error streaming response: {str(e)}")
+    if not produced:
+        yield random.choice(FALLBACK_RESPONSES)
+
+async def astream_response(user_input, budget='chat', conversation=None):
+    """Async version of stream_response."""
+    produced = False
+    try:
+        async for chunk in inference.astream_text(user_input, budget=budget, conversation=conversation):
+            produced = produced or bool(chunk.strip())
+            yield chunk
+    except Exception as e:
+        logger.error(f"Error streaming response: {str(e)}")
+    if not produced:
+        yield random.choice(FALLBACK_RESPONSES)
+
+def get_cached_response(user_id, prompt, budget, refresh=False):
+    """
+    Like get_response, but replies are cached per user and prompt until the
+    user's data changes (see chatbot/response_cache.py). Fallback replies are
+    not cached. With `refresh` a new reply is generated and cached.
+    Returns (response, cached).
+    """
+    key = response_cache.make_key(user_id, budget, prompt, inference.get_budget(budget)['max_new_tokens'])
+    if not refresh:
+        response = response_cache.lookup(key)
+        if response is not None:
+            return response, True
+
+    try:
+        response = inference.generate_text(prompt, budget=budget)
+    except Exception as e:
+        logger.error(f"Error generating response: {str(e)}")
+        return random.choice(FALLBACK_RESPONSES), False
+    if not response.strip():
+        return random.choice(FALLBACK_RESPONSES), False
+
+    response_cache.store(key, response)
+    return response, False
+
+def build_chat_history(recent_messages):
+    """
+    Build the chat history (message texts, oldest first) from messages
+    ordered newest first.
+    """
+    return tuple(msg.message for msg in reversed(recent_messages))
+
+def generate_chat_response(user_message, chat_history=(), conversation_key=None):
+    """
+    Generate the assistant's reply to a chat message. Turns with the same
+    `conversation_key` (the user id) reuse the model's cached keys/values
+    for the conversation so far.
+    """
+    return get_response(user_message, budget='chat', conversation=(conversation_key, tuple(chat_history)))
+
+def stream_chat_response(user_message, chat_history=(), conversation_key=None):
+    """Stream the assistant's reply to a chat message."""
+    return stream_response(user_message, budget='chat', conversation=(conversation_key, tuple(chat_history)))
+
+async def agenerate_chat_response(user_message, chat_history=(), conversation_key=None):
+    """Async version of generate_chat_response."""
+    return await aget_response(user_message, budget='chat', conversation=(conversation_key, tuple(chat_history)))
+
+def astream_chat_response(user_message, chat_history=(), conversation_key=None):
+    """Async version of stream_chat_response."""
+    return astream_response(user_message, budget='chat', conversation=(conversation_key, tuple(chat_history)))
 
 def get_mood_insights(mood_entries):
     """
@@ -144,139 +182,156 @@ def get_mood_insights(mood_entries):
         3. Suggesting coping strategies
         4. Maintaining an encouraging tone"""
         
-        response = get_response(prompt)
+        response, cached = get_cached_response(mood_entries[0].user_id, prompt, 'mood_insights')
         return response if response else "I notice you've been tracking your moods. That's a great step towards self-awareness. Would you like to share more about how you're feeling today?"
         
     except Exception as e:
         return "I notice you've been tracking your moods. That's a great step towards self-awareness. Would you like to share more about how you're feeling today?"
 
-def generate_self_care_suggestions(user, mood_entries=None, journal_entries=None):
+def build_self_care_prompt(user, mood_entries=None, journal_entries=None):
     """
-    Generate personalized self-care suggestions based on user's mood, journal entries, and conversation context.
+    Build the self-care prompt from the user's mood, journal entries, and conversation context.
+    Returns (prompt, sentiment).
     """
-    try:
-        # Get recent mood and journal entries if not provided
-        if not mood_entries:
-            mood_entries = MoodEntry.objects.filter(user=user).order_by('-created_at')[:5]
-        if not journal_entries:
-            journal_entries = JournalEntry.objects.filter(user=user).order_by('-created_at')[:5]
-
-        # Get recent chat messages for context
-        recent_chats = ChatMessage.objects.filter(user=user).order_by('-created_at')[:10]
-
-        # Analyze sentiment from recent entries
-        sentiment = 'neutral'
-        sentiment_scores = []
-        
-        # Analyze mood entries
-        if mood_entries:
-            mood_values = {
-                'very_sad': 1,
-                'sad': 2,
-                'neutral': 3,
-                'happy': 4,
-                'very_happy': 5
-            }
-            mood_scores = [mood_values[entry.mood] for entry in mood_entries]
-            sentiment_scores.extend(mood_scores)
-
-        # Analyze journal entries
+    # Get recent mood and journal entries if not provided
+    if not mood_entries:
+        mood_entries = MoodEntry.objects.filter(user=user).order_by('-created_at')[:5]
+    if not journal_entries:
+        journal_entries = JournalEntry.objects.filter(user=user).order_by('-created_at')[:5]
+
+    # Get recent chat messages for context
+    recent_chats = ChatMessage.objects.filter(user=user).order_by('-created_at')[:10]
+
+    # Analyze sentiment from recent entries
+    sentiment = 'neutral'
+    sentiment_scores = []
+    
+    # Analyze mood entries
+    if mood_entries:
+        mood_values = {
+            'very_sad': 1,
+            'sad': 2,
+            'neutral': 3,
+            'happy': 4,
+            'very_happy': 5
+        }
+        mood_scores = [mood_values[entry.mood] for entry in mood_entries]
+        sentiment_scores.extend(mood_scores)
+
+    # Analyze journal entries and chat messages (only bot responses). Their
+    # scores are stored when the background worker picks up new rows, so only
+    # rows it hasn't reached yet are scored here, in one batch per model.
+    journals = list(journal_entries)
+    bot_chats = [chat for chat in recent_chats if not chat.is_user]
+    unscored = [row for row in journals + bot_chats if is_stale(row)]
+    if unscored:
+        score_instances([row for row in unscored if isinstance(row, JournalEntry)], 'content')
+        score_instances([row for row in unscored if isinstance(row, ChatMessage)], 'message')
+
+    for row in journals + bot_chats:
+        score = row.sentiment_score
+        if score is not None:
+            sentiment_scores.append(score if row.sentiment_label == 'POSITIVE' else -score)
+
+    # Calculate overall sentiment
+    if sentiment_scores:
+        avg_sentiment = sum(sentiment_scores) / len(sentiment_scores)
+        if avg_sentiment <= -0.3:
+            sentiment = 'negative'
+        elif avg_sentiment >= 0.3:
+            sentiment = 'positive'
+
+    # Prepare context for suggestion generation
+    context = f"User's emotional state: {sentiment}\n"
+    
+    # Add recent themes from journal entries
+    if journal_entries:
+        context += "Recent themes:\n"
         for entry in journal_entries:
-            label, score = get_sentiment(entry.content)
-            sentiment_scores.append(score if label == 'POSITIVE' else -score)
+            context += f"- {entry.content[:100]}...\n"
 
-        # Analyze chat messages
+    # Add recent activities from chat
+    if recent_chats:
+        context += "Recent conversation context:\n"
         for chat in recent_chats:
-            if not chat.is_user:  # Only analyze bot responses
-                label, score = get_sentiment(chat.message)
-                sentiment_scores.append(score if label == 'POSITIVE' else -score)
-
-        # Calculate overall sentiment
-        if sentiment_scores:
-            avg_sentiment = sum(sentiment_scores) / len(sentiment_scores)
-            if avg_sentiment <= -0.3:
-                sentiment = 'negative'
-            elif avg_sentiment >= 0.3:
-                sentiment = 'positive'
-
-        # Prepare context for suggestion generation
-        context = f"User's emotional state: {sentiment}\n"
-        
-        # Add recent themes from journal entries
-        if journal_entries:
-            context += "Recent themes:\n"
-            for entry in journal_entries:
-                context += f"- {entry.content[:100]}...\n"
-
-        # Add recent activities from chat
-        if recent_chats:
-            context += "Recent conversation context:\n"
-            for chat in recent_chats:
-                context += f"- {chat.message[:100]}...\n"
-
-        # Generate suggestions based on sentiment and context
-        prompt = f"""Based on the following user context, generate 5 personalized self-care suggestions:
-        {context}
-        
-        Consider:
-        1. User's current emotional state ({sentiment})
-        2. Recent activities and themes
-        3. Different categories:
-           - relaxation (e.g., music, breathing exercises, warm baths)
-           - physical activity (e.g., walks, stretching, gentle exercise)
-           - social connection (e.g., reaching out to friends, group activities)
-           - mindfulness (e.g., meditation, grounding exercises)
-           - creative expression (e.g., art, writing, music)
-        4. Practical and achievable activities
-        5. Time of day and typical user schedule
-        
-        Format each suggestion as: category|suggestion|duration
-        Example: relaxation|Take a warm bath with lavender essential oils|20 minutes
-        """
-
-        response = get_response(prompt)
-        if not response:
-            return []
-
-        # Parse suggestions
-        suggestions = []
-        for line in response.strip().split('\n'):
-            if '|' in line:
-                try:
-                    category, suggestion, duration = line.split('|', 2)
-                    category = category.strip().lower()
-                    suggestion = suggestion.strip()
-                    duration = duration.strip()
-
-                    # Map category to model choices
-                    category_mapping = {
-                        'relaxation': 'relaxation',
-                        'physical': 'physical',
-                        'social': 'social',
-                        'mindfulness': 'mindfulness',
-                        'creative': 'creative'
-                    }
-
-                    if category in category_mapping:
-                        # Create and save the suggestion
-                        suggestion_obj = SelfCareSuggestion.objects.create(
-                            user=user,
-                            suggestion=f"{suggestion} (Duration: {duration})",
-                            category=category_mapping[category],
-                            sentiment=sentiment
-                        )
-                        suggestions.append({
-                            'category': category_mapping[category],
-                            'suggestion': suggestion,
-                            'duration': duration,
-                            'sentiment': sentiment
-                        })
-                except Exception as e:
-                    print(f"Error parsing suggestion: {str(e)}")
-                    continue
+            context += f"- {chat.message[:100]}...\n"
+
+    # Generate suggestions based on sentiment and context
+    prompt = f"""Based on the following user context, generate 5 personalized self-care suggestions:
+    {context}
+    
+    Consider:
+    1. User's current emotional state ({sentiment})
+    2. Recent activities and themes
+    3. Different categories:
+       - relaxation (e.g., music, breathing exercises, warm baths)
+       - physical activity (e.g., walks, stretching, gentle exercise)
+       - social connection (e.g., reaching out to friends, group activities)
+       - mindfulness (e.g., meditation, grounding exercises)
+       - creative expression (e.g., art, writing, music)
+    4. Practical and achievable activities
+    5. Time of day and typical user schedule
+    
+    Format each suggestion as: category|suggestion|duration
+    Example: relaxation|Take a warm bath with lavender essential oils|20 minutes
+    """
+
+    return prompt, sentiment
+
+def parse_self_care_suggestions(response, sentiment):
+    """
+    Parse the model's "category|suggestion|duration" lines.
+    """
+    # Parse suggestions
+    suggestions = []
+    for line in response.strip().split('\n'):
+        if '|' in line:
+            try:
+                category, suggestion, duration = line.split('|', 2)
+                category = category.strip().lower()
+                suggestion = suggestion.strip()
+                duration = duration.strip()
+
+                # Map category to model choices
+                category_mapping = {
+                    'relaxation': 'relaxation',
+                    'physical': 'physical',
+                    'social': 'social',
+                    'mindfulness': 'mindfulness',
+                    'creative': 'creative'
+                }
+
+                if category in category_mapping:
+                    suggestions.append({
+                        'category': category_mapping[category],
+                        'suggestion': suggestion,
+                        'duration': duration,
+                        'sentiment': sentiment
+                    })
+            except Exception as e:
+                logger.error(f"Error parsing suggestion: {str(e)}")
+                continue
+
+    return suggestions
+
+def generate_self_care_suggestions(user, mood_entries=None, journal_entries=None, refresh=False):
+    """
+    Generate personalized self-care suggestions based on user's mood, journal entries, and conversation context.
+    Suggestions are only saved when newly generated; while the user's data is
+    unchanged the cached reply is reused. `refresh` forces a new generation,
+    which replaces the user's open suggestions.
+    """
+    try:
+        prompt, sentiment = build_self_care_prompt(user, mood_entries, journal_entries)
+
+        response, cached = get_cached_response(user.id, prompt, 'self_care', refresh=refresh)
+        if cached:
+            return parse_self_care_suggestions(response, sentiment)
 
+        suggestions = parse_self_care_suggestions(response, sentiment)
+        save_suggestions(user, suggestions, sentiment, replace=refresh)
         return suggestions
 
     except Exception as e:
-        print(f"Error generating self-care suggestions: {str(e)}")
-        return [] 
\ No newline at end of file
+        logger.error(f"Error generating self-care suggestions: {str(e)}")
+        return []
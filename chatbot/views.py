@@ -1,74 +1,50 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
+from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib import messages
-from django.http import JsonResponse
+from django.http import JsonResponse, StreamingHttpResponse
 from django.views.decorators.http import require_http_methods
 from django.views.decorators.csrf import csrf_exempt
 from django.contrib.auth import login, authenticate, logout
 from django.contrib.auth.forms import AuthenticationForm
+from django.contrib.auth.models import User
 import json
-from .models import MoodEntry, JournalEntry, ChatMessage, SelfCareSuggestion, BreathingExercise, MeditationSession, WellnessGoal
+from .models import MoodEntry, JournalEntry, ChatMessage, SelfCareSuggestion, BreathingExercise, MeditationSession, WellnessGoal, DashboardSnapshot
 from .forms import MoodEntryForm, JournalEntryForm, UserRegistrationForm, WellnessGoalForm, GoalProgressForm
-from .utils import generate_chat_response, get_mood_insights, generate_self_care_suggestions
+from .utils import build_chat_history, generate_chat_response, stream_chat_response
+from .tasks import enqueue as enqueue_task, is_refreshing
+from .sentiment_analysis import get_tier_stats
+from .analytics import chart_data, mood_summary
+from .pagination import keyset_page
+from . import export, search
+from .embeddings import EmbeddingsUnavailable, similar_entries
+from . import inference, response_cache
 from collections import Counter
-from datetime import datetime, timedelta, timezone
+from django.db.models import Count
+from django.utils import timezone
+from django.conf import settings
 import logging
 import time
 
 logger = logging.getLogger(__name__)
 
+# Upper bounds on the chart points and history rows a client may ask for
+MAX_CHART_POINTS = 1000
+MAX_HISTORY_PAGE_SIZE = 200
+
 @login_required
 def home(request):
     # Get recent entries
     recent_moods = MoodEntry.objects.filter(user=request.user).order_by('-created_at')[:5]
     recent_journals = JournalEntry.objects.filter(user=request.user).order_by('-created_at')[:5]
     
-    # Get mood analytics data
-    mood_entries = MoodEntry.objects.filter(user=request.user).order_by('created_at')
-    
-    # Calculate mood statistics
-    if mood_entries:
-        # Get most common mood
-        mood_counts = Counter(entry.mood for entry in mood_entries)
-        most_common_mood = max(mood_counts.items(), key=lambda x: x[1])[0]
-        
-        # Calculate average mood
-        mood_values = {
-            'very_sad': 1,
-            'sad': 2,
-            'neutral': 3,
-            'happy': 4,
-            'very_happy': 5
-        }
-        avg_mood_value = sum(mood_values[entry.mood] for entry in mood_entries) / len(mood_entries)
-        average_mood = next(mood for mood, value in mood_values.items() if value == round(avg_mood_value))
-        
-        # Prepare chart data
-        mood_dates = [entry.created_at.strftime('%Y-%m-%d') for entry in mood_entries]
-        mood_values = [mood_values[entry.mood] for entry in mood_entries]
-        mood_labels = [entry.get_mood_display() for entry in mood_entries]
-        
-        # Get mood insights
-        mood_insights = get_mood_insights(mood_entries)
-    else:
-        most_common_mood = None
-        average_mood = None
-        mood_dates = []
-        mood_values = []
-        mood_labels = []
-        mood_insights = None
-
-    # Generate self-care suggestions
-    suggestions = generate_self_care_suggestions(request.user, recent_moods, recent_journals)
-    
-    # Save suggestions to database
-    for suggestion_data in suggestions:
-        SelfCareSuggestion.objects.create(
-            user=request.user,
-            suggestion=suggestion_data['suggestion'],
-            category=suggestion_data['category'],
-            sentiment=suggestion_data['sentiment']
-        )
+    # Mood statistics, aggregated in the database
+    mood_stats = mood_summary(request.user)
+
+    # Mood insights and suggestions are precomputed by the background worker
+    snapshot = DashboardSnapshot.objects.filter(user=request.user).first()
+    if snapshot is None:
+        enqueue_task(request.user.id, 'dashboard', delay=0)
     
     # Get recent suggestions
     recent_suggestions = SelfCareSuggestion.objects.filter(
@@ -79,12 +55,10 @@ def home(request):
     context = {
         'recent_moods': recent_moods,
         'recent_journals': recent_journals,
-        'mood_insights': mood_insights,
-        'most_common_mood': most_common_mood,
-        'average_mood': average_mood,
-        'mood_dates': json.dumps(mood_dates),
-        'mood_values': json.dumps(mood_values),
-        'mood_labels': json.dumps(mood_labels),
+        'mood_insights': snapshot.mood_insights if snapshot else None,
+        'refreshing': is_refreshing(request.user.id),
+        'most_common_mood': mood_stats['most_common_mood'],
+        'average_mood': mood_stats['average_mood'],
         'recent_suggestions': recent_suggestions,
     }
     
@@ -136,10 +110,7 @@ def chat(request):
         recent_messages = ChatMessage.get_recent_chat_history(request.user)
         
         # Build chat history string
-        chat_history = ""
-        for msg in reversed(recent_messages):
-            prefix = "User: " if msg.is_user else "Assistant: "
-            chat_history += f"{prefix}{msg.message}\n"
+        chat_history = build_chat_history(recent_messages)
         
         # Save user message
         user_chat = ChatMessage.objects.create(
@@ -147,10 +118,20 @@ def chat(request):
             message=user_message,
             is_user=True
         )
+
+        if data.get('stream'):
+            # Send tokens as Server-Sent Events while the reply is generated
+            response = StreamingHttpResponse(
+                _stream_chat(request.user, user_message, chat_history, start_time),
+                content_type='text/event-stream'
+            )
+            response['Cache-Control'] = 'no-cache'
+            response['X-Accel-Buffering'] = 'no'
+            return response
         
         try:
             # Generate AI response with chat history
-            ai_response = generate_chat_response(user_message, chat_history)
+            ai_response = generate_chat_response(user_message, chat_history, request.user.id)
             
             # Calculate response time
             response_time = time.time() - start_time
@@ -199,20 +180,209 @@ def chat(request):
             'status': 'error'
         }, status=500)
 
+def _sse(event, data):
+    """Format a Server-Sent Events message"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+def _stream_chat(user, user_message, chat_history, start_time):
+    """Yield the AI reply as Server-Sent Events and save it once complete"""
+    chunks = []
+    first_token_time = None
+    try:
+        for chunk in stream_chat_response(user_message, chat_history, user.id):
+            if first_token_time is None:
+                first_token_time = time.time() - start_time
+            chunks.append(chunk)
+            yield _sse('token', {'text': chunk})
+
+        # Save AI response once the stream is complete
+        response_time = time.time() - start_time
+        ChatMessage.objects.create(
+            user=user,
+            message=''.join(chunks).strip(),
+            is_user=False,
+            response_time=response_time,
+            first_token_time=first_token_time
+        )
+
+        yield _sse('done', {
+            'status': 'success',
+            'response_time': round(response_time, 2),
+            'first_token_time': round(first_token_time, 2) if first_token_time is not None else None
+        })
+
+    except Exception as e:
+        logger.error(f"Error streaming chat response: {str(e)}")
+        ChatMessage.objects.create(
+            user=user,
+            message="I apologize, but I'm having trouble responding right now.",
+            is_user=False,
+            is_error=True,
+            error_message=str(e),
+            response_time=time.time() - start_time,
+            first_token_time=first_token_time
+        )
+        yield _sse('error', {
+            'error': 'An error occurred while generating the response',
+            'status': 'error'
+        })
+
+def history_page(request, queryset, template_name, context_name, serialize, chronological=False):
+    """
+    One keyset page of a history list, newest first: rendered, or as JSON
+    (`results` and `next_cursor`) with ?format=json for infinite scroll.
+    Pages still run newest to oldest with `chronological`, but each page's
+    rows are put oldest first, so a conversation reads top to bottom.
+    """
+    as_json = request.GET.get('format') == 'json'
+    try:
+        page_size = settings.HISTORY_PAGE_SIZE
+        if as_json:
+            page_size = max(1, min(int(request.GET.get('limit', page_size)), MAX_HISTORY_PAGE_SIZE))
+        rows, next_cursor = keyset_page(queryset, request.GET.get('cursor'), page_size)
+    except ValueError as e:
+        return JsonResponse({'error': str(e), 'status': 'error'}, status=400)
+    if chronological:
+        rows = rows[::-1]
+
+    if as_json:
+        return JsonResponse({'results': [serialize(row) for row in rows], 'next_cursor': next_cursor})
+    return render(request, template_name, {
+        context_name: rows,
+        'next_cursor': next_cursor,
+        'is_first_page': not request.GET.get('cursor'),
+    })
+
 @login_required(login_url='login')
 def mood_history(request):
-    mood_entries = MoodEntry.objects.filter(user=request.user)
-    return render(request, 'chatbot/mood_history.html', {'mood_entries': mood_entries})
+    return history_page(
+        request,
+        MoodEntry.objects.filter(user=request.user),
+        'chatbot/mood_history.html',
+        'mood_entries',
+        lambda entry: {
+            'id': entry.id,
+            'mood': entry.mood,
+            'mood_display': entry.get_mood_display(),
+            'notes': entry.notes,
+            'created_at': entry.created_at.isoformat(),
+        }
+    )
 
 @login_required(login_url='login')
 def journal_history(request):
-    journal_entries = JournalEntry.objects.filter(user=request.user)
-    return render(request, 'chatbot/journal_history.html', {'journal_entries': journal_entries})
+    return history_page(
+        request,
+        JournalEntry.objects.filter(user=request.user).defer('embedding'),
+        'chatbot/journal_history.html',
+        'journal_entries',
+        lambda entry: {
+            'id': entry.id,
+            'content': entry.content,
+            'created_at': entry.created_at.isoformat(),
+            'updated_at': entry.updated_at.isoformat(),
+        }
+    )
 
 @login_required(login_url='login')
 def chat_history(request):
-    chat_messages = ChatMessage.objects.filter(user=request.user)
-    return render(request, 'chatbot/chat_history.html', {'chat_messages': chat_messages})
+    return history_page(
+        request,
+        ChatMessage.objects.filter(user=request.user),
+        'chatbot/chat_history.html',
+        'chat_messages',
+        lambda message: {
+            'id': message.id,
+            'message': message.message,
+            'is_user': message.is_user,
+            'created_at': message.created_at.isoformat(),
+        },
+        chronological=True
+    )
+
+@login_required
+def similar_journal_entries(request):
+    """The user's journal entries most like one entry (?entry=<id>) or a text (?q=...)"""
+    try:
+        k = max(1, min(int(request.GET.get('k', 5)), 20))
+        entry_id = int(request.GET['entry']) if request.GET.get('entry') else None
+    except ValueError:
+        return JsonResponse({'error': 'entry and k must be integers', 'status': 'error'}, status=400)
+    text = request.GET.get('q', '').strip()
+    if entry_id is None and not text:
+        return JsonResponse({'error': 'Pass entry or q', 'status': 'error'}, status=400)
+
+    try:
+        if entry_id is not None:
+            entry = get_object_or_404(JournalEntry, pk=entry_id, user=request.user)
+            similar = similar_entries(request.user.id, entry=entry, k=k)
+        else:
+            similar = similar_entries(request.user.id, text=text, k=k)
+    except EmbeddingsUnavailable as e:
+        logger.error(str(e))
+        return JsonResponse({'error': 'Similar entries are not available', 'status': 'error'}, status=503)
+
+    return JsonResponse({'results': [
+        {
+            'id': similar_entry.id,
+            'content': similar_entry.content[:200],
+            'created_at': similar_entry.created_at.isoformat(),
+            'similarity': round(similarity, 4),
+        }
+        for similar_entry, similarity in similar
+    ]})
+
+@login_required(login_url='login')
+def search_history(request):
+    """Ranked full-text search over the user's journal entries and chat messages"""
+    query = request.GET.get('q', '').strip()
+    try:
+        page = max(1, int(request.GET.get('page', 1)))
+    except ValueError:
+        return JsonResponse({'error': 'page must be an integer', 'status': 'error'}, status=400)
+
+    results, has_next, truncated = [], False, False
+    if query:
+        try:
+            results, has_next, truncated = search.search(request.user.id, query, page, settings.SEARCH_PAGE_SIZE)
+        except search.SearchUnavailable as e:
+            logger.error(str(e))
+
+    if request.GET.get('format') == 'json':
+        return JsonResponse({'results': results, 'page': page, 'has_next': has_next, 'truncated': truncated})
+    return render(request, 'chatbot/search.html', {
+        'query': query,
+        'results': results,
+        'page': page,
+        'has_next': has_next,
+        'truncated': truncated,
+        'max_candidates': search.MAX_CANDIDATES,
+    })
+
+@login_required
+def export_history(request):
+    """
+    The user's full history as a streamed download: ?format=ndjson (default)
+    or csv, gzipped with ?gzip=1. Staff may pass ?user=<username>.
+    """
+    export_format = request.GET.get('format', 'ndjson')
+    if export_format not in export.FORMATS:
+        return JsonResponse({'error': f'format must be one of {", ".join(export.FORMATS)}', 'status': 'error'}, status=400)
+    compress = request.GET.get('gzip') in ('1', 'true')
+
+    user = request.user
+    if request.GET.get('user') and request.user.is_staff:
+        user = get_object_or_404(User, username=request.GET['user'])
+        logger.info(f"{request.user.username} exported the history of {user.username}")
+
+    # Under ASGI, Django buffers a sync iterator in full before sending it
+    chunks = export.aexport_chunks if settings.ASYNC_VIEWS else export.export_chunks
+    response = StreamingHttpResponse(
+        chunks(user.id, export_format, compress),
+        content_type='application/gzip' if compress else export.FORMATS[export_format]
+    )
+    response['Content-Disposition'] = f'attachment; filename="{export.filename(user.id, export_format, compress)}"'
+    return response
 
 @login_required
 @require_http_methods(['POST'])
@@ -315,20 +485,9 @@ def logout_view(request):
 @csrf_exempt
 def refresh_suggestions(request):
     try:
-        # Get recent entries for context
-        recent_moods = MoodEntry.objects.filter(user=request.user).order_by('-created_at')[:5]
-        recent_journals = JournalEntry.objects.filter(user=request.user).order_by('-created_at')[:5]
-        
-        # Generate new suggestions
-        suggestions = generate_self_care_suggestions(request.user, recent_moods, recent_journals)
-        
-        # Mark old suggestions as completed
-        SelfCareSuggestion.objects.filter(
-            user=request.user,
-            is_completed=False
-        ).update(is_completed=True)
-        
-        return JsonResponse({'status': 'success'})
+        # New suggestions are generated by the background worker
+        task = enqueue_task(request.user.id, 'refresh_suggestions', delay=0)
+        return JsonResponse({'status': 'success', 'task_id': task.id})
     except Exception as e:
         return JsonResponse({'status': 'error', 'message': str(e)}, status=500)
 
@@ -438,8 +597,73 @@ def get_goal_check_ins(request):
         check_in = generate_goal_check_in(goal)
         if check_in:
             check_ins.append({
-                'goal': goal,
+                'goal_id': goal.id,
+                'goal': str(goal),
                 'message': check_in
             })
     
-    return JsonResponse({'check_ins': check_ins}) 
\ No newline at end of file
+    return JsonResponse({'check_ins': check_ins}) 
+
+@staff_member_required
+def inference_stats(request):
+    """Batch-size and latency histograms for this process's inference workers"""
+    stats = inference.get_stats()
+    stats['response_cache'] = response_cache.get_stats()
+
+    # Texts scored by the lexicon fast path vs the transformer
+    stored = Counter()
+    for model in (JournalEntry, ChatMessage):
+        for row in model.objects.exclude(sentiment_tier=None).values('sentiment_tier').annotate(count=Count('id')):
+            stored[row['sentiment_tier']] += row['count']
+    stats['sentiment_tiers'] = {'stored': dict(stored), 'process': get_tier_stats()}
+    return JsonResponse(stats)
+
+@login_required
+def mood_chart(request):
+    """Mood series, trend and weekday/hour heatmap for the dashboard chart"""
+    try:
+        days = int(request.GET.get('days', 0))
+        points = int(request.GET.get('points', settings.MOOD_CHART_POINTS))
+        window = int(request.GET.get('window', settings.MOOD_CHART_WINDOW))
+    except ValueError:
+        return JsonResponse({
+            'error': 'days, points and window must be integers',
+            'status': 'error'
+        }, status=400)
+
+    points = max(3, min(points, MAX_CHART_POINTS))
+    return JsonResponse(chart_data(request.user, days=max(days, 0), max_points=points, window=max(window, 1)))
+
+@login_required
+def dashboard_status(request):
+    """Whether the background worker is still precomputing the dashboard"""
+    snapshot = DashboardSnapshot.objects.filter(user=request.user).first()
+    return JsonResponse({
+        'refreshing': is_refreshing(request.user.id),
+        'updated_at': snapshot.updated_at.isoformat() if snapshot else None,
+    })
+
+def live(request):
+    """
+    Liveness probe, used by the deploy health checks: 200 whenever the
+    process serves requests, including while the model warms up or when
+    none could be loaded (replies then fall back); the body says which.
+    """
+    status = inference.get_status()
+    return JsonResponse({
+        'status': 'ok' if status == 'ready' else status,
+        'inference': status,
+    })
+
+def health(request):
+    """
+    Readiness probe: 503 unless the inference backend is ready, i.e. while
+    it is cold (not started yet), warming up, or degraded (no model could
+    be loaded). Only reports; it never starts the backend.
+    """
+    status = inference.get_status()
+    ready = status == 'ready'
+    return JsonResponse({
+        'status': 'ok' if ready else status,
+        'inference': status,
+    }, status=200 if ready else 503)
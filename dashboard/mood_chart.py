@@ -0,0 +1,147 @@
+"""
+Chart data for the mood dashboard, computed with NumPy.
+
+The inputs are already aggregated (one row per day with entries, and one row
+per weekday/hour cell), so the work here is proportional to the number of
+days a user has recorded, and the output to the point budget:
+
+- the daily average mood and its rolling average over a window of calendar
+  days (days without entries don't count as zero)
+- a least-squares trend line weighted by the number of entries per day
+- a 7x24 weekday/hour heatmap of average mood and entry counts
+- Largest-Triangle-Three-Buckets downsampling of the daily series to at most
+  `max_points` points, which keeps the peaks and dips a plain stride would
+  drop
+
+``build_chart`` returns plain lists of ints and rounded floats (None for
+missing values), ready for ``JsonResponse``.
+"""
+import numpy as np
+
+DECIMALS = 2
+
+
+def daily_grid(day_numbers, counts, value_sums):
+    """
+    Dense per-day arrays from the first to the last day with entries:
+    (entry counts, mood value sums), indexed by day - first day.
+    """
+    offsets = day_numbers - day_numbers[0]
+    length = int(offsets[-1]) + 1
+    count_grid = np.bincount(offsets, weights=counts, minlength=length)
+    sum_grid = np.bincount(offsets, weights=value_sums, minlength=length)
+    return count_grid, sum_grid
+
+
+def rolling_mean(count_grid, sum_grid, window):
+    """Average mood of the entries in the `window` days up to each day (NaN if none)"""
+    window = max(1, min(window, len(count_grid)))
+    count_totals = np.concatenate(([0.0], np.cumsum(count_grid)))
+    sum_totals = np.concatenate(([0.0], np.cumsum(sum_grid)))
+    ends = np.arange(1, len(count_grid) + 1)
+    starts = np.maximum(ends - window, 0)
+    counts = count_totals[ends] - count_totals[starts]
+    sums = sum_totals[ends] - sum_totals[starts]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(counts > 0, sums / counts, np.nan)
+
+
+def trend_line(x, y, weights):
+    """(slope per day, intercept) of the weighted least-squares line, None for fewer than two days"""
+    if len(x) < 2:
+        return None
+    slope, intercept = np.polyfit(x, y, 1, w=np.sqrt(weights))
+    return float(slope), float(intercept)
+
+
+def lttb(x, y, max_points):
+    """Indices of at most `max_points` points that keep the shape of (x, y)"""
+    n = len(x)
+    if max_points >= n or max_points < 3:
+        return np.arange(n)
+
+    # max_points - 2 buckets between the fixed first and last points
+    edges = np.append(np.linspace(1, n - 1, max_points - 1).astype(np.int64), n)
+    selected = np.empty(max_points, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+    a = 0
+    for i in range(max_points - 2):
+        bucket = slice(edges[i], edges[i + 1])
+        following = slice(edges[i + 1], edges[i + 2])
+        cx, cy = x[following].mean(), y[following].mean()
+        # Keep the point forming the largest triangle with the last kept
+        # point and the average of the next bucket
+        areas = np.abs((x[a] - cx) * (y[bucket] - y[a]) - (x[a] - x[bucket]) * (cy - y[a]))
+        a = edges[i] + int(np.argmax(areas))
+        selected[i + 1] = a
+    return selected
+
+
+def heatmap(weekdays, hours, counts, value_sums):
+    """7x24 (average mood, entry count) grids; weekday 0 is Monday"""
+    count_grid = np.zeros((7, 24))
+    sum_grid = np.zeros((7, 24))
+    np.add.at(count_grid, (weekdays, hours), counts)
+    np.add.at(sum_grid, (weekdays, hours), value_sums)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean_grid = np.where(count_grid > 0, sum_grid / count_grid, np.nan)
+    return mean_grid, count_grid.astype(np.int64)
+
+
+def _floats(values):
+    """Rounded floats with None for NaN"""
+    return [None if np.isnan(value) else value for value in np.round(values, DECIMALS).tolist()]
+
+
+def build_chart(day_numbers, counts, value_sums, heat_cells=(), max_points=180, window=7):
+    """
+    Chart payload from per-day rows (day ordinals ascending, entry counts,
+    mood value sums) and heatmap cells (weekday, hour, count, value sum).
+
+    Days are returned as offsets from `first_day` (an ordinal, as
+    date.toordinal), alongside the daily mood, its rolling average and the
+    number of entries behind each point.
+    """
+    heat_cells = np.asarray(heat_cells, dtype=np.int64).reshape(-1, 4)
+    mean_grid, count_grid = heatmap(heat_cells[:, 0], heat_cells[:, 1], heat_cells[:, 2], heat_cells[:, 3])
+    chart = {
+        'first_day': None,
+        'total_days': 0,
+        'x': [],
+        'mood': [],
+        'rolling': [],
+        'count': [],
+        'trend': None,
+        'heatmap': {'mood': [_floats(row) for row in mean_grid], 'count': count_grid.tolist()},
+    }
+
+    day_numbers = np.asarray(day_numbers, dtype=np.int64)
+    if not len(day_numbers):
+        return chart
+    counts = np.asarray(counts, dtype=np.float64)
+    value_sums = np.asarray(value_sums, dtype=np.float64)
+
+    offsets = day_numbers - day_numbers[0]
+    daily = value_sums / counts
+    count_grid, sum_grid = daily_grid(day_numbers, counts, value_sums)
+    rolling = rolling_mean(count_grid, sum_grid, window)[offsets]
+
+    keep = lttb(offsets.astype(np.float64), daily, max_points)
+    trend = trend_line(offsets, daily, counts)
+
+    chart.update({
+        'first_day': int(day_numbers[0]),
+        'total_days': len(day_numbers),
+        'x': offsets[keep].tolist(),
+        'mood': _floats(daily[keep]),
+        'rolling': _floats(rolling[keep]),
+        'count': counts[keep].astype(np.int64).tolist(),
+    })
+    if trend:
+        slope, intercept = trend
+        chart['trend'] = {
+            'slope_per_week': round(slope * 7, 3),
+            'start': round(intercept, DECIMALS),
+            'end': round(intercept + slope * int(offsets[-1]), DECIMALS),
+        }
+    return chart
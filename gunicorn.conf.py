@@ -0,0 +1,38 @@
+"""
+Gunicorn configuration, picked up automatically from the working directory.
+
+With preload_app the master imports the application once; ChatbotConfig.ready()
+then loads the DialoGPT weights in the master so every forked worker (and the
+inference workers those fork) shares them copy-on-write instead of loading its
+own copy after each --max-requests recycle.
+"""
+import os
+import sys
+
+preload_app = os.getenv('GUNICORN_PRELOAD', 'True') == 'True'
+
+if preload_app:
+    os.environ.setdefault('INFERENCE_PRELOAD', 'True')
+
+
+def on_starting(server):
+    """
+    Refuse to start several workers with a per-process reply cache, and warn
+    about a missing sentiment model (see chatbot/checks.py).
+    """
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'mental_wellness.settings')
+    import django
+    django.setup()
+    from chatbot.checks import response_cache_errors, sentiment_model_warnings
+
+    for warning in sentiment_model_warnings():
+        server.log.warning(f"{warning.msg}. {warning.hint}")
+    for error in response_cache_errors(server.cfg.workers):
+        server.log.error(f"{error.msg}. {error.hint}")
+        sys.exit(1)
+
+
+def post_worker_init(worker):
+    """Start the inference workers as soon as a web worker boots."""
+    from chatbot import inference
+    inference.warm_up()
@@ -9,8 +9,32 @@ https://docs.djangoproject.com/en/5.0/howto/deployment/asgi/
 
 import os
 
+from django.conf import settings
+from django.contrib.staticfiles.handlers import ASGIStaticFilesHandler
 from django.core.asgi import get_asgi_application
+from django.views.static import serve
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'mental_wellness.settings')
+# Use the async chat views, which don't hold a thread while the model generates
+os.environ.setdefault('DJANGO_ASYNC_VIEWS', 'True')
 
-application = get_asgi_application() 
\ No newline at end of file
+
+
+class StaticRootHandler(ASGIStaticFilesHandler):
+    """
+    Serves STATIC_URL from the collected files in STATIC_ROOT (including
+    the hashed names the manifest storage links to), in place of WhiteNoise,
+    which is left out of the async middleware chain (see settings.py).
+    """
+
+    def serve(self, request):
+        return serve(request, self.file_path(request.path), document_root=settings.STATIC_ROOT)
+
+
+application = get_asgi_application()
+
+# What gunicorn's post_worker_init hook does under WSGI
+from chatbot import inference  # noqa: E402
+inference.warm_up()
+if settings.ASYNC_VIEWS:
+    application = StaticRootHandler(application) 
\ No newline at end of file
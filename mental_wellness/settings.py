@@ -54,6 +54,14 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+# Serve the chat/suggestion views as async views (set by asgi.py)
+ASYNC_VIEWS = os.getenv('DJANGO_ASYNC_VIEWS', 'False') == 'True'
+if ASYNC_VIEWS:
+    # WhiteNoise's middleware is sync-only, which would make Django run the
+    # whole chain (and every async view) in a thread; asgi.py serves static
+    # files with an async handler instead
+    MIDDLEWARE.remove('whitenoise.middleware.WhiteNoiseMiddleware')
+
 ROOT_URLCONF = 'mental_wellness.urls'
 
 TEMPLATES = [
@@ -143,4 +151,98 @@ CSRF_TRUSTED_ORIGINS = [
     "https://*.railway.app",
     "http://localhost:8000",
     "http://127.0.0.1:8000",
-] 
\ No newline at end of file
+] 
+
+# Caches; "responses" holds model replies to the dashboard prompts (see
+# chatbot/response_cache.py). Use a shared backend such as Redis
+# (RESPONSE_CACHE_BACKEND=django.core.cache.backends.redis.RedisCache) so
+# every gunicorn worker sees the same entries.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'responses': {
+        'BACKEND': os.getenv('RESPONSE_CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.getenv('RESPONSE_CACHE_LOCATION', 'llm-responses'),
+        'TIMEOUT': int(os.getenv('RESPONSE_CACHE_TTL', '86400')),
+    },
+}
+if CACHES['responses']['BACKEND'].endswith('LocMemCache'):
+    # Least recently used entries are culled beyond this
+    CACHES['responses']['OPTIONS'] = {'MAX_ENTRIES': int(os.getenv('RESPONSE_CACHE_MAX_ENTRIES', '5000'))}
+
+# Sentiment model used for journal entries and chat messages, loaded from
+# SENTIMENT_MODEL_PATH (fetched by `manage.py download_sentiment_model`).
+# Stored scores record the model version (SENTIMENT_MODEL plus the fast-path
+# threshold), so changing either lets `manage.py score_sentiment` re-score
+# only the rows scored by another version.
+SENTIMENT_MODEL = os.getenv('SENTIMENT_MODEL', 'distilbert-base-uncased-finetuned-sst-2-english')
+SENTIMENT_MODEL_PATH = os.getenv('SENTIMENT_MODEL_PATH', os.path.join(BASE_DIR, 'models', 'sentiment'))
+# Lexicon fast path: short texts with a VADER compound score of at least the
+# threshold (either way) skip the transformer
+SENTIMENT_FAST_PATH = os.getenv('SENTIMENT_FAST_PATH', 'True') == 'True'
+SENTIMENT_FAST_PATH_THRESHOLD = float(os.getenv('SENTIMENT_FAST_PATH_THRESHOLD', '0.5'))
+SENTIMENT_FAST_PATH_MAX_CHARS = int(os.getenv('SENTIMENT_FAST_PATH_MAX_CHARS', '280'))
+NLTK_DATA_PATH = os.getenv('NLTK_DATA_PATH', os.path.join(BASE_DIR, 'models', 'nltk_data'))
+
+# Rows per page of the mood, journal and chat history (see chatbot/pagination.py)
+HISTORY_PAGE_SIZE = int(os.getenv('HISTORY_PAGE_SIZE', '50'))
+SEARCH_PAGE_SIZE = int(os.getenv('SEARCH_PAGE_SIZE', '20'))  # results per page of journal and chat search (see chatbot/search.py)
+
+# Dashboard mood chart (see dashboard/mood_chart.py)
+MOOD_CHART_POINTS = int(os.getenv('MOOD_CHART_POINTS', '180'))  # series downsampled to at most this many points
+MOOD_CHART_WINDOW = int(os.getenv('MOOD_CHART_WINDOW', '7'))  # days in the rolling average
+
+# Local sentence-embedding model for similar journal entries (see
+# chatbot/embeddings.py), fetched by `manage.py download_embedding_model`
+EMBEDDING_MODEL = os.getenv('EMBEDDING_MODEL', 'sentence-transformers/all-MiniLM-L6-v2')
+EMBEDDING_MODEL_PATH = os.getenv('EMBEDDING_MODEL_PATH', os.path.join(BASE_DIR, 'models', 'embeddings'))
+
+# Open self-care suggestions kept per user (see chatbot/suggestions.py)
+MAX_OPEN_SUGGESTIONS = int(os.getenv('MAX_OPEN_SUGGESTIONS', '20'))
+
+# Retention (see chatbot/retention.py): rows older than this many days are
+# archived by `manage.py archive_old_rows`; 0 keeps them forever
+RETENTION_DAYS = {
+    'suggestions': int(os.getenv('SUGGESTION_RETENTION_DAYS', '90')),  # completed suggestions
+    'chat': int(os.getenv('CHAT_RETENTION_DAYS', '365')),
+}
+RETENTION_ARCHIVE_DIR = os.getenv('RETENTION_ARCHIVE_DIR', os.path.join(BASE_DIR, 'archive'))
+
+# Background precomputation of the dashboard (see chatbot/tasks.py)
+BACKGROUND_TASK_DELAY = float(os.getenv('BACKGROUND_TASK_DELAY', '5'))  # seconds to coalesce bursts of saves
+BACKGROUND_TASK_POLL_INTERVAL = float(os.getenv('BACKGROUND_TASK_POLL_INTERVAL', '2'))  # seconds between polls of an idle worker
+
+# Local DialoGPT model and the inference worker pool (see chatbot/inference.py)
+CHATBOT_MODEL_PATH = os.path.join(BASE_DIR, 'models', 'dialoGPT-small')
+INFERENCE_BACKEND = os.getenv('INFERENCE_BACKEND', 'fp32')  # fp32, int8 or compiled (see chatbot/model_backends.py)
+INFERENCE_WORKERS = int(os.getenv('INFERENCE_WORKERS', max(1, (os.cpu_count() or 2) // 2)))
+INFERENCE_THREADS_PER_WORKER = int(os.getenv('INFERENCE_THREADS_PER_WORKER', '0'))  # 0 = split cores evenly
+INFERENCE_QUEUE_SIZE = int(os.getenv('INFERENCE_QUEUE_SIZE', '32'))
+INFERENCE_TIMEOUT = float(os.getenv('INFERENCE_TIMEOUT', '60'))  # deadline for prompts without a budget
+INFERENCE_MAX_BATCH_SIZE = int(os.getenv('INFERENCE_MAX_BATCH_SIZE', '8'))
+INFERENCE_BATCH_WINDOW_MS = float(os.getenv('INFERENCE_BATCH_WINDOW_MS', '20'))  # how long a worker waits to fill a batch
+INFERENCE_PRELOAD = os.getenv('INFERENCE_PRELOAD', 'False') == 'True'  # load weights at startup (set by gunicorn.conf.py)
+
+# Per-conversation KV cache kept by each inference worker between chat turns
+KV_CACHE_MAX_BYTES = int(os.getenv('KV_CACHE_MAX_MB', '256')) * 1024 * 1024  # per worker
+KV_CACHE_IDLE_TIMEOUT = float(os.getenv('KV_CACHE_IDLE_TIMEOUT', '600'))  # seconds before an idle conversation is dropped
+CHAT_CONTEXT_TOKENS = int(os.getenv('CHAT_CONTEXT_TOKENS', '768'))  # history + reply tokens (DialoGPT allows 1024)
+
+# Per-endpoint generation budgets: max_new_tokens caps the reply length and
+# max_time (seconds, queue wait included) is the deadline after which
+# generation stops and the partial reply is used.
+GENERATION_BUDGETS = {
+    'chat': {
+        'max_new_tokens': int(os.getenv('CHAT_MAX_NEW_TOKENS', '64')),
+        'max_time': float(os.getenv('CHAT_MAX_TIME', '15')),
+    },
+    'mood_insights': {
+        'max_new_tokens': int(os.getenv('MOOD_INSIGHTS_MAX_NEW_TOKENS', '96')),
+        'max_time': float(os.getenv('MOOD_INSIGHTS_MAX_TIME', '20')),
+    },
+    'self_care': {
+        'max_new_tokens': int(os.getenv('SELF_CARE_MAX_NEW_TOKENS', '160')),
+        'max_time': float(os.getenv('SELF_CARE_MAX_TIME', '30')),
+    },
+}
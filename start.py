@@ -3,6 +3,13 @@ import subprocess
 import sys
 
 def main():
+    # Fetch the sentiment model unless the build already did; without it
+    # transformer sentiment is disabled (see chatbot/checks.py)
+    model_path = os.getenv('SENTIMENT_MODEL_PATH', os.path.join('models', 'sentiment'))
+    if not os.path.exists(os.path.join(model_path, 'config.json')):
+        if subprocess.run([sys.executable, 'manage.py', 'download_sentiment_model']).returncode != 0:
+            print('Sentiment model download failed; transformer sentiment is disabled')
+
     # Run migrations
     subprocess.run([sys.executable, 'manage.py', 'migrate'], check=True)
     
@@ -18,13 +25,20 @@ def main():
     os.environ['DJANGO_SUPERUSER_PASSWORD'] = 'Admin@123'
     subprocess.run([sys.executable, 'manage.py', 'createsuperuser', '--noinput'], check=True)
     
+    # Start the background task worker (dashboard insights and suggestions);
+    # it generates in-process rather than starting its own inference pool
+    subprocess.Popen(
+        [sys.executable, 'manage.py', 'run_tasks'],
+        env=dict(os.environ, INFERENCE_WORKERS='0')
+    )
+
     # Start Gunicorn
     gunicorn_cmd = [
         'gunicorn',
         'mental_wellness.wsgi:application',
         '--bind=0.0.0.0:8000',
         '--workers=1',
-        '--threads=2',
+        '--threads=8',
         '--timeout=120',
         '--max-requests=1000',
         '--max-requests-jitter=50'
@@ -15,9 +15,20 @@ env
 echo "Installing dependencies..."
 pip install --no-cache-dir -r requirements.txt
 
+# Several gunicorn workers need a shared reply cache (see chatbot/checks.py)
+export RESPONSE_CACHE_BACKEND="${RESPONSE_CACHE_BACKEND:-django.core.cache.backends.db.DatabaseCache}"
+export RESPONSE_CACHE_LOCATION="${RESPONSE_CACHE_LOCATION:-llm_response_cache}"
+
+# Fetch the sentiment model unless the build already did (see chatbot/checks.py)
+if [ ! -f "${SENTIMENT_MODEL_PATH:-models/sentiment}/config.json" ]; then
+    echo "Downloading the sentiment model..."
+    python manage.py download_sentiment_model || echo "Sentiment model download failed; transformer sentiment is disabled"
+fi
+
 # Apply database migrations
 echo "Running migrations..."
 python manage.py migrate --noinput
+python manage.py createcachetable
 
 # Collect static files
 echo "Collecting static files..."